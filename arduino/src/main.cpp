@@ -15,6 +15,7 @@
 // ============================================================================
 
 const uint8_t SOF = 0x7E;
+const uint8_t SOF_EXT = 0x7F;  // extended frame: 2-byte LE length
 const uint32_t BAUD_RATE = 115200;
 const uint16_t RX_BUFFER_SIZE = 300;
 const uint16_t TX_BUFFER_SIZE = 300;
@@ -34,9 +35,46 @@ enum MessageType : uint8_t {
     PONG         = 0x21,
     
     GET_CAPS     = 0x30,
-    TRACE_DUMP   = 0x31
+    TRACE_DUMP   = 0x31,
+    
+    SWEEP_START  = 0x40,
+    SWEEP_RESULT = 0x41,
+    SWEEP_DONE   = 0x42
 };
 
+// Stand identity reported via GET_CAPS (host caches capabilities per id + version)
+const char STAND_ID[]    = "uno-sim";
+const char FW_VERSION[]  = "1.4.0";
+
+// Timing capabilities reported via GET_CAPS
+// Delay is counted by Timer1 at F_CPU = 16 MHz -> 62.5 ns tick
+const uint32_t DELAY_TICK_PS = 62500;
+const uint16_t DELAY_MIN_NS  = 0;
+const uint16_t DELAY_MAX_NS  = 65535;
+// Glitch width generator resolution (simulated)
+const uint32_t TG_TICK_PS    = 1000;
+const uint16_t TG_MIN_NS     = 1;
+const uint16_t TG_MAX_NS     = 1000;
+
+// Autonomous sweep limits (must match Python ub/protocol.py record layout)
+const uint8_t SWEEP_MAX_TG       = 32;
+const uint8_t SWEEP_RECORD_SIZE  = 10;  // <IHHBB: index, tg_ns, delay_ns, flags, led
+const uint8_t SWEEP_RECORDS_PER_FRAME = 12;
+
+// Trace capture (simulated, one sample per delay tick, generated on the fly)
+const uint16_t TRACE_LEN         = 4096;
+const uint16_t EXT_MAX_PAYLOAD   = 1024;
+const uint8_t TRACE_HEADER_SIZE  = 12;  // <III: total, offset, data CRC32
+const uint8_t TRACE_FLAG_EXTENDED = 0x01;
+
+// Target heartbeat period (simulated; a real target toggles a heartbeat pin)
+const uint8_t TARGET_BEAT_MS     = 5;
+
+// Sweep record flags
+const uint8_t FLAG_TRIGGER_SEEN    = 0x01;
+const uint8_t FLAG_TRIGGER_CLEARED = 0x02;
+const uint8_t FLAG_HANG            = 0x04;
+
 // LED States
 enum LedState : uint8_t {
     LED_OFF,
@@ -61,6 +99,7 @@ struct TriggerConfig {
     char kind[20];
     char edge[10];
     uint16_t timeout_ms;
+    bool push;  // send READ_STATUS unprompted when the trigger fires
     bool valid;
 };
 
@@ -75,10 +114,31 @@ TriggerConfig g_trigger;
 uint32_t g_trial_counter = 0;
 bool g_hang_simulated = false;
 
+// Autonomous sweep state
+struct SweepConfig {
+    uint32_t next;       // next grid position
+    uint32_t end;        // one past the last position
+    uint16_t delay_start;
+    uint16_t delay_step;
+    uint16_t n_delay;
+    uint16_t repeats;
+    uint8_t n_tg;
+    uint16_t tg_ns[SWEEP_MAX_TG];
+    uint32_t done;       // trials executed
+    bool active;
+};
+
+SweepConfig g_sweep;
+uint8_t g_sweep_records[SWEEP_RECORDS_PER_FRAME * SWEEP_RECORD_SIZE];
+uint8_t g_sweep_record_count = 0;
+
 // Timing for trigger simulation
 unsigned long g_arm_time = 0;
 unsigned long g_trigger_delay = 0;
 
+// Last target heartbeat (stops while the target is hung)
+unsigned long g_target_beat = 0;
+
 // LED timing
 unsigned long g_last_led_toggle = 0;
 bool g_led_physical_state = false;
@@ -137,6 +197,10 @@ const uint32_t crc32_table[256] PROGMEM = {
 // CRC32 CALCULATION
 // ============================================================================
 
+uint32_t crc32_step(uint32_t crc, uint8_t byte) {
+    return (crc >> 8) ^ pgm_read_dword(&crc32_table[(crc ^ byte) & 0xFF]);
+}
+
 uint32_t crc32_calculate(const uint8_t* data, uint16_t length) {
     uint32_t crc = 0xFFFFFFFF;
     
@@ -185,6 +249,39 @@ void send_frame(MessageType msg_type, const uint8_t* payload, uint8_t payload_le
     Serial.flush();
 }
 
+// Streaming writer for frames too large for the TX buffer: bytes go straight
+// to the UART while the frame CRC is accumulated
+uint32_t g_stream_crc;
+
+void stream_byte(uint8_t byte) {
+    g_stream_crc = crc32_step(g_stream_crc, byte);
+    Serial.write(byte);
+}
+
+void stream_u32(uint32_t value) {
+    for (uint8_t i = 0; i < 4; i++) {
+        stream_byte((uint8_t)(value >> (8 * i)));
+    }
+}
+
+void stream_begin(MessageType msg_type, uint16_t payload_len, bool extended) {
+    g_stream_crc = 0xFFFFFFFF;
+    Serial.write(extended ? SOF_EXT : SOF);
+    stream_byte((uint8_t)msg_type);
+    stream_byte((uint8_t)(payload_len & 0xFF));
+    if (extended) {
+        stream_byte((uint8_t)(payload_len >> 8));
+    }
+}
+
+void stream_end() {
+    uint32_t crc = g_stream_crc ^ 0xFFFFFFFF;
+    for (uint8_t i = 0; i < 4; i++) {
+        Serial.write((uint8_t)(crc >> (8 * i)));
+    }
+    Serial.flush();
+}
+
 void send_ack() {
     send_frame(ACK, nullptr, 0);
 }
@@ -193,8 +290,18 @@ void send_nack() {
     send_frame(NACK, nullptr, 0);
 }
 
+uint32_t target_idle_ms() {
+    return millis() - g_target_beat;
+}
+
 void send_pong() {
-    send_frame(PONG, nullptr, 0);
+    // PONG carries the target liveness: <I target_idle_ms (ms since the last heartbeat)
+    uint32_t idle = target_idle_ms();
+    uint8_t payload[4];
+    for (uint8_t i = 0; i < 4; i++) {
+        payload[i] = (idle >> (8 * i)) & 0xFF;
+    }
+    send_frame(PONG, payload, sizeof(payload));
 }
 
 // ============================================================================
@@ -241,6 +348,7 @@ void handle_arm_triggers(const uint8_t* payload, uint8_t len) {
         strlcpy(g_trigger.kind, doc["kind"] | "GPIO_LEVEL", sizeof(g_trigger.kind));
         strlcpy(g_trigger.edge, doc["edge"] | "rising", sizeof(g_trigger.edge));
         g_trigger.timeout_ms = doc["timeout_ms"] | 200;
+        g_trigger.push = doc["push"] | false;
         g_trigger.valid = true;
         
         // Arm the trigger
@@ -258,6 +366,8 @@ void handle_arm_triggers(const uint8_t* payload, uint8_t len) {
     }
 }
 
+void simulate_outcome();
+
 void handle_fire(const uint8_t* payload, uint8_t len) {
     // Check if ready to fire
     if (!g_attack_configured || !g_trigger.valid) {
@@ -265,14 +375,20 @@ void handle_fire(const uint8_t* payload, uint8_t len) {
         return;
     }
     
-    // Increment trial counter
-    g_trial_counter++;
-    
     // Simulate trigger detection if armed and not yet seen
     if (g_armed && !g_trigger_seen) {
         g_trigger_seen = true;
     }
     
+    simulate_outcome();
+    
+    send_ack();
+}
+
+void simulate_outcome() {
+    // Increment trial counter
+    g_trial_counter++;
+    
     // Generate outcome based on attack parameters (deterministic)
     bool hang = false;
     
@@ -308,8 +424,6 @@ void handle_fire(const uint8_t* payload, uint8_t len) {
     }
     
     g_hang_simulated = hang;
-    
-    send_ack();
 }
 
 void handle_read_status(const uint8_t* payload, uint8_t len) {
@@ -327,6 +441,7 @@ void handle_read_status(const uint8_t* payload, uint8_t len) {
     doc["led_state"] = led_str;
     
     doc["hang"] = g_hang_simulated;
+    doc["target_idle_ms"] = target_idle_ms();
     
     // Notes
     char notes[50];
@@ -341,13 +456,238 @@ void handle_read_status(const uint8_t* payload, uint8_t len) {
     send_frame(READ_STATUS, json_buffer, json_len);
 }
 
+void handle_get_caps(const uint8_t* payload, uint8_t len) {
+    // Capabilities are split in sections so each reply fits one frame:
+    //   {"section":"id"}     - stand id and firmware version
+    //   {"section":"proto"}  - message types, codecs, payload limit, fast paths
+    //   {"section":"timing"} - timing resolution and ranges (also the default)
+    JsonDocument request;
+    const char* section = "timing";
+    if (len > 0 && !deserializeJson(request, payload, len)) {
+        section = request["section"] | "timing";
+    }
+    
+    JsonDocument doc;
+    
+    if (strcmp(section, "id") == 0 || strcmp(section, "proto") == 0) {
+        doc["stand_id"] = STAND_ID;
+        doc["fw"] = FW_VERSION;
+    }
+    
+    if (strcmp(section, "proto") == 0) {
+        const uint8_t types[] = {
+            SET_ATTACK, ARM_TRIGGERS, FIRE, READ_STATUS, SOFT_RESET, HARD_RESET, PING, GET_CAPS,
+            SWEEP_START, TRACE_DUMP
+        };
+        JsonArray arr = doc["types"].to<JsonArray>();
+        for (uint8_t i = 0; i < sizeof(types); i++) {
+            arr.add(types[i]);
+        }
+        doc["codecs"].to<JsonArray>().add("json");
+        doc["max_payload"] = 255;
+        doc["push"] = true;   // ARM_TRIGGERS {"push": true}
+        doc["batch"] = true;  // frames are queued and handled in order
+        doc["sweep_tg"] = SWEEP_MAX_TG;
+        doc["ext_payload"] = EXT_MAX_PAYLOAD;  // extended frames (TRACE_DUMP)
+        doc["trace_len"] = TRACE_LEN;
+        doc["target_beat_ms"] = TARGET_BEAT_MS;  // target_idle_ms in READ_STATUS and PONG
+    } else if (strcmp(section, "id") != 0) {
+        // Report timing resolution and ranges so the host can snap/deduplicate points
+        doc["delay_tick_ps"] = DELAY_TICK_PS;
+        doc["delay_min_ns"] = DELAY_MIN_NS;
+        doc["delay_max_ns"] = DELAY_MAX_NS;
+        doc["tg_tick_ps"] = TG_TICK_PS;
+        doc["tg_min_ns"] = TG_MIN_NS;
+        doc["tg_max_ns"] = TG_MAX_NS;
+    }
+    
+    uint8_t json_buffer[256];
+    size_t json_len = serializeJson(doc, json_buffer, sizeof(json_buffer));
+    
+    send_frame(GET_CAPS, json_buffer, json_len);
+}
+
+// ============================================================================
+// AUTONOMOUS SWEEP
+// ============================================================================
+
+uint16_t read_u16(const uint8_t* p) {
+    return (uint16_t)p[0] | ((uint16_t)p[1] << 8);
+}
+
+uint32_t read_u32(const uint8_t* p) {
+    return (uint32_t)read_u16(p) | ((uint32_t)read_u16(p + 2) << 16);
+}
+
+void handle_sweep_start(const uint8_t* payload, uint8_t len) {
+    // <IIHHHHB header + n_tg x <H; needs SET_ATTACK (mode) and ARM_TRIGGERS first
+    if (len < 17 || !g_attack_configured || !g_trigger.valid) {
+        send_nack();
+        return;
+    }
+    
+    uint32_t start = read_u32(payload);
+    uint32_t count = read_u32(payload + 4);
+    uint16_t delay_start = read_u16(payload + 8);
+    uint16_t delay_stop = read_u16(payload + 10);
+    uint16_t delay_step = read_u16(payload + 12);
+    uint16_t repeats = read_u16(payload + 14);
+    uint8_t n_tg = payload[16];
+    
+    if (n_tg == 0 || n_tg > SWEEP_MAX_TG || len < 17 + 2 * n_tg ||
+        delay_step == 0 || delay_stop <= delay_start || repeats == 0) {
+        send_nack();
+        return;
+    }
+    
+    for (uint8_t i = 0; i < n_tg; i++) {
+        g_sweep.tg_ns[i] = read_u16(payload + 17 + 2 * i);
+    }
+    g_sweep.n_tg = n_tg;
+    g_sweep.delay_start = delay_start;
+    g_sweep.delay_step = delay_step;
+    g_sweep.n_delay = (delay_stop - delay_start + delay_step - 1) / delay_step;
+    g_sweep.repeats = repeats;
+    
+    uint32_t total = (uint32_t)n_tg * g_sweep.n_delay * repeats;
+    g_sweep.next = start < total ? start : total;
+    g_sweep.end = (count < total - g_sweep.next) ? g_sweep.next + count : total;
+    g_sweep.done = 0;
+    g_sweep.active = true;
+    g_sweep_record_count = 0;
+    
+    send_ack();
+}
+
+void flush_sweep_records() {
+    if (g_sweep_record_count > 0) {
+        send_frame(SWEEP_RESULT, g_sweep_records, g_sweep_record_count * SWEEP_RECORD_SIZE);
+        g_sweep_record_count = 0;
+    }
+}
+
+void run_sweep_step() {
+    // One trial per loop() pass, so incoming frames (e.g. SOFT_RESET) still abort
+    uint32_t position = g_sweep.next++;
+    uint32_t cell = position / g_sweep.repeats;
+    uint16_t tg_ns = g_sweep.tg_ns[cell / g_sweep.n_delay];
+    uint16_t delay_ns = g_sweep.delay_start + (cell % g_sweep.n_delay) * g_sweep.delay_step;
+    
+    // Per-trial soft reset, then fire on the trigger
+    g_attack.tg_ns = tg_ns;
+    g_attack.delay_ns = delay_ns;
+    g_trigger_seen = true;
+    g_trigger_cleared = false;
+    simulate_outcome();
+    g_sweep.done++;
+    
+    uint8_t flags = FLAG_TRIGGER_SEEN;
+    if (g_trigger_cleared) flags |= FLAG_TRIGGER_CLEARED;
+    if (g_hang_simulated) flags |= FLAG_HANG;
+    uint8_t led = (g_led_state == LED_ON) ? 1 : (g_led_state == LED_OFF ? 0 : 2);
+    
+    uint8_t* rec = &g_sweep_records[g_sweep_record_count * SWEEP_RECORD_SIZE];
+    rec[0] = (uint8_t)(position & 0xFF);
+    rec[1] = (uint8_t)((position >> 8) & 0xFF);
+    rec[2] = (uint8_t)((position >> 16) & 0xFF);
+    rec[3] = (uint8_t)((position >> 24) & 0xFF);
+    rec[4] = (uint8_t)(tg_ns & 0xFF);
+    rec[5] = (uint8_t)(tg_ns >> 8);
+    rec[6] = (uint8_t)(delay_ns & 0xFF);
+    rec[7] = (uint8_t)(delay_ns >> 8);
+    rec[8] = flags;
+    rec[9] = led;
+    
+    if (++g_sweep_record_count >= SWEEP_RECORDS_PER_FRAME) {
+        flush_sweep_records();
+    }
+    
+    if (g_sweep.next >= g_sweep.end) {
+        flush_sweep_records();
+        uint8_t done[4] = {
+            (uint8_t)(g_sweep.done & 0xFF), (uint8_t)((g_sweep.done >> 8) & 0xFF),
+            (uint8_t)((g_sweep.done >> 16) & 0xFF), (uint8_t)((g_sweep.done >> 24) & 0xFF)
+        };
+        send_frame(SWEEP_DONE, done, sizeof(done));
+        g_sweep.active = false;
+    }
+}
+
+// ============================================================================
+// TRACE DUMP
+// ============================================================================
+
+uint8_t trace_sample(uint32_t i) {
+    // Clock-like square wave plus hash noise; the glitch dips the trace at
+    // delay_ns (62.5 ns per sample) for about tg_ns. Mirrored in ub/emulator.py
+    uint32_t x = ((i + 1) * 2654435761UL) ^ (g_trial_counter * 40503UL);
+    int16_t v = 128 + (((i >> 2) & 1) ? 8 : -8) + (int16_t)((x >> 27) & 7);
+    if (g_attack_configured) {
+        uint32_t at = (uint32_t)g_attack.delay_ns * 16 / 1000;
+        uint32_t width = g_attack.tg_ns / 16 + 1;
+        if (i >= at && i < at + width) {
+            v -= (g_attack.tg_ns < 100) ? g_attack.tg_ns : 100;
+        }
+    }
+    return (uint8_t)v;
+}
+
+void send_trace_chunk(uint32_t offset, uint16_t n, bool extended) {
+    // First pass: CRC of the chunk data (samples are regenerated, nothing is buffered)
+    uint32_t data_crc = 0xFFFFFFFF;
+    for (uint16_t i = 0; i < n; i++) {
+        data_crc = crc32_step(data_crc, trace_sample(offset + i));
+    }
+    data_crc ^= 0xFFFFFFFF;
+    
+    stream_begin(TRACE_DUMP, TRACE_HEADER_SIZE + n, extended);
+    stream_u32(TRACE_LEN);
+    stream_u32(offset);
+    stream_u32(data_crc);
+    for (uint16_t i = 0; i < n; i++) {
+        stream_byte(trace_sample(offset + i));
+    }
+    stream_end();
+}
+
+void handle_trace_dump(const uint8_t* payload, uint8_t len) {
+    // <IIHB: offset, length (0xFFFFFFFF = to end), chunk size (0 = max), flags
+    if (len < 11) {
+        send_nack();
+        return;
+    }
+    uint32_t offset = read_u32(payload);
+    uint32_t length = read_u32(payload + 4);
+    uint16_t chunk = read_u16(payload + 8);
+    bool extended = payload[10] & TRACE_FLAG_EXTENDED;
+    
+    if (offset >= TRACE_LEN) {
+        send_nack();
+        return;
+    }
+    
+    uint16_t max_chunk = (extended ? EXT_MAX_PAYLOAD : 255) - TRACE_HEADER_SIZE;
+    if (chunk == 0 || chunk > max_chunk) {
+        chunk = max_chunk;
+    }
+    uint32_t end = (length < TRACE_LEN - offset) ? offset + length : TRACE_LEN;
+    
+    while (offset < end) {
+        uint16_t n = (end - offset < chunk) ? (uint16_t)(end - offset) : chunk;
+        send_trace_chunk(offset, n, extended);
+        offset += n;
+    }
+}
+
 void handle_soft_reset(const uint8_t* payload, uint8_t len) {
-    // Reset flags but keep configuration
+    // Reset flags but keep configuration (also aborts a running sweep)
+    g_sweep.active = false;
     g_armed = false;
     g_trigger_seen = false;
     g_trigger_cleared = false;
     g_led_state = LED_OFF;
     g_hang_simulated = false;
+    g_target_beat = millis();
     
     digitalWrite(LED_BUILTIN, LOW);
     
@@ -356,6 +696,7 @@ void handle_soft_reset(const uint8_t* payload, uint8_t len) {
 
 void handle_hard_reset(const uint8_t* payload, uint8_t len) {
     // Reset everything
+    g_sweep.active = false;
     g_armed = false;
     g_trigger_seen = false;
     g_trigger_cleared = false;
@@ -365,6 +706,7 @@ void handle_hard_reset(const uint8_t* payload, uint8_t len) {
     g_trigger.valid = false;
     g_trial_counter = 0;
     g_hang_simulated = false;
+    g_target_beat = millis();
     
     digitalWrite(LED_BUILTIN, LOW);
     
@@ -442,6 +784,18 @@ void process_frame() {
             send_pong();
             break;
             
+        case GET_CAPS:
+            handle_get_caps(g_rx_payload, g_rx_len);
+            break;
+            
+        case SWEEP_START:
+            handle_sweep_start(g_rx_payload, g_rx_len);
+            break;
+            
+        case TRACE_DUMP:
+            handle_trace_dump(g_rx_payload, g_rx_len);
+            break;
+            
         default:
             // Unknown message type
             send_nack();
@@ -535,16 +889,34 @@ void update_led() {
 // ============================================================================
 
 void update_trigger_simulation() {
-    if (g_armed && !g_trigger_seen) {
+    // A hung target produces no trigger
+    if (g_armed && !g_trigger_seen && !g_hang_simulated) {
         unsigned long now = millis();
         if (now - g_arm_time >= g_trigger_delay) {
             g_trigger_seen = true;
             // Optionally blink LED when trigger fires
             g_led_state = LED_BLINK_SLOW;
+            
+            // Push the status so the host does not have to poll for the trigger
+            if (g_trigger.push) {
+                handle_read_status(nullptr, 0);
+            }
         }
     }
 }
 
+// ============================================================================
+// TARGET HEARTBEAT
+// ============================================================================
+
+void update_target_heartbeat() {
+    // Simulated target: beats every TARGET_BEAT_MS until it hangs
+    unsigned long now = millis();
+    if (!g_hang_simulated && now - g_target_beat >= TARGET_BEAT_MS) {
+        g_target_beat = now;
+    }
+}
+
 // ============================================================================
 // ARDUINO SETUP AND LOOP
 // ============================================================================
@@ -563,8 +935,10 @@ void setup() {
     // Clear state
     memset(&g_attack, 0, sizeof(g_attack));
     memset(&g_trigger, 0, sizeof(g_trigger));
+    memset(&g_sweep, 0, sizeof(g_sweep));
     
     g_rx_state = WAIT_SOF;
+    g_target_beat = millis();
 }
 
 void loop() {
@@ -574,7 +948,13 @@ void loop() {
         process_serial_byte(byte);
     }
     
-    // Update trigger simulation
+    // Autonomous sweep: one trial per pass
+    if (g_sweep.active) {
+        run_sweep_step();
+    }
+    
+    // Update target heartbeat and trigger simulation
+    update_target_heartbeat();
     update_trigger_simulation();
     
     // Update LED state
@@ -0,0 +1,69 @@
+"""
+Benchmark: event log write/parse throughput per JSON codec.
+Run from the repository root: python -m experiments.bench_codec [--events N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from ub.codec import get_codec
+from ub.storage import EventStoreJSONL, iter_events
+
+
+def make_event(i: int) -> dict:
+    """A trial_complete event shaped like Orchestrator._log_trial output."""
+    return {
+        'event_type': 'trial_complete',
+        'trial_id': i,
+        'tg_ns': 15 + (i % 53) * 2,
+        'delay_ns': (i * 37) % 1000,
+        'mode': 'CLOCK_GLITCH',
+        'clock_impl': 'COMPRESS',
+        'outcome': ('Успех', 'Нет эффекта', 'Зависание')[i % 3],
+        'trigger_seen': True,
+        'trigger_cleared': i % 3 == 0,
+        'led_state': 'ON' if i % 3 == 0 else 'OFF',
+        'duration_ms': 12.345
+    }
+
+
+def bench(codec: str, events: list, path: str) -> tuple:
+    """(write events/s, parse events/s, file MB) for one codec."""
+    start = time.perf_counter()
+    with EventStoreJSONL(path, codec) as store:
+        for event in events:
+            store.append(event)
+    write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parsed = sum(1 for _ in iter_events(path, 'trial_complete', codec))
+    parse_s = time.perf_counter() - start
+    assert parsed == len(events)
+
+    return len(events) / write_s, len(events) / parse_s, os.path.getsize(path) / 2**20
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=1_000_000, help='Событий в логе')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"⏱️  JSON-КОДЕКИ: {args.events:,} событий")
+    print("=" * 60)
+    events = [make_event(i) for i in range(args.events)]
+
+    print(f"{'Кодек':<10}{'Запись, 1/с':>16}{'Разбор, 1/с':>16}{'Размер, МБ':>14}")
+    print("-" * 56)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('json', 'orjson', 'msgspec'):
+            try:
+                get_codec(name)
+            except ImportError:
+                print(f"{name:<10}  не установлен")
+                continue
+            path = os.path.join(tmp, f'{name}.jsonl')
+            write_rate, parse_rate, size_mb = bench(name, events, path)
+            print(f"{name:<10}{write_rate:>16,.0f}{parse_rate:>16,.0f}{size_mb:>14.1f}")
@@ -0,0 +1,56 @@
+"""
+Benchmark: streaming SQLite and columnar export of a large event log, and
+loading the result for analysis (CSV vs Parquet/.npz).
+Run from the repository root: python -m experiments.bench_export [--events N] [--batch N]
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import resource
+import time
+
+from experiments.bench_codec import make_event
+from ub.storage import EventStoreJSONL, export_to_columnar, export_to_csv, export_to_sqlite, read_columnar
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=1_000_000, help='Событий в логе')
+    parser.add_argument('--batch', type=int, default=10_000, help='Строк в транзакции')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"⏱️  ЭКСПОРТ В SQLITE: {args.events:,} событий, пакет {args.batch:,}")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = os.path.join(tmp, 'events.jsonl')
+        with EventStoreJSONL(jsonl) as store:
+            for i in range(args.events):
+                store.append(make_event(i))
+        print(f"Лог: {os.path.getsize(jsonl) / 2**20:.1f} МБ")
+
+        start = time.perf_counter()
+        rows = export_to_sqlite(jsonl, os.path.join(tmp, 'results.sqlite'), batch_size=args.batch)
+        elapsed = time.perf_counter() - start
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"Итого: {rows / elapsed:,.0f} строк/с, пиковый RSS процесса {peak_mb:.0f} МБ")
+
+        # Loading for analysis: every trial's tg_ns, delay_ns and outcome
+        csv_path = os.path.join(tmp, 'events.csv')
+        export_to_csv(jsonl, csv_path)
+        start = time.perf_counter()
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            table = [(int(r['tg_ns']), int(r['delay_ns']), r['outcome']) for r in csv.DictReader(f)]
+        print(f"Загрузка CSV:        {time.perf_counter() - start:.2f} с ({len(table):,} строк)")
+        for fmt in ('parquet', 'npz'):
+            try:
+                path = export_to_columnar(jsonl, os.path.join(tmp, 'events'), fmt=fmt)
+            except ImportError:
+                print(f"{fmt}: pyarrow не установлен")
+                continue
+            start = time.perf_counter()
+            columns = read_columnar(path)
+            outcomes = columns['outcome_labels'][columns['outcome']]
+            print(f"Загрузка {fmt:<10} {time.perf_counter() - start:.2f} с ({len(outcomes):,} строк)")
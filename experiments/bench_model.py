@@ -0,0 +1,73 @@
+"""
+Benchmark: objects/sec for validated pydantic models vs the __slots__ fast path.
+Run from the repository root: python -m experiments.bench_model
+"""
+
+import json
+import timeit
+
+from ub.model import (
+    AttackSpec, Observation, Trial, TriggerSpec, TriggerKind, Outcome,
+    AttackRecord, ObservationRecord, TrialRecord
+)
+
+N = 100_000
+
+trigger = TriggerSpec(kind=TriggerKind.GPIO_LEVEL)
+status = {'trigger_seen': True, 'trigger_cleared': False, 'led_state': 'ON', 'hang': False}
+attack = AttackSpec(tg_ns=64, delay_ns=500)
+observation = Observation(raw_status=status, trigger_seen=True, trigger_cleared=False, led_state='ON')
+attack_rec = AttackRecord(64, 500)
+observation_rec = ObservationRecord(status, True, False, 'ON')
+event = json.loads(json.dumps({
+    'event_type': 'trial_complete', 'trial_id': 1, 'tg_ns': 64, 'delay_ns': 500,
+    'mode': 'CLOCK_GLITCH', 'clock_impl': 'COMPRESS', 'outcome': Outcome.SUCCESS.value,
+    'trigger_seen': True, 'trigger_cleared': False, 'led_state': 'ON', 'duration_ms': 12.5
+}, ensure_ascii=False))
+
+
+def validated_event():
+    """What cmd_report did per log line before the fast path."""
+    return Trial(
+        trial_id=event['trial_id'],
+        attack=AttackSpec(mode=event['mode'], clock_impl=event['clock_impl'],
+                          tg_ns=event['tg_ns'], delay_ns=event['delay_ns']),
+        trigger=trigger,
+        observation=Observation(raw_status={}, trigger_seen=event['trigger_seen'],
+                                trigger_cleared=event['trigger_cleared'], led_state=event['led_state']),
+        outcome=Outcome(event['outcome']),
+        duration_s=event['duration_ms'] / 1000.0
+    )
+
+
+CASES = [
+    ("AttackSpec",
+     lambda: AttackSpec(tg_ns=64, delay_ns=500),
+     lambda: AttackRecord(64, 500)),
+    ("Observation",
+     lambda: Observation(raw_status=status, trigger_seen=True, trigger_cleared=False, led_state='ON'),
+     lambda: ObservationRecord(status, True, False, 'ON')),
+    ("Trial",
+     lambda: Trial(trial_id=1, attack=attack, trigger=trigger, observation=observation,
+                   outcome=Outcome.SUCCESS, duration_s=0.01),
+     lambda: TrialRecord(1, attack_rec, trigger, observation_rec, Outcome.SUCCESS, 0.01)),
+    ("Строка лога",
+     validated_event,
+     lambda: TrialRecord.from_event(event, trigger)),
+]
+
+
+def rate(fn) -> float:
+    """Best-of-5 objects per second."""
+    return N / min(timeit.repeat(fn, number=N, repeat=5))
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("⏱️  СОЗДАНИЕ ОБЪЕКТОВ: pydantic vs __slots__")
+    print("=" * 60)
+    print(f"{'Объект':<14}{'pydantic, 1/с':>16}{'record, 1/с':>16}{'Ускорение':>12}")
+    print("-" * 58)
+    for name, validated, fast in CASES:
+        slow_rate, fast_rate = rate(validated), rate(fast)
+        print(f"{name:<14}{slow_rate:>16,.0f}{fast_rate:>16,.0f}{fast_rate / slow_rate:>11.1f}x")
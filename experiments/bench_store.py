@@ -0,0 +1,43 @@
+"""
+Benchmark: per-event append cost of the event store backends.
+Run from the repository root: python -m experiments.bench_store [--events N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from experiments.bench_codec import make_event
+from ub.storage import EventStoreJSONL, EventStoreSQLite
+
+
+def bench(store, events: list, flush_every: int) -> float:
+    """Microseconds per append, flushing like the trial pipeline does."""
+    start = time.perf_counter()
+    with store:
+        for i, event in enumerate(events):
+            store.append(event)
+            if i % flush_every == 0:
+                store.flush()
+    return (time.perf_counter() - start) / len(events) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=200_000, help='Событий')
+    parser.add_argument('--flush-every', type=int, default=1, help='flush() через столько событий')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"⏱️  ХРАНИЛИЩЕ СОБЫТИЙ: {args.events:,} событий, flush каждые {args.flush_every}")
+    print("=" * 60)
+    events = [make_event(i) for i in range(args.events)]
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {
+            'jsonl': EventStoreJSONL(os.path.join(tmp, 'events.jsonl')),
+            'sqlite': EventStoreSQLite(os.path.join(tmp, 'events.sqlite')),
+            'sqlite (коммит на flush)': EventStoreSQLite(os.path.join(tmp, 'eager.sqlite'), commit_s=0),
+        }
+        for name, store in stores.items():
+            print(f"{name:<28}{bench(store, events, args.flush_every):>8.1f} мкс/событие")
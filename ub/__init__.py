@@ -2,32 +2,49 @@
 ub (Управляющий блок) - Glitch Controller Framework
 
 Core framework for orchestrating glitch attacks against AVR targets.
+
+Public names are imported lazily on first access, so ``import ub`` (and
+every CLI command) only pays for the modules it actually uses.
 """
 
-from .orchestrator import Orchestrator
-from .strategy import GridSearchStrategy, RandomSearchStrategy, create_strategy
-from .protocol import MessageType, encode_frame, decode_stream
-from .model import (
-    AttackSpec, TriggerSpec, Trial, Observation, Outcome, 
-    CampaignConfig, StrategyConfig, TriggerKind, AttackMode, ClockImpl
-)
-
-__all__ = [
-    'Orchestrator',
-    'GridSearchStrategy',
-    'RandomSearchStrategy',
-    'create_strategy',
-    'MessageType',
-    'encode_frame',
-    'decode_stream',
-    'AttackSpec',
-    'TriggerSpec',
-    'Trial',
-    'Observation',
-    'Outcome',
-    'CampaignConfig',
-    'StrategyConfig',
-    'TriggerKind',
-    'AttackMode',
-    'ClockImpl',
-]
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'Orchestrator': '.orchestrator',
+    'GridSearchStrategy': '.strategy',
+    'RandomSearchStrategy': '.strategy',
+    'create_strategy': '.strategy',
+    'register_strategy': '.registry',
+    'MessageType': '.protocol',
+    'encode_frame': '.protocol',
+    'decode_stream': '.protocol',
+    'AttackSpec': '.model',
+    'TriggerSpec': '.model',
+    'Trial': '.model',
+    'Observation': '.model',
+    'AttackRecord': '.model',
+    'ObservationRecord': '.model',
+    'TrialRecord': '.model',
+    'Outcome': '.model',
+    'CampaignConfig': '.model',
+    'StrategyConfig': '.model',
+    'TriggerKind': '.model',
+    'AttackMode': '.model',
+    'ClockImpl': '.model',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
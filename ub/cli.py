@@ -7,9 +7,7 @@ import argparse
 import sys
 import yaml
 from pathlib import Path
-from .orchestrator import Orchestrator
-from .storage import export_to_sqlite, export_to_csv
-from .viz import save_heatmap, save_timeline
+from .storage import event_log_path, export_to_sqlite, export_to_csv, export_to_columnar, read_events, iter_events
 
 
 def load_config(config_path: str) -> dict:
@@ -28,13 +26,20 @@ def load_config(config_path: str) -> dict:
 
 def cmd_run(args):
     """Run a new campaign."""
+    # Imported here so report/help do not pay for serial, strategies and NumPy
+    from .orchestrator import Orchestrator
+    
     config = load_config(args.config)
     
     print("=" * 60)
     print(f"🚀 ЗАПУСК КАМПАНИИ: {config['app']['run_name']}")
     print("=" * 60)
     
-    orchestrator = Orchestrator(config)
+    try:
+        orchestrator = Orchestrator(config, resume=getattr(args, 'resume', False))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
     
     try:
         orchestrator.run()
@@ -51,8 +56,9 @@ def cmd_run(args):
 
 def cmd_resume(args):
     """Resume an existing campaign."""
-    # For now, just call run (JSONL append mode)
+    # JSONL append mode; the strategy seeks past already logged trials
     print("⏯️  Возобновление кампании (режим добавления)")
+    args.resume = True
     cmd_run(args)
 
 
@@ -64,8 +70,9 @@ def cmd_report(args):
     print(f"📊 ГЕНЕРАЦИЯ ОТЧЕТОВ: {config['app']['run_name']}")
     print("=" * 60)
     
-    jsonl_path = config['storage']['jsonl_path']
+    jsonl_path = event_log_path(config['storage'])
     sqlite_path = config['storage'].get('sqlite_path')
+    live_db = config['storage'].get('backend', 'jsonl') == 'sqlite'
     viz_config = config.get('viz', {})
     
     # Check if JSONL exists
@@ -73,64 +80,251 @@ def cmd_report(args):
         print(f"❌ Файл событий не найден: {jsonl_path}")
         sys.exit(1)
     
-    # Export to SQLite
-    if sqlite_path:
+    # Points that collapsed onto the same stand timer setting (latest session)
+    sessions = [e for e in read_events(jsonl_path, 'timing_caps') if e.get('points_total') is not None]
+    if sessions:
+        caps = sessions[-1]
+        print(f"🧮 Квантование таймера (delay {caps['delay_tick_ps'] / 1000:g} нс): "
+              f"{caps['points_total']} точек → {caps['points_distinct']} различных, "
+              f"схлопнулось {caps['points_total'] - caps['points_distinct']}")
+    
+    # Trace store next to the log: memory-mapped rows, read block by block
+    traces_dir = Path(config['storage'].get('traces_dir', Path(config['app']['artifacts_dir']) / 'traces'))
+    trace_means = None
+    if traces_dir.exists():
+        from .traces import TraceStore
+        with TraceStore(traces_dir, readonly=True) as traces:
+            size_mb = traces.matrix().nbytes / 2**20
+            print(f"📈 Трассы: {len(traces)} записей × {traces.width} отсчётов, {size_mb:.1f} МБ")
+            outcomes = {e['trial_id']: e['outcome'] for e in read_events(jsonl_path, 'trial_complete') if e.get('outcome')}
+            trace_means = traces.mean_by_label(outcomes)
+        for outcome, (count, mean) in trace_means.items():
+            print(f"   {outcome:<10} {count:>7} трасс, минимум средней {mean.min():.1f} на отсчёте {int(mean.argmin())}")
+    
+    # Export to SQLite (the sqlite backend already wrote it during the campaign)
+    if live_db:
+        print(f"\n📦 SQLite: {sqlite_path} (заполняется во время кампании)")
+    elif sqlite_path:
         print(f"\n📦 Экспорт в SQLite: {sqlite_path}")
-        export_to_sqlite(jsonl_path, sqlite_path)
+        export_to_sqlite(jsonl_path, sqlite_path, full=args.full)
     
     # Export to CSV
     csv_path = str(Path(jsonl_path).with_suffix('.csv'))
     print(f"\n📦 Экспорт в CSV: {csv_path}")
-    export_to_csv(jsonl_path, csv_path)
+    export_to_csv(jsonl_path, csv_path, state_db=sqlite_path, full=args.full)
+    
+    # Columnar export for analysis (Parquet with pyarrow, .npz otherwise)
+    columnar = config['storage'].get('columnar', 'auto')
+    if columnar != 'none':
+        print(f"\n📦 Колоночный экспорт ({columnar})")
+        try:
+            export_to_columnar(jsonl_path, str(Path(jsonl_path).with_suffix('')), fmt=columnar)
+        except ImportError:
+            print("⚠️  Для Parquet нужен pyarrow (pip install pyarrow) или storage.columnar: npz")
     
     # Generate visualizations
     if viz_config.get('make_heatmap', False):
         print("\n📊 Генерация тепловых карт...")
         
-        # Load trials from JSONL
-        import json
-        from .model import Trial, AttackSpec, TriggerSpec, Observation, Outcome, AttackMode, ClockImpl, TriggerKind
+        # Load trials from JSONL (our own log: unvalidated records are enough)
+        from .viz import save_heatmap, save_timeline
+        from .model import TrialRecord, TriggerSpec, TriggerKind
         
-        trials = []
-        with open(jsonl_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    event = json.loads(line)
-                    if event.get('event_type') == 'trial_complete':
-                        # Reconstruct trial
-                        trial = Trial(
-                            trial_id=event['trial_id'],
-                            attack=AttackSpec(
-                                mode=AttackMode.CLOCK_GLITCH,
-                                clock_impl=ClockImpl.COMPRESS,
-                                tg_ns=event['tg_ns'],
-                                delay_ns=event['delay_ns']
-                            ),
-                            trigger=TriggerSpec(
-                                kind=TriggerKind.GPIO_LEVEL,
-                                edge="rising"
-                            ),
-                            observation=Observation(
-                                raw_status={},
-                                trigger_seen=event.get('trigger_seen', False),
-                                trigger_cleared=event.get('trigger_cleared', False),
-                                led_state=event.get('led_state')
-                            ),
-                            outcome=Outcome(event['outcome']) if event.get('outcome') else None
-                        )
-                        trials.append(trial)
+        trigger = TriggerSpec(kind=TriggerKind.GPIO_LEVEL, edge="rising")
+        trials = [TrialRecord.from_event(event, trigger) for event in iter_events(jsonl_path, 'trial_complete')]
         
         viz_dir = viz_config.get('output_dir', './viz')
         metric = viz_config.get('heatmap_metric', 'success_rate')
         
         save_heatmap(trials, viz_dir, metric)
         save_timeline(trials, viz_dir)
+        if trace_means:
+            from .viz import save_trace_overview
+            save_trace_overview(trace_means, viz_dir)
     
     print("\n" + "=" * 60)
     print("✅ ОТЧЕТЫ СГЕНЕРИРОВАНЫ")
     print("=" * 60)
 
 
+def cmd_bench_strategy(args):
+    """Replay strategies offline against recorded campaigns."""
+    from .bench import ResponseSurface, run_benchmark, summarize
+    from .registry import STUB_STRATEGIES
+    
+    config = load_config(args.config)
+    
+    print("=" * 60)
+    print(f"🧪 СРАВНЕНИЕ СТРАТЕГИЙ: {config['app']['run_name']}")
+    print("=" * 60)
+    
+    sources = args.source or [event_log_path(config['storage'])]
+    surface = ResponseSurface()
+    for source in sources:
+        if not Path(source).exists():
+            print(f"❌ Файл не найден: {source}")
+            sys.exit(1)
+        added = surface.load(source)
+        print(f"📥 {source}: {added} испытаний")
+    
+    if not surface.counts:
+        print("❌ Нет испытаний для построения поверхности отклика")
+        sys.exit(1)
+    
+    print(f"🗺️  Ячеек: {len(surface.counts)}, из них с успехом: {len(surface.success_cells())}")
+    
+    if not args.strategies:
+        print(f"⏭️  Заглушки не сравниваются: {', '.join(sorted(STUB_STRATEGIES))}")
+    
+    campaign = config['campaign']
+    max_trials = args.max_trials or campaign['max_trials']
+    results = run_benchmark(
+        surface,
+        campaign['strategy'].get('params', {}),
+        names=args.strategies,
+        seeds=args.seeds,
+        max_trials=max_trials,
+        batch_size=campaign.get('batch_size', 1),
+        map_fraction=args.map_fraction,
+        workers=args.workers
+    )
+    
+    def fmt(value, digits=0):
+        return "—" if value is None else f"{value:.{digits}f}"
+    
+    pct = int(args.map_fraction * 100)
+    print(f"\n{'Стратегия':<16}{'1-й успех':>12}{'за, с':>10}{f'{pct}% карты':>12}{'Задержка, мкс':>16}")
+    print("-" * 66)
+    summary = {}
+    for name, runs in results.items():
+        summary[name] = stats = summarize(runs)
+        if 'error' in stats:
+            print(f"{name:<16}  {stats['error'].splitlines()[0]}")
+            continue
+        print(f"{name:<16}{fmt(stats['first_success']['median']):>12}"
+              f"{fmt(stats['first_success_s']['median'], 1):>10}"
+              f"{fmt(stats['to_map']['median']):>12}{fmt(stats['latency_us'], 1):>16}")
+    print(f"\nМедиана по {args.seeds} сидам, лимит {max_trials} испытаний")
+    
+    if args.output:
+        import json
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'runs': results}, f, ensure_ascii=False, indent=2)
+        print(f"📦 Результаты: {args.output}")
+
+
+def cmd_train_classifier(args):
+    """Train the ML outcome classifier from a labelled SQLite export."""
+    import time
+    import numpy as np
+    from .observe import MLClassifier, load_training_data
+    
+    config = load_config(args.config)
+    
+    print("=" * 60)
+    print(f"🧠 ОБУЧЕНИЕ КЛАССИФИКАТОРА: {config['app']['run_name']}")
+    print("=" * 60)
+    
+    sqlite_path = args.sqlite or config['storage'].get('sqlite_path')
+    if not sqlite_path or not Path(sqlite_path).exists():
+        print(f"❌ SQLite не найден: {sqlite_path} (сначала ub report)")
+        sys.exit(1)
+    output = args.output or (config.get('observe') or {}).get('model_path')
+    if not output:
+        print("❌ Укажите --output или observe.model_path")
+        sys.exit(1)
+    
+    model = MLClassifier(l2=args.l2)
+    try:
+        metrics = model.train(sqlite_path, use_outcome=args.use_outcome)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    print(f"📥 Испытаний: {metrics['trials']}")
+    for outcome, count in metrics['classes'].items():
+        print(f"   {outcome:<24}{count:>8}")
+    if metrics['accuracy'] is not None:
+        print(f"🎯 Точность на отложенной выборке: {metrics['accuracy'] * 100:.1f}%")
+    
+    # Batch inference cost over the training matrix
+    X, _ = load_training_data(sqlite_path, use_outcome=args.use_outcome)
+    X = np.repeat(X, max(1, 100_000 // len(X)), axis=0)
+    start = time.perf_counter()
+    model.classify_many(X)
+    print(f"⚡ classify_many: {(time.perf_counter() - start) / len(X) * 1e9:.0f} нс/испытание ({len(X)} строк)")
+    
+    model.save(output)
+    print(f"📦 Модель: {output}")
+
+
+def cmd_reclassify(args):
+    """Relabel a recorded campaign with the current rules or a trained model."""
+    import time
+    import numpy as np
+    from .observe import Evaluator, MLClassifier, observation_columns, feature_matrix
+    from .storage import rewrite_outcomes, write_outcome_column
+    
+    config = load_config(args.config)
+    
+    print("=" * 60)
+    print(f"🔁 ПЕРЕКЛАССИФИКАЦИЯ: {config['app']['run_name']}")
+    print("=" * 60)
+    
+    jsonl_path = args.source or event_log_path(config['storage'])
+    if not Path(jsonl_path).exists():
+        print(f"❌ Файл событий не найден: {jsonl_path}")
+        sys.exit(1)
+    if not args.column and Path(jsonl_path).suffix in ('.sqlite', '.db'):
+        print(f"❌ {jsonl_path}: новый лог пишется только из JSONL, для базы событий используйте --column")
+        sys.exit(1)
+    
+    events = list(iter_events(jsonl_path, 'trial_complete'))
+    if not events:
+        print("❌ В логе нет испытаний")
+        sys.exit(1)
+    logged = np.array([e.get('outcome') for e in events], dtype=object)
+    
+    # One vectorized pass over the whole campaign
+    start = time.perf_counter()
+    if args.model:
+        model = MLClassifier.load(args.model)
+        trial_ids = np.array([e['trial_id'] for e in events], dtype=np.int64)
+        new = model.outcomes(model.classify_many(feature_matrix(events)))
+        classifier = args.model
+    else:
+        columns = observation_columns(events)
+        trial_ids = columns['trial_id']
+        new = np.array([o.value for o in Evaluator.classify_many(columns)], dtype=object)
+        classifier = 'rules'
+    elapsed = time.perf_counter() - start
+    outcomes = dict(zip(trial_ids.tolist(), new.tolist()))
+    
+    print(f"📥 Испытаний: {len(events)}, классификатор: {classifier}")
+    print(f"⚡ {elapsed * 1000:.1f} мс ({elapsed / len(events) * 1e9:.0f} нс/испытание)")
+    values = sorted(set(logged.tolist()) | set(new.tolist()), key=str)
+    print(f"{'Исход':<26}{'было':>8}{'стало':>8}")
+    for value in values:
+        print(f"{str(value):<26}{int((logged == value).sum()):>8}{int((new == value).sum()):>8}")
+    
+    if args.column:
+        sqlite_path = config['storage'].get('sqlite_path')
+        if not sqlite_path or not Path(sqlite_path).exists():
+            print(f"❌ SQLite не найден: {sqlite_path} (сначала ub report)")
+            sys.exit(1)
+        try:
+            updated = write_outcome_column(sqlite_path, args.column, outcomes)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"📦 Столбец trials.{args.column}: {updated} строк в {sqlite_path}")
+    else:
+        output = args.output or str(Path(jsonl_path).with_suffix('.reclassified.jsonl'))
+        changed = rewrite_outcomes(jsonl_path, output, outcomes, {'classifier': classifier})
+        print(f"📦 Новый лог: {output} (изменено {changed} исходов)")
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -141,6 +335,9 @@ def main():
   %(prog)s run --config config.yaml          # Запустить кампанию
   %(prog)s resume --config config.yaml       # Возобновить кампанию
   %(prog)s report --config config.yaml       # Сгенерировать отчеты
+  %(prog)s bench-strategy --config config.yaml  # Сравнить стратегии офлайн
+  %(prog)s train-classifier --config config.yaml  # Обучить ML-классификатор исходов
+  %(prog)s reclassify --config config.yaml   # Пересчитать исходы записанной кампании
         """
     )
     
@@ -159,8 +356,41 @@ def main():
     # Report command
     parser_report = subparsers.add_parser('report', help='Сгенерировать отчеты и визуализации')
     parser_report.add_argument('--config', required=True, help='Путь к файлу конфигурации')
+    parser_report.add_argument('--full', action='store_true',
+                               help='Полный повторный экспорт (по умолчанию дописываются только новые события)')
     parser_report.set_defaults(func=cmd_report)
     
+    # Bench-strategy command
+    parser_bench = subparsers.add_parser('bench-strategy', help='Сравнить стратегии на записанных кампаниях')
+    parser_bench.add_argument('--config', required=True, help='Путь к файлу конфигурации')
+    parser_bench.add_argument('--source', nargs='+', help='events.jsonl / results.sqlite (по умолчанию журнал событий storage)')
+    parser_bench.add_argument('--strategies', nargs='+', help='Стратегии для сравнения (по умолчанию все, кроме заглушек)')
+    parser_bench.add_argument('--seeds', type=int, default=20, help='Число сидов на стратегию')
+    parser_bench.add_argument('--max-trials', type=int, help='Лимит испытаний (по умолчанию campaign.max_trials)')
+    parser_bench.add_argument('--map-fraction', type=float, default=0.9, help='Доля успешных ячеек для метрики карты')
+    parser_bench.add_argument('--workers', type=int, help='Число процессов')
+    parser_bench.add_argument('--output', help='Сохранить результаты в JSON')
+    parser_bench.set_defaults(func=cmd_bench_strategy)
+    
+    # Train-classifier command
+    parser_train = subparsers.add_parser('train-classifier', help='Обучить ML-классификатор на размеченном SQLite')
+    parser_train.add_argument('--config', required=True, help='Путь к файлу конфигурации')
+    parser_train.add_argument('--sqlite', help='results.sqlite (по умолчанию storage.sqlite_path)')
+    parser_train.add_argument('--output', help='Файл модели .npz (по умолчанию observe.model_path)')
+    parser_train.add_argument('--use-outcome', action='store_true',
+                              help='Без метки в таблице labels брать записанный исход')
+    parser_train.add_argument('--l2', type=float, default=1e-3, help='L2-регуляризация')
+    parser_train.set_defaults(func=cmd_train_classifier)
+    
+    # Reclassify command
+    parser_reclassify = subparsers.add_parser('reclassify', help='Пересчитать исходы записанной кампании')
+    parser_reclassify.add_argument('--config', required=True, help='Путь к файлу конфигурации')
+    parser_reclassify.add_argument('--source', help='events.jsonl или база storage.backend: sqlite (по умолчанию журнал событий storage)')
+    parser_reclassify.add_argument('--model', help='Модель MLClassifier .npz (по умолчанию правила Evaluator)')
+    parser_reclassify.add_argument('--output', help='Новый лог (по умолчанию <лог>.reclassified.jsonl)')
+    parser_reclassify.add_argument('--column', help='Вместо нового лога записать столбец в trials (SQLite)')
+    parser_reclassify.set_defaults(func=cmd_reclassify)
+    
     args = parser.parse_args()
     
     if not args.command:
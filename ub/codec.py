@@ -0,0 +1,61 @@
+"""
+JSON codec for the event log: orjson or msgspec when installed, stdlib json
+otherwise. All of them write compact UTF-8 (no ASCII escaping), so logs
+written by one are read by any other.
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, Callable, NamedTuple, Union
+
+
+class JsonCodec(NamedTuple):
+    """One JSON backend: dumps(obj) -> bytes without newline, loads(bytes | str) -> obj."""
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[Union[bytes, str]], Any]
+
+
+def _stdlib() -> JsonCodec:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    return JsonCodec('json', lambda obj: encoder.encode(obj).encode('utf-8'), json.loads)
+
+
+def _orjson() -> JsonCodec:
+    import orjson
+    option = orjson.OPT_SERIALIZE_NUMPY  # NumPy scalars/arrays from strategies and traces
+    return JsonCodec('orjson', lambda obj: orjson.dumps(obj, option=option), orjson.loads)
+
+
+def _msgspec() -> JsonCodec:
+    import msgspec
+    encoder = msgspec.json.Encoder()
+    return JsonCodec('msgspec', encoder.encode, msgspec.json.decode)
+
+
+_BACKENDS = {'orjson': _orjson, 'msgspec': _msgspec, 'json': _stdlib}
+
+
+@lru_cache(maxsize=None)
+def get_codec(name: str = 'auto') -> JsonCodec:
+    """
+    Resolve a codec by name.
+
+    Args:
+        name: 'orjson', 'msgspec', 'json' or 'auto' (first one installed,
+            in that order)
+
+    Raises:
+        ValueError: Unknown name
+        ImportError: Named backend is not installed
+    """
+    if name == 'auto':
+        for backend in ('orjson', 'msgspec'):
+            try:
+                return _BACKENDS[backend]()
+            except ImportError:
+                continue
+        return _stdlib()
+    if name not in _BACKENDS:
+        raise ValueError(f"Неизвестный JSON-кодек: {name} (доступны: auto, {', '.join(_BACKENDS)})")
+    return _BACKENDS[name]()
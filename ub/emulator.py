@@ -0,0 +1,424 @@
+"""
+Python emulator of the test firmware (arduino/src/main.cpp).
+Speaks the same frame protocol behind the SerialLink interface, so whole
+campaigns - including autonomous sweeps - run without a board.
+Select it with ``serial.port: "emulator"``.
+"""
+
+import binascii
+import json
+import random
+import time
+from typing import Optional
+import numpy as np
+from .protocol import (
+    MessageType, encode_frame, decode_stream,
+    SWEEP_RECORD, SWEEP_DONE_PAYLOAD, FLAG_TRIGGER_SEEN, FLAG_TRIGGER_CLEARED, FLAG_HANG,
+    decode_sweep, TRACE_REQUEST, TRACE_CHUNK, TRACE_FLAG_EXTENDED, MAX_PAYLOAD, PONG_PAYLOAD
+)
+
+# Must match main.cpp
+STAND_ID = "uno-sim"
+FW_VERSION = "1.4.0"
+DELAY_TICK_PS = 62500
+TG_TICK_PS = 1000
+SWEEP_MAX_TG = 32
+SWEEP_RECORDS_PER_FRAME = 12
+TRACE_LEN = 4096
+EXT_MAX_PAYLOAD = 1024
+TARGET_BEAT_MS = 5
+
+LED_OFF, LED_ON, LED_BLINK_SLOW, LED_BLINK_FAST = range(4)
+
+
+class StandEmulator:
+    """
+    In-process stand with the firmware's command handlers and outcome model.
+    
+    The firmware ``loop()`` (trigger timing, sweep steps) runs whenever the
+    host reads; a sweep advances ``sweep_steps_per_read`` trials per read.
+    """
+    
+    def __init__(
+        self,
+        port: str = "emulator",
+        baudrate: int = 115200,
+        timeout_s: float = 0.5,
+        seed: Optional[int] = None,
+        sweep_steps_per_read: int = 64,
+        drop_chunks: float = 0.0,
+        drop_frames: float = 0.0
+    ):
+        """
+        Args:
+            seed: Seed for the firmware's random()
+            sweep_steps_per_read: Sweep trials run per host read
+            drop_chunks: Probability of losing each TRACE_DUMP chunk (tests resume)
+            drop_frames: Probability of losing each host frame, as a bad CRC
+                would (tests the stall retry)
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout_s = timeout_s
+        self.sweep_steps_per_read = sweep_steps_per_read
+        self.drop_chunks = drop_chunks
+        self.drop_frames = drop_frames
+        self._rng = random.Random(seed)
+        self._loss_rng = random.Random(seed)
+        self._rx = bytearray()
+        self._tx = bytearray()
+        self._reset_all()
+    
+    def _reset_all(self) -> None:
+        """Power-on state (setup())."""
+        self.armed = False
+        self.trigger_seen = False
+        self.trigger_cleared = False
+        self.led_state = LED_OFF
+        self.attack: Optional[dict] = None
+        self.trigger: Optional[dict] = None
+        self.trial_counter = 0
+        self.hang = False
+        self.target_beat = time.monotonic()
+        self.arm_time = 0.0
+        self.trigger_delay = 0.0
+        self.sweep: Optional[dict] = None
+        self._records = bytearray()
+    
+    # ------------------------------------------------------------------
+    # SerialLink interface
+    # ------------------------------------------------------------------
+    
+    def __enter__(self):
+        print("🧪 Эмулятор стенда (main.cpp)")
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+    
+    def write(self, data: bytes) -> None:
+        self._rx.extend(data)
+        for msg_type, payload in decode_stream(self._rx):
+            # The firmware drops frames that fail the CRC without a reply
+            if self.drop_frames and self._loss_rng.random() < self.drop_frames:
+                continue
+            self._process_frame(msg_type, payload)
+    
+    def read(self, n: int) -> bytes:
+        self._loop()
+        data = bytes(self._tx[:n])
+        del self._tx[:n]
+        return data
+    
+    def read_available(self) -> bytes:
+        self._loop()
+        data = bytes(self._tx)
+        self._tx.clear()
+        return data
+    
+    def flush_input(self) -> None:
+        self._tx.clear()
+    
+    # ------------------------------------------------------------------
+    # Firmware
+    # ------------------------------------------------------------------
+    
+    def _send(self, msg_type: MessageType, payload: bytes = b'') -> None:
+        self._tx.extend(encode_frame(msg_type, payload))
+    
+    def _send_json(self, msg_type: MessageType, doc: dict) -> None:
+        self._send(msg_type, json.dumps(doc, separators=(',', ':')).encode('utf-8'))
+    
+    def _process_frame(self, msg_type: MessageType, payload: bytes) -> None:
+        handlers = {
+            MessageType.SET_ATTACK: self._handle_set_attack,
+            MessageType.ARM_TRIGGERS: self._handle_arm_triggers,
+            MessageType.FIRE: self._handle_fire,
+            MessageType.READ_STATUS: lambda p: self._send_status(),
+            MessageType.SOFT_RESET: self._handle_soft_reset,
+            MessageType.HARD_RESET: self._handle_hard_reset,
+            MessageType.PING: lambda p: self._send(MessageType.PONG, PONG_PAYLOAD.pack(self._target_idle_ms())),
+            MessageType.GET_CAPS: self._handle_get_caps,
+            MessageType.SWEEP_START: self._handle_sweep_start,
+            MessageType.TRACE_DUMP: self._handle_trace_dump,
+        }
+        handler = handlers.get(msg_type)
+        if handler is None:
+            self._send(MessageType.NACK)
+        else:
+            handler(payload)
+    
+    @staticmethod
+    def _json(payload: bytes) -> Optional[dict]:
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+    
+    def _handle_set_attack(self, payload: bytes) -> None:
+        doc = self._json(payload)
+        if not doc or not isinstance(doc.get('mode'), str) or not isinstance(doc.get('tg_ns'), int) \
+                or not isinstance(doc.get('delay_ns'), int):
+            self._send(MessageType.NACK)
+            return
+        self.attack = {
+            'mode': doc['mode'],
+            'clock_impl': doc.get('clock_impl', 'COMPRESS'),
+            'tg_ns': doc['tg_ns'] & 0xFFFF,
+            'delay_ns': doc['delay_ns'] & 0xFFFF,
+        }
+        self._send(MessageType.ACK)
+    
+    def _handle_arm_triggers(self, payload: bytes) -> None:
+        doc = self._json(payload)
+        if not doc or not isinstance(doc.get('kind'), str):
+            self._send(MessageType.NACK)
+            return
+        self.trigger = {
+            'kind': doc['kind'],
+            'edge': doc.get('edge', 'rising'),
+            'timeout_ms': doc.get('timeout_ms', 200),
+            'push': doc.get('push', False),
+        }
+        self.armed = True
+        self.trigger_seen = False
+        self.trigger_cleared = False
+        # Simulate trigger detection after random delay (50-150ms)
+        self.arm_time = time.monotonic()
+        self.trigger_delay = self._rng.randrange(50, 150) / 1000.0
+        self._send(MessageType.ACK)
+    
+    def _handle_fire(self, payload: bytes) -> None:
+        if self.attack is None or self.trigger is None:
+            self._send(MessageType.NACK)
+            return
+        if self.armed and not self.trigger_seen:
+            self.trigger_seen = True
+        self._simulate_outcome()
+        self._send(MessageType.ACK)
+    
+    def _simulate_outcome(self) -> None:
+        """Deterministic-ish outcome model of main.cpp simulate_outcome()."""
+        self.trial_counter += 1
+        tg_ns = self.attack['tg_ns']
+        delay_ns = self.attack['delay_ns']
+        hang = False
+        
+        if tg_ns < 30 and delay_ns % 100 == 0:
+            self.led_state = LED_ON
+            self.trigger_cleared = True
+        elif tg_ns > 80 or delay_ns > 4500:
+            self.led_state = LED_OFF
+            self.trigger_cleared = False
+        elif self.trial_counter % 10 == 7:
+            hang = True
+            self.led_state = LED_BLINK_FAST
+            self.trigger_cleared = False
+        else:
+            rand_val = self._rng.randrange(100)
+            # uint8_t arithmetic as on the board
+            success_threshold = (100 - tg_ns // 2) & 0xFF
+            if delay_ns > 2000:
+                success_threshold = (success_threshold - 20) & 0xFF
+            if rand_val < success_threshold:
+                self.led_state = LED_ON
+                self.trigger_cleared = True
+            else:
+                self.led_state = LED_OFF
+                self.trigger_cleared = False
+        
+        self.hang = hang
+    
+    def _target_idle_ms(self) -> int:
+        """Milliseconds since the last target heartbeat."""
+        self._update_heartbeat()
+        return int((time.monotonic() - self.target_beat) * 1000)
+    
+    def _update_heartbeat(self) -> None:
+        """main.cpp update_target_heartbeat(): beats every TARGET_BEAT_MS until the target hangs."""
+        now = time.monotonic()
+        if not self.hang and now - self.target_beat >= TARGET_BEAT_MS / 1000.0:
+            self.target_beat = now
+    
+    def _led_str(self) -> str:
+        if self.led_state == LED_ON:
+            return "ON"
+        if self.led_state == LED_OFF:
+            return "OFF"
+        return "BLINK"
+    
+    def _send_status(self) -> None:
+        self._send_json(MessageType.READ_STATUS, {
+            'trigger_seen': self.trigger_seen,
+            'trigger_cleared': self.trigger_cleared,
+            'led_state': self._led_str(),
+            'hang': self.hang,
+            'target_idle_ms': self._target_idle_ms(),
+            'notes': f"Trial #{self.trial_counter} complete",
+        })
+    
+    def _handle_get_caps(self, payload: bytes) -> None:
+        section = 'timing'
+        if payload:
+            doc = self._json(payload)
+            if doc is not None:
+                section = doc.get('section', 'timing')
+        
+        doc = {}
+        if section in ('id', 'proto'):
+            doc.update(stand_id=STAND_ID, fw=FW_VERSION)
+        if section == 'proto':
+            doc.update(
+                types=[int(t) for t in (
+                    MessageType.SET_ATTACK, MessageType.ARM_TRIGGERS, MessageType.FIRE,
+                    MessageType.READ_STATUS, MessageType.SOFT_RESET, MessageType.HARD_RESET,
+                    MessageType.PING, MessageType.GET_CAPS, MessageType.SWEEP_START,
+                    MessageType.TRACE_DUMP
+                )],
+                codecs=['json'],
+                max_payload=255,
+                push=True,
+                batch=True,
+                sweep_tg=SWEEP_MAX_TG,
+                ext_payload=EXT_MAX_PAYLOAD,
+                trace_len=TRACE_LEN,
+                target_beat_ms=TARGET_BEAT_MS,
+            )
+        elif section != 'id':
+            doc.update(
+                delay_tick_ps=DELAY_TICK_PS, delay_min_ns=0, delay_max_ns=65535,
+                tg_tick_ps=TG_TICK_PS, tg_min_ns=1, tg_max_ns=1000,
+            )
+        self._send_json(MessageType.GET_CAPS, doc)
+    
+    def _handle_soft_reset(self, payload: bytes) -> None:
+        self.sweep = None
+        self.armed = False
+        self.trigger_seen = False
+        self.trigger_cleared = False
+        self.led_state = LED_OFF
+        self.hang = False
+        self.target_beat = time.monotonic()
+        self._send(MessageType.ACK)
+    
+    def _handle_hard_reset(self, payload: bytes) -> None:
+        self._reset_all()
+        self._send(MessageType.ACK)
+    
+    # ------------------------------------------------------------------
+    # Trace dump
+    # ------------------------------------------------------------------
+    
+    def trace(self) -> np.ndarray:
+        """Current trace, sample for sample as main.cpp trace_sample()."""
+        i = np.arange(TRACE_LEN, dtype=np.uint64)
+        x = (((i + 1) * 2654435761) & 0xFFFFFFFF) ^ ((self.trial_counter * 40503) & 0xFFFFFFFF)
+        v = 128 + np.where((i >> 2) & 1, 8, -8) + ((x >> 27) & 7).astype(np.int64)
+        if self.attack is not None:
+            at = self.attack['delay_ns'] * 16 // 1000
+            width = self.attack['tg_ns'] // 16 + 1
+            v[at:at + width] -= min(self.attack['tg_ns'], 100)
+        return v.astype(np.uint8)
+    
+    def _handle_trace_dump(self, payload: bytes) -> None:
+        if len(payload) < TRACE_REQUEST.size:
+            self._send(MessageType.NACK)
+            return
+        offset, length, chunk, flags = TRACE_REQUEST.unpack_from(payload)
+        extended = bool(flags & TRACE_FLAG_EXTENDED)
+        if offset >= TRACE_LEN:
+            self._send(MessageType.NACK)
+            return
+        
+        max_chunk = (EXT_MAX_PAYLOAD if extended else MAX_PAYLOAD) - TRACE_CHUNK.size
+        if chunk == 0 or chunk > max_chunk:
+            chunk = max_chunk
+        end = offset + length if length < TRACE_LEN - offset else TRACE_LEN
+        
+        trace = self.trace().tobytes()
+        while offset < end:
+            data = trace[offset:min(end, offset + chunk)]
+            if self._loss_rng.random() >= self.drop_chunks:
+                header = TRACE_CHUNK.pack(TRACE_LEN, offset, binascii.crc32(data) & 0xFFFFFFFF)
+                self._tx.extend(encode_frame(MessageType.TRACE_DUMP, header + data, extended=extended))
+            offset += len(data)
+    
+    # ------------------------------------------------------------------
+    # Autonomous sweep
+    # ------------------------------------------------------------------
+    
+    def _handle_sweep_start(self, payload: bytes) -> None:
+        if len(payload) < 17 or self.attack is None or self.trigger is None:
+            self._send(MessageType.NACK)
+            return
+        sweep = decode_sweep(payload)
+        n_tg = len(sweep['tg_ns'])
+        if n_tg == 0 or n_tg > SWEEP_MAX_TG or len(payload) < 17 + 2 * payload[16] or \
+                sweep['delay_step'] == 0 or sweep['delay_stop'] <= sweep['delay_start'] or sweep['repeats'] == 0:
+            self._send(MessageType.NACK)
+            return
+        
+        n_delay = -(-(sweep['delay_stop'] - sweep['delay_start']) // sweep['delay_step'])
+        total = n_tg * n_delay * sweep['repeats']
+        start = min(sweep['start'], total)
+        sweep.update(
+            n_delay=n_delay,
+            next=start,
+            end=min(start + sweep['count'], total),
+            done=0,
+        )
+        self.sweep = sweep
+        self._records.clear()
+        self._send(MessageType.ACK)
+    
+    def _flush_records(self) -> None:
+        if self._records:
+            self._send(MessageType.SWEEP_RESULT, bytes(self._records))
+            self._records.clear()
+    
+    def _sweep_step(self) -> None:
+        sweep = self.sweep
+        position = sweep['next']
+        sweep['next'] += 1
+        cell = position // sweep['repeats']
+        tg_ns = sweep['tg_ns'][cell // sweep['n_delay']]
+        delay_ns = sweep['delay_start'] + (cell % sweep['n_delay']) * sweep['delay_step']
+        
+        self.attack['tg_ns'] = tg_ns
+        self.attack['delay_ns'] = delay_ns
+        self.trigger_seen = True
+        self.trigger_cleared = False
+        self._simulate_outcome()
+        sweep['done'] += 1
+        
+        flags = FLAG_TRIGGER_SEEN
+        if self.trigger_cleared:
+            flags |= FLAG_TRIGGER_CLEARED
+        if self.hang:
+            flags |= FLAG_HANG
+        led = 1 if self.led_state == LED_ON else (0 if self.led_state == LED_OFF else 2)
+        self._records += SWEEP_RECORD.pack(position, tg_ns, delay_ns, flags, led)
+        
+        if len(self._records) >= SWEEP_RECORDS_PER_FRAME * SWEEP_RECORD.size:
+            self._flush_records()
+        
+        if sweep['next'] >= sweep['end']:
+            self._flush_records()
+            self._send(MessageType.SWEEP_DONE, SWEEP_DONE_PAYLOAD.pack(sweep['done']))
+            self.sweep = None
+    
+    def _loop(self) -> None:
+        """main.cpp loop(): sweep steps, target heartbeat and trigger simulation."""
+        for _ in range(self.sweep_steps_per_read):
+            if self.sweep is None:
+                break
+            self._sweep_step()
+        
+        self._update_heartbeat()
+        # A hung target produces no trigger
+        if self.armed and not self.trigger_seen and not self.hang:
+            if time.monotonic() - self.arm_time >= self.trigger_delay:
+                self.trigger_seen = True
+                self.led_state = LED_BLINK_SLOW
+                if self.trigger['push']:
+                    self._send_status()
@@ -74,11 +74,219 @@ class Trial(BaseModel):
     trigger: TriggerSpec
     observation: Optional[Observation] = None
     outcome: Optional[Outcome] = None
+    duration_s: Optional[float] = None  # measured wall time (reset, trial, recovery)
+
+
+# ----------------------------------------------------------------------
+# Fast path: __slots__ twins of AttackSpec / Observation / Trial.
+# Same field names and defaults, no validation - for data the framework
+# produced itself (strategy proposals, decoded sweep records, replays, its
+# own logs). Config files and stand JSON replies go through the models above.
+# ----------------------------------------------------------------------
+
+class _Record:
+    """Shared repr/eq/field dict for the slotted records (fields = __slots__)."""
+    __slots__ = ()
+    
+    def _asdict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+    
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+    
+    __hash__ = None  # mutable, like the pydantic models
+
+
+class AttackRecord(_Record):
+    """Unvalidated AttackSpec (enum members and plain ints expected)."""
+    __slots__ = ('tg_ns', 'delay_ns', 'mode', 'clock_impl', 'power_enabled', 'power_type',
+                 'power_dv_mV', 'power_width_ns', 'power_delay_ns')
+    
+    def __init__(
+        self,
+        tg_ns: int,
+        delay_ns: int,
+        mode: AttackMode = AttackMode.CLOCK_GLITCH,
+        clock_impl: ClockImpl = ClockImpl.COMPRESS,
+        power_enabled: bool = False,
+        power_type: Optional[str] = None,
+        power_dv_mV: Optional[int] = None,
+        power_width_ns: Optional[int] = None,
+        power_delay_ns: Optional[int] = None
+    ):
+        self.tg_ns = tg_ns
+        self.delay_ns = delay_ns
+        self.mode = mode
+        self.clock_impl = clock_impl
+        self.power_enabled = power_enabled
+        self.power_type = power_type
+        self.power_dv_mV = power_dv_mV
+        self.power_width_ns = power_width_ns
+        self.power_delay_ns = power_delay_ns
+    
+    def to_model(self) -> AttackSpec:
+        """Validated copy."""
+        return AttackSpec(**self._asdict())
+
+
+class ObservationRecord(_Record):
+    """Unvalidated Observation."""
+    __slots__ = ('raw_status', 'trigger_seen', 'trigger_cleared', 'led_state', 'notes')
+    
+    def __init__(
+        self,
+        raw_status: Dict[str, Any],
+        trigger_seen: bool,
+        trigger_cleared: bool,
+        led_state: Optional[str] = None,
+        notes: Optional[str] = None
+    ):
+        self.raw_status = raw_status
+        self.trigger_seen = trigger_seen
+        self.trigger_cleared = trigger_cleared
+        self.led_state = led_state
+        self.notes = notes
+    
+    def to_model(self) -> Observation:
+        """Validated copy."""
+        return Observation(**self._asdict())
+
+
+class TrialRecord(_Record):
+    """Unvalidated Trial; attack/observation may be models or records."""
+    __slots__ = ('trial_id', 'attack', 'trigger', 'observation', 'outcome', 'duration_s')
+    
+    def __init__(
+        self,
+        trial_id: int,
+        attack: Any,
+        trigger: TriggerSpec,
+        observation: Any = None,
+        outcome: Optional[Outcome] = None,
+        duration_s: Optional[float] = None
+    ):
+        self.trial_id = trial_id
+        self.attack = attack
+        self.trigger = trigger
+        self.observation = observation
+        self.outcome = outcome
+        self.duration_s = duration_s
+    
+    def to_model(self) -> Trial:
+        """Validated copy."""
+        return Trial(
+            trial_id=self.trial_id,
+            attack=self.attack.to_model() if isinstance(self.attack, AttackRecord) else self.attack,
+            trigger=self.trigger,
+            observation=self.observation.to_model() if isinstance(self.observation, ObservationRecord) else self.observation,
+            outcome=self.outcome,
+            duration_s=self.duration_s
+        )
+    
+    @classmethod
+    def from_event(cls, event: Dict[str, Any], trigger: TriggerSpec) -> "TrialRecord":
+        """Rebuild a trial from one of our own trial_complete log events."""
+        get = event.get
+        duration_ms = get('duration_ms')
+        return cls(
+            event['trial_id'],
+            AttackRecord(
+                event['tg_ns'],
+                event['delay_ns'],
+                _MODES.get(get('mode'), AttackMode.CLOCK_GLITCH),
+                _CLOCK_IMPLS.get(get('clock_impl'), ClockImpl.COMPRESS),
+                get('power_enabled', False),
+                get('power_type'),
+                get('power_dv_mV'),
+                get('power_width_ns'),
+                get('power_delay_ns')
+            ),
+            trigger,
+            ObservationRecord({}, get('trigger_seen', False), get('trigger_cleared', False), get('led_state')),
+            _OUTCOMES.get(get('outcome')),
+            duration_ms / 1000.0 if duration_ms is not None else None
+        )
+
+
+# Logged string -> enum member (dict lookup instead of Enum.__call__ per line)
+_MODES = {m.value: m for m in AttackMode}
+_CLOCK_IMPLS = {c.value: c for c in ClockImpl}
+_OUTCOMES = {o.value: o for o in Outcome}
+
+
+class TimingCaps(BaseModel):
+    """Stand timing resolution and ranges, as reported by GET_CAPS."""
+    delay_tick_ps: int = 1000
+    delay_min_ns: int = 0
+    delay_max_ns: int = 65535
+    tg_tick_ps: int = 1000
+    tg_min_ns: int = 0
+    tg_max_ns: int = 65535
+    
+    @staticmethod
+    def _snap(ns: int, tick_ps: int, lo: int, hi: int) -> int:
+        ticks = round(min(max(ns, lo), hi) * 1000 / tick_ps)
+        return int(round(ticks * tick_ps / 1000))
+    
+    def snap_delay_ns(self, ns: int) -> int:
+        """Nearest delay_ns the stand can realize."""
+        return self._snap(ns, self.delay_tick_ps, self.delay_min_ns, self.delay_max_ns)
+    
+    def snap_tg_ns(self, ns: int) -> int:
+        """Nearest tg_ns the stand can realize."""
+        return self._snap(ns, self.tg_tick_ps, self.tg_min_ns, self.tg_max_ns)
+    
+    def snap_point(self, point: dict) -> dict:
+        """Copy of a search point with tg_ns/delay_ns snapped (other fields untouched)."""
+        point = dict(point)
+        if 'tg_ns' in point:
+            point['tg_ns'] = self.snap_tg_ns(point['tg_ns'])
+        if 'delay_ns' in point:
+            point['delay_ns'] = self.snap_delay_ns(point['delay_ns'])
+        return point
+
+
+class StandCapabilities(BaseModel):
+    """
+    What the connected stand supports, negotiated via GET_CAPS.
+    
+    Defaults describe a baseline stand (JSON payloads, one frame per
+    command, status by polling), so fast paths stay off unless reported.
+    """
+    stand_id: Optional[str] = None
+    firmware_version: Optional[str] = None
+    message_types: List[int] = []  # MessageType codes handled by the stand
+    codecs: List[str] = ["json"]
+    max_payload: int = 255
+    timing: Optional[TimingCaps] = None
+    push_notifications: bool = False  # READ_STATUS pushed when the trigger fires
+    batching: bool = False  # commands may be pipelined without waiting for each ACK
+    sweep_max_tg: int = 0  # tg_ns values per SWEEP_START (0 = no autonomous sweeps)
+    ext_payload: int = 0  # max payload of extended-length frames (0 = classic frames only)
+    trace_len: int = 0  # bytes per TRACE_DUMP trace (0 = no traces)
+    target_beat_ms: int = 0  # target heartbeat period; target_idle_ms in READ_STATUS/PONG (0 = not reported)
+    
+    @property
+    def cache_key(self) -> Optional[str]:
+        """On-disk cache key: stand id + firmware version (None if not reported)."""
+        if not self.stand_id or not self.firmware_version:
+            return None
+        return f"{self.stand_id}@{self.firmware_version}"
+    
+    def supports(self, msg_type: int) -> bool:
+        """True if the stand reported handling msg_type."""
+        return int(msg_type) in self.message_types
 
 
 class StrategyConfig(BaseModel):
     """Configuration for attack strategy."""
-    name: Literal["grid", "random", "bayes", "bandit"] = "grid"
+    name: str = "grid"  # any name in ub.registry (built-in or plugin)
     params: Dict[str, Any] = {}
 
 
@@ -90,3 +298,9 @@ class CampaignConfig(BaseModel):
     strategy: StrategyConfig
     reset_policy: Literal["soft", "hard", "none"] = "soft"
     safety_pause_ms: int = 10
+    batch_size: int = 1  # attacks requested per Strategy.propose call
+    on_stand_sweep: bool = False  # run grid campaigns as autonomous stand sweeps when supported
+    capture_trace: bool = False  # pull a TRACE_DUMP per trial when the stand supports it
+    pipeline_depth: int = 0  # trials classified/logged in a worker thread (0 = inline); max outcome lag
+    stall_k: float = 8.0  # overdue = response slower than median + k*MAD of that command (0 = fixed timeouts)
+    stall_min_ms: float = 20.0  # lower bound of the overdue limit
@@ -1,8 +1,12 @@
 """
 Outcome classification from raw stand observations.
-Simple rule-based evaluator plus stubs for advanced methods.
+Simple rule-based evaluator plus a trainable NumPy classifier.
 """
 
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
 from .model import Observation, Outcome
 
 
@@ -15,6 +19,7 @@ class Evaluator:
         Classify trial outcome based on observation.
         
         Rules (Russian outcome labels):
+        - Target heartbeat stopped (host watchdog): HANG
         - No trigger seen: ERROR
         - Trigger seen + (LED ON or trigger cleared): SUCCESS
         - Hang detected: HANG
@@ -26,6 +31,11 @@ class Evaluator:
         Returns:
             Classified outcome
         """
+        # Target watchdog fired: the trial was aborted, whatever else was seen
+        raw = observation.raw_status
+        if raw.get('watchdog', False):
+            return Outcome.HANG
+        
         # Check for protocol/stand errors
         if not observation.trigger_seen:
             return Outcome.ERROR
@@ -35,29 +45,283 @@ class Evaluator:
             return Outcome.SUCCESS
         
         # Check for hang
-        raw = observation.raw_status
         if raw.get('hang', False):
             return Outcome.HANG
         
         # Default: no visible effect
         return Outcome.NO_EFFECT
+    
+    @staticmethod
+    def classify_many(columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Vectorized classify: the same rules over columnar arrays.
+        
+        Args:
+            columns: 'trigger_seen', 'trigger_cleared', 'hang' (bool arrays),
+                optional 'watchdog' (bool array) and 'led_state' (object array),
+                e.g. from observation_columns()
+        
+        Returns:
+            Object array of Outcome members, one per row
+        """
+        seen = np.asarray(columns['trigger_seen'], dtype=bool)
+        cleared = np.asarray(columns['trigger_cleared'], dtype=bool)
+        led_on = np.asarray(columns['led_state'], dtype=object) == "ON"
+        hang = np.asarray(columns['hang'], dtype=bool)
+        watchdog = np.asarray(columns.get('watchdog', np.zeros_like(seen)), dtype=bool)
+        codes = np.select(
+            [watchdog, ~seen, cleared | led_on, hang],
+            [_CODE[Outcome.HANG], _CODE[Outcome.ERROR], _CODE[Outcome.SUCCESS], _CODE[Outcome.HANG]],
+            _CODE[Outcome.NO_EFFECT]
+        )
+        return _OUTCOMES[codes]
+
+
+# Outcome <-> small integer code for vectorized rules
+_OUTCOMES = np.array(list(Outcome), dtype=object)
+_CODE = {outcome: code for code, outcome in enumerate(Outcome)}
 
 
 class MLClassifier:
     """
-    Machine learning-based outcome classifier (STUB).
+    Multinomial logistic regression over per-trial FEATURES (NumPy only).
     
-    Could use probabilistic classification based on richer signal features
-    (e.g., current spikes, timing anomalies, partial state changes).
+    Drop-in for Evaluator (``classify(observation)``); ``classify_many``
+    scores a whole feature matrix with one matrix product. Standardization
+    is folded into the weights, so inference is impute + matmul + argmax.
     """
     
-    def __init__(self):
-        raise NotImplementedError("🚧 Функция пока не реализована (ML классификатор)")
+    def __init__(self, l2: float = 1e-3):
+        """
+        Args:
+            l2: L2 penalty on the (standardized) weights
+        """
+        self.l2 = l2
+        self.classes: List[Outcome] = []
+        self.mean: Optional[np.ndarray] = None     # per-feature fill value for missing data
+        self.weights: Optional[np.ndarray] = None  # (features, classes), on raw feature scale
+        self.bias: Optional[np.ndarray] = None
+    
+    def fit(self, X: np.ndarray, y: Sequence[str], epochs: int = 500, lr: float = 0.5) -> 'MLClassifier':
+        """
+        Fit on a feature matrix (NaN = missing) and outcome labels.
+        
+        Args:
+            X: (trials, len(FEATURES)) matrix
+            y: Outcome values per row
+            epochs: Full-batch gradient steps
+            lr: Step size
+        """
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        self.classes = [Outcome(c) for c in sorted(set(y.tolist()))]
+        codes = np.searchsorted([c.value for c in self.classes], y)
+        
+        with np.errstate(invalid='ignore'):
+            mean = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(X.shape[1])
+            Z = np.where(np.isnan(X), mean, X) - mean
+            scale = np.sqrt((Z ** 2).mean(axis=0)) if len(X) else np.ones(X.shape[1])
+        scale[scale == 0] = 1.0
+        Z /= scale
+        
+        n, k = len(Z), len(self.classes)
+        Y = np.zeros((n, k))
+        Y[np.arange(n), codes] = 1.0
+        W = np.zeros((Z.shape[1], k))
+        b = np.zeros(k)
+        for _ in range(epochs):
+            logits = Z @ W + b
+            logits -= logits.max(axis=1, keepdims=True)
+            P = np.exp(logits)
+            P /= P.sum(axis=1, keepdims=True)
+            G = (P - Y) / n
+            W -= lr * (Z.T @ G + self.l2 * W)
+            b -= lr * G.sum(axis=0)
+        
+        # Fold standardization: (x - mean) / scale @ W + b == x @ W' + b'
+        self.mean = mean
+        self.weights = W / scale[:, None]
+        self.bias = b - (mean / scale) @ W
+        return self
+    
+    def classify_many(self, X: np.ndarray) -> np.ndarray:
+        """Class index (into ``classes``) per row of a feature matrix."""
+        if self.weights is None:
+            raise RuntimeError("Модель не обучена (train/fit или load)")
+        X = np.asarray(X, dtype=float)
+        X = np.where(np.isnan(X), self.mean, X)
+        return np.argmax(X @ self.weights + self.bias, axis=1)
+    
+    def outcomes(self, codes: np.ndarray) -> np.ndarray:
+        """Outcome values (strings) for class indices from classify_many."""
+        return np.array([c.value for c in self.classes], dtype=object)[codes]
     
     def classify(self, observation: Observation) -> Outcome:
-        """Probabilistic outcome classification."""
-        raise NotImplementedError()
+        """Classify one trial (same interface as Evaluator.classify)."""
+        row = {
+            'trigger_seen': observation.trigger_seen,
+            'trigger_cleared': observation.trigger_cleared,
+            'led_state': observation.led_state,
+            **observation_fields(observation)
+        }
+        return self.classes[int(self.classify_many(feature_matrix([row]))[0])]
     
-    def train(self, observations: list, labels: list) -> None:
-        """Train classifier on labeled data."""
-        raise NotImplementedError()
+    def train(self, sqlite_path: str, use_outcome: bool = False, holdout: float = 0.2, seed: int = 0) -> Dict[str, Any]:
+        """
+        Train from a SQLite export.
+        
+        Labels come from the ``labels`` table (trial_id, outcome), filled by
+        hand or by another tool; with use_outcome, unlabelled trials fall
+        back to the logged (rule-based) outcome.
+        
+        Returns:
+            Metrics: trials used, holdout accuracy, per-class counts
+        """
+        X, y = load_training_data(sqlite_path, use_outcome)
+        if len(y) == 0:
+            raise ValueError(f"Нет размеченных испытаний в {sqlite_path} (таблица labels)")
+        
+        order = np.random.default_rng(seed).permutation(len(y))
+        n_test = int(len(y) * holdout) if len(y) >= 10 else 0
+        test, fit = order[:n_test], order[n_test:]
+        self.fit(X[fit], y[fit])
+        
+        metrics = {
+            'trials': int(len(y)),
+            'classes': {c: int((y == c).sum()) for c in sorted(set(y.tolist()))},
+            'accuracy': None,
+        }
+        if n_test:
+            predicted = self.outcomes(self.classify_many(X[test]))
+            metrics['accuracy'] = float((predicted == y[test]).mean())
+        # Final model uses every labelled trial
+        self.fit(X, y)
+        return metrics
+    
+    def save(self, path: str) -> None:
+        """Persist the model as .npz."""
+        if self.weights is None:
+            raise RuntimeError("Модель не обучена (train/fit или load)")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            features=np.array(FEATURES),
+            classes=np.array([c.value for c in self.classes]),
+            mean=self.mean,
+            weights=self.weights,
+            bias=self.bias,
+            l2=self.l2
+        )
+    
+    @classmethod
+    def load(cls, path: str) -> 'MLClassifier':
+        """Load a model saved by save()."""
+        with np.load(path) as data:
+            if tuple(data['features'].tolist()) != FEATURES:
+                raise ValueError(f"Модель {path} обучена на другом наборе признаков")
+            model = cls(l2=float(data['l2']))
+            model.classes = [Outcome(c) for c in data['classes'].tolist()]
+            model.mean = data['mean']
+            model.weights = data['weights']
+            model.bias = data['bias']
+        return model
+
+
+# ----------------------------------------------------------------------
+# Per-trial features: flat columns in the JSONL log / SQLite export
+# ----------------------------------------------------------------------
+
+# Model inputs; led_state is one-hot encoded, missing values are NaN
+FEATURES = (
+    'trigger_seen', 'trigger_cleared', 'led_on', 'led_blink', 'hang',
+    'rtt_arm_ms', 'rtt_fire_ms', 'rtt_status_ms',
+    'trace_min', 'trace_argmin', 'trace_mean',
+)
+
+# Same features as SQL expressions over the trials table
+_FEATURE_SQL = (
+    't.trigger_seen', 't.trigger_cleared', "t.led_state = 'ON'", "t.led_state = 'BLINK'", 't.hang',
+    't.rtt_arm_ms', 't.rtt_fire_ms', 't.rtt_status_ms',
+    't.trace_min', 't.trace_argmin', 't.trace_mean',
+)
+
+
+def observation_fields(observation: Observation) -> Dict[str, Any]:
+    """
+    Flat feature fields from raw_status (hang flag, command RTTs, trace summary).
+    
+    Only present values are returned, so trials without RTTs or traces
+    (e.g. autonomous sweeps) keep compact log lines.
+    """
+    raw = observation.raw_status
+    fields = {}
+    if 'hang' in raw:
+        fields['hang'] = bool(raw['hang'])
+    for key, value in (raw.get('rtt_ms') or {}).items():
+        fields[f'rtt_{key}_ms'] = value
+    trace = raw.get('trace')
+    if trace:
+        fields.update(trace_min=trace['min'], trace_argmin=trace['argmin'], trace_mean=trace['mean'])
+    return fields
+
+
+def observation_columns(events: Iterable[Mapping[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Columnar arrays for Evaluator.classify_many from trial_complete events.
+    
+    Values come from the persisted raw_status when present (logs written
+    before it fall back to the flat fields).
+    """
+    trial_id, seen, cleared, led, hang, watchdog = [], [], [], [], [], []
+    for event in events:
+        raw = event.get('raw_status') or {}
+        trial_id.append(event['trial_id'])
+        seen.append(raw.get('trigger_seen', event.get('trigger_seen', False)))
+        cleared.append(raw.get('trigger_cleared', event.get('trigger_cleared', False)))
+        led.append(raw.get('led_state', event.get('led_state')))
+        hang.append(raw.get('hang', event.get('hang', False)))
+        watchdog.append(raw.get('watchdog', False))
+    return {
+        'trial_id': np.array(trial_id, dtype=np.int64),
+        'trigger_seen': np.array(seen, dtype=bool),
+        'trigger_cleared': np.array(cleared, dtype=bool),
+        'led_state': np.array(led, dtype=object),
+        'hang': np.array(hang, dtype=bool),
+        'watchdog': np.array(watchdog, dtype=bool),
+    }
+
+
+def feature_matrix(rows: Iterable[Mapping[str, Any]]) -> np.ndarray:
+    """(trials, len(FEATURES)) float matrix from log events or flat dicts."""
+    nan = float('nan')
+    data = []
+    for row in rows:
+        led = row.get('led_state')
+        hang = row.get('hang')
+        data.append((
+            float(bool(row.get('trigger_seen'))),
+            float(bool(row.get('trigger_cleared'))),
+            float(led == 'ON'),
+            float(led == 'BLINK'),
+            nan if hang is None else float(hang),
+            *(nan if row.get(key) is None else float(row[key]) for key in FEATURES[5:])
+        ))
+    return np.array(data, dtype=float).reshape(-1, len(FEATURES))
+
+
+def load_training_data(sqlite_path: str, use_outcome: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Feature matrix and labels from a SQLite export (labels table, optionally outcome)."""
+    label = 'COALESCE(l.outcome, t.outcome)' if use_outcome else 'l.outcome'
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        conn.execute('CREATE TABLE IF NOT EXISTS labels (trial_id INTEGER PRIMARY KEY, outcome TEXT)')
+        rows = conn.execute(f'''
+            SELECT {', '.join(_FEATURE_SQL)}, {label}
+            FROM trials t LEFT JOIN labels l USING (trial_id)
+            WHERE {label} IS NOT NULL
+        ''').fetchall()
+    finally:
+        conn.close()
+    X = np.array([row[:-1] for row in rows], dtype=float).reshape(-1, len(FEATURES))
+    y = np.array([row[-1] for row in rows], dtype=object)
+    return X, y
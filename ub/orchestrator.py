@@ -3,30 +3,55 @@ Orchestrator: FSM to run trials from campaign config.
 Minimal, readable, fails fast - research mode.
 """
 
+import contextlib
 import time
 import random
+from collections import deque
+import numpy as np
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
 from .model import (
     CampaignConfig, Trial, AttackSpec, TriggerSpec, 
-    Observation, Outcome, StrategyConfig
+    Outcome, StrategyConfig, TimingCaps, StandCapabilities,
+    AttackRecord, ObservationRecord, TrialRecord
+)
+from .protocol import (
+    MessageType, encode_frame, decode_stream, encode_json_payload, decode_json_payload,
+    encode_sweep, decode_sweep_records, SWEEP_DONE_PAYLOAD, PONG_PAYLOAD,
+    FLAG_TRIGGER_SEEN, FLAG_TRIGGER_CLEARED, FLAG_HANG, LED_STATES
 )
-from .protocol import MessageType, encode_frame, decode_stream, encode_json_payload, decode_json_payload
 from .serial_link import SerialLink
+from .emulator import StandEmulator
 from .strategy import create_strategy, Strategy
-from .observe import Evaluator
-from .storage import EventStoreJSONL
+from .observe import Evaluator, MLClassifier, observation_fields
+from .storage import EventStore, count_events, event_log_path, load_stand_caps, open_event_store, save_stand_caps
+from .transfer import fetch_trace
+from .pipeline import TrialPipeline
+from .watchdog import StallDetector, TrialHang, TrialStall
+from .traces import TraceStore
 
 
 class Orchestrator:
     """Main orchestrator for running glitch campaigns."""
     
-    def __init__(self, config: dict):
+    # Autonomous sweep: abort if the stand sends nothing for this long
+    SWEEP_IDLE_TIMEOUT_S = 2.0
+    # Target watchdog: heartbeat gap limit before warmup, in beat periods
+    TARGET_MISSED_BEATS = 4
+    # Push wait: PING period for the target heartbeat
+    PING_INTERVAL_S = 0.02
+    
+    # Commands safe to send twice after a lost frame (repeating them leaves the
+    # stand in the same state); FIRE, resets and SWEEP_START are never resent
+    RESENDABLE = frozenset({MessageType.READ_STATUS, MessageType.SET_ATTACK, MessageType.ARM_TRIGGERS})
+    
+    def __init__(self, config: dict, resume: bool = False):
         """
         Initialize orchestrator from config dictionary.
         
         Args:
             config: Full configuration dictionary loaded from YAML
+            resume: Continue after the trials already in the event log
         """
         self.config = config
         
@@ -38,7 +63,13 @@ class Orchestrator:
             trigger=TriggerSpec(**campaign_cfg['trigger']),
             strategy=StrategyConfig(**campaign_cfg['strategy']),
             reset_policy=campaign_cfg['reset_policy'],
-            safety_pause_ms=campaign_cfg['safety_pause_ms']
+            safety_pause_ms=campaign_cfg['safety_pause_ms'],
+            batch_size=campaign_cfg.get('batch_size', 1),
+            capture_trace=campaign_cfg.get('capture_trace', False),
+            pipeline_depth=campaign_cfg.get('pipeline_depth', 0),
+            stall_k=campaign_cfg.get('stall_k', 8.0),
+            stall_min_ms=campaign_cfg.get('stall_min_ms', 20.0),
+            on_stand_sweep=campaign_cfg.get('on_stand_sweep', False)
         )
         
         # Serial config
@@ -53,11 +84,43 @@ class Orchestrator:
             self.campaign.trigger
         )
         
-        # Evaluator
-        self.evaluator = Evaluator()
+        # Stall limits learned from stand response times (stall_k: 0 = fixed timeouts only)
+        self.stall_detector = StallDetector(k=self.campaign.stall_k, min_ms=self.campaign.stall_min_ms)
+        
+        # Evaluator: rules, or a trained MLClassifier (observe.model_path)
+        model_path = (config.get('observe') or {}).get('model_path')
+        if model_path:
+            self.evaluator = MLClassifier.load(model_path)
+            print(f"🧠 Классификатор: {model_path} ({', '.join(c.value for c in self.evaluator.classes)})")
+        else:
+            self.evaluator = Evaluator()
         
         # Trial history
-        self.trials: List[Trial] = []
+        self.trials: List[TrialRecord] = []
+        
+        # Stand capabilities (GET_CAPS), negotiated once per session
+        self.caps = StandCapabilities()
+        self.timing: Optional[TimingCaps] = None
+        # Frames that arrived after the awaited ACKs (e.g. a pushed status)
+        self._stash: deque = deque()
+        # Memory-mapped trace rows under artifacts_dir (None = traces not captured)
+        self._traces: Optional[TraceStore] = None
+        # On-stand sweep axes after snapping (set by _sweep_supported)
+        self._sweep: Optional[Tuple[List[int], Tuple[int, int, int]]] = None
+        # Target was already reset by _recover: the next _reset_victim is skipped
+        self._recovered = False
+        
+        # On resume, skip what the existing log already covers
+        self.start_trial = self._count_logged_trials() if resume else 0
+        if self.start_trial:
+            if not self.strategy.resumable:
+                # A cold restart would silently repeat points the log already covers
+                raise ValueError(
+                    f"Стратегия «{self.campaign.strategy.name}» не поддерживает возобновление "
+                    f"(в логе уже {self.start_trial} испытаний): запустите новую кампанию (run) "
+                    f"с новым путём лога в storage (для случайного порядка обхода задайте strategy.params.seed)"
+                )
+            self.strategy.seek(self.start_trial)
         
         # Set random seed
         seed = config['app'].get('seed')
@@ -74,15 +137,21 @@ class Orchestrator:
         artifacts_dir = Path(self.config['app']['artifacts_dir'])
         artifacts_dir.mkdir(parents=True, exist_ok=True)
         
-        # Open serial link
-        with SerialLink(
+        # Open serial link (or the in-process firmware emulator)
+        emulated = self.serial_config['port'] == 'emulator'
+        link_cls = StandEmulator if emulated else SerialLink
+        # Emulator only: simulated loss of host frames (bad CRC)
+        link_opts = {'drop_frames': self.serial_config.get('emulator_drop_frames', 0.0)} if emulated else {}
+        with link_cls(
             self.serial_config['port'],
             self.serial_config['baudrate'],
-            self.serial_config['timeout_s']
+            self.serial_config['timeout_s'],
+            **link_opts
         ) as link:
             # Wait for Arduino to reset and initialize (DTR reset)
-            print("⏳ Ожидание инициализации стенда...")
-            time.sleep(2.5)  # Arduino resets when serial opens
+            if not emulated:
+                print("⏳ Ожидание инициализации стенда...")
+                time.sleep(2.5)  # Arduino resets when serial opens
             
             # Flush any startup noise
             link.flush_input()
@@ -109,48 +178,388 @@ class Orchestrator:
             except Exception as e:
                 print(f"⚠️  Ошибка PING: {e}")
             
-            # Open event store
-            with EventStoreJSONL(self.storage_config['jsonl_path']) as store:
+            # Capabilities: fast paths and timing resolution for this stand
+            self.caps = self._negotiate_caps(link, artifacts_dir)
+            self.timing = self.caps.timing
+            
+            # Open event store (and the trace store, if traces are captured)
+            with open_event_store(self.storage_config) as store, \
+                    self._open_traces(artifacts_dir) as traces:
+                self._traces = traces
+                store.append({'event_type': 'stand_caps', **self.caps.model_dump(exclude={'timing'})})
+                if self.timing is not None:
+                    # Snap and deduplicate points before scheduling
+                    self._apply_timing(store)
+                
                 # Main campaign loop
-                trial_count = 0
+                trial_count = self.start_trial
+                if trial_count:
+                    print(f"⏯️  Продолжение с испытания #{trial_count + 1}")
                 
-                while trial_count < self.campaign.max_trials:
-                    # Ask strategy for next attack(s)
-                    attacks = self.strategy.propose(self.trials, n=1)
-                    
-                    if not attacks:
+                if self._sweep_supported():
+                    self._run_sweep(link, store, trial_count)
+                else:
+                    self._run_trials(link, store, trial_count)
+        
+        print(f"✅ Кампания завершена. Всего испытаний: {len(self.trials)}")
+        self._print_costs()
+        print(f"📦 Логи: {event_log_path(self.storage_config)}")
+    
+    def _run_trials(self, link: SerialLink, store: EventStore, trial_count: int) -> None:
+        """
+        Host-driven campaign: one command round-trip sequence per trial.
+        
+        Classification and logging run in a TrialPipeline; the strategy
+        sees every outcome except at most ``pipeline_depth`` of the most
+        recent trials. Results are printed when collected, so all console
+        output comes from this thread.
+        """
+        def sink(trial):
+            self._log_trial(store, trial, flush=False)
+        
+        with TrialPipeline(self.evaluator.classify, sink, store.flush, self.campaign.pipeline_depth) as pipeline:
+            while trial_count < self.campaign.max_trials:
+                self._observe_trials(pipeline.collect())
+                
+                # Ask strategy for the next batch of attacks
+                batch = min(self.campaign.batch_size, self.campaign.max_trials - trial_count)
+                attacks = self.strategy.propose(self.trials, n=batch)
+                if not attacks:
+                    # Outcomes still in flight may open new points (refinement, next rung)
+                    self._observe_trials(pipeline.collect(0))
+                    attacks = self.strategy.propose(self.trials, n=batch)
+                
+                if not attacks:
+                    if self.strategy.pending:
+                        print("⚠️  Стратегия ждёт исходов, которых нет в журнале — остановка")
+                    else:
                         print("✅ Стратегия исчерпана (нет больше точек)")
+                    break
+                
+                for attack in attacks:
+                    if trial_count >= self.campaign.max_trials:
                         break
                     
-                    for attack in attacks:
-                        if trial_count >= self.campaign.max_trials:
-                            break
-                        
-                        trial_count += 1
-                        
-                        # Run trial
-                        trial = self._run_trial(
-                            link, 
-                            trial_count, 
-                            attack, 
-                            self.campaign.trigger
-                        )
-                        
-                        # Store trial
+                    trial_count += 1
+                    
+                    # Run trial, measuring its wall-time cost (I/O only)
+                    start = time.perf_counter()
+                    trial = self._run_trial(
+                        link, 
+                        trial_count, 
+                        attack, 
+                        self.campaign.trigger
+                    )
+                    trial.duration_s = time.perf_counter() - start
+                    
+                    # Classify, log and print off the serial path
+                    pipeline.submit(trial)
+                    self._observe_trials(pipeline.collect())
+                    
+                    # Safety pause
+                    if self.campaign.safety_pause_ms > 0:
+                        time.sleep(self.campaign.safety_pause_ms / 1000.0)
+            
+            self._observe_trials(pipeline.collect(0))
+    
+    def _observe_trials(self, trials: List[TrialRecord]) -> None:
+        """Print and store classified trials and feed them to the strategy."""
+        if not trials:
+            return
+        self.trials.extend(trials)
+        for trial in trials:
+            self._print_trial_result(trial)
+            self.strategy.costs.observe(trial)
+        self.strategy.observe(trials)
+    
+    def _sweep_supported(self) -> bool:
+        """True if this campaign should run as autonomous stand sweeps."""
+        if not self.campaign.on_stand_sweep:
+            return False
+        if self.campaign.strategy.name != 'grid' or 'space' in self.campaign.strategy.params:
+            print("⚠️  Автономный проход поддерживает только grid по tg_ns × delay_ns, запуск с хоста")
+            return False
+        if not (self.caps.supports(MessageType.SWEEP_START) and self.caps.sweep_max_tg > 0):
+            print("⚠️  Стенд не поддерживает автономный проход (SWEEP_START), запуск с хоста")
+            return False
+        self._sweep = self._sweep_axes()
+        if self._sweep is None:
+            print("⚠️  После квантования значения delay_ns идут неравномерно (шаг не кратен тику стенда), "
+                  "автономный проход их не выразит — запуск с хоста")
+            return False
+        return True
+    
+    def _sweep_axes(self) -> Optional[Tuple[List[int], Tuple[int, int, int]]]:
+        """
+        Sweep axes snapped to the stand timing: (tg_ns values, (delay start, stop, step)).
+        
+        Values that collapse onto the same tick are dropped, as in the grid
+        strategy, so sweep positions match its grid. None if the snapped
+        delays are not evenly spaced (SWEEP_START only takes a range).
+        """
+        params = self.campaign.strategy.params
+        tg_ns_values = list(params.get('tg_ns', [100]))
+        delay_ns_config = params.get('delay_ns', {'start': 0, 'stop': 1000, 'step': 100})
+        delays = list(range(delay_ns_config['start'], delay_ns_config['stop'], delay_ns_config['step']))
+        if self.timing is not None:
+            tg_ns_values = list(dict.fromkeys(map(self.timing.snap_tg_ns, tg_ns_values)))
+            delays = list(dict.fromkeys(map(self.timing.snap_delay_ns, delays)))
+        if not delays:
+            return None
+        step = delays[1] - delays[0] if len(delays) > 1 else delay_ns_config['step']
+        if any(b - a != step for a, b in zip(delays, delays[1:])):
+            return None
+        return tg_ns_values, (delays[0], delays[-1] + 1, step)
+    
+    def _open_traces(self, artifacts_dir: Path):
+        """Trace store context if traces are wanted and the stand has them."""
+        if not self.campaign.capture_trace:
+            return contextlib.nullcontext()
+        if not (self.caps.supports(MessageType.TRACE_DUMP) and self.caps.trace_len > 0):
+            print("⚠️  Стенд не поддерживает TRACE_DUMP, трассы не снимаются")
+            return contextlib.nullcontext()
+        path = self.storage_config.get('traces_dir', str(artifacts_dir / 'traces'))
+        traces = TraceStore(path, width=self.caps.trace_len, dtype='uint8')
+        mode = f"расширенные кадры до {self.caps.ext_payload} Б" if self.caps.ext_payload else "обычные кадры"
+        print(f"📈 Трассы: {self.caps.trace_len} отсчётов, {mode} → {path} ({len(traces)} записано)")
+        return traces
+    
+    def _fetch_trace(self, link: SerialLink, trial_id: int) -> np.ndarray:
+        """Pull the current trace straight into the next store row (returns a view of it)."""
+        row = self._traces.reserve(trial_id)
+        view = fetch_trace(
+            link,
+            row,
+            extended=self.caps.ext_payload > 0,
+            max_payload=self.caps.ext_payload,
+            idle_timeout_s=self.serial_config['timeout_s']
+        )
+        self._traces.commit(trial_id, len(view))
+        return row[:len(view)]
+    
+    @staticmethod
+    def _trace_summary(trace: np.ndarray) -> dict:
+        """Compact per-trial trace features (the trace itself lives in the trace store)."""
+        return {
+            'len': int(trace.size),
+            'min': int(trace.min()),
+            'argmin': int(trace.argmin()),
+            'mean': round(float(trace.mean()), 3),
+        }
+    
+    def _run_sweep(self, link: SerialLink, store: EventStore, trial_count: int) -> None:
+        """
+        Autonomous campaign: the stand runs the grid and streams result records.
+        
+        The grid (tg_ns list x delay_ns range x repeats_per_point, tg-major,
+        snapped to the stand timing by _sweep_axes) is uploaded in
+        SWEEP_START frames of at most ``sweep_max_tg`` tg_ns values each;
+        trial ids are grid positions + 1, so resume continues from the
+        number of logged trials like the grid strategy does.
+        """
+        params = self.campaign.strategy.params
+        tg_ns_values, (delay_start, delay_stop, delay_step) = self._sweep
+        repeats = params.get('repeats_per_point', 1)
+        n_delay = len(range(delay_start, delay_stop, delay_step))
+        trigger = self.campaign.trigger
+        base = AttackSpec(tg_ns=tg_ns_values[0], delay_ns=delay_start)
+        
+        print(f"🛰️  Автономный проход на стенде: {len(tg_ns_values) * n_delay * repeats} испытаний")
+        self._reset_victim(link)
+        self._send_commands(link, [
+            (MessageType.SET_ATTACK, self._attack_payload(base)),
+            (MessageType.ARM_TRIGGERS, {
+                'kind': trigger.kind.value,
+                'edge': trigger.edge,
+                'timeout_ms': trigger.timeout_ms
+            }),
+        ])
+        
+        offset = 0  # grid positions covered by earlier tg_ns chunks
+        chunk = self.caps.sweep_max_tg
+        for i in range(0, len(tg_ns_values), chunk):
+            tg_chunk = tg_ns_values[i:i + chunk]
+            size = len(tg_chunk) * n_delay * repeats
+            start = max(0, trial_count - offset)
+            count = min(size - start, self.campaign.max_trials - trial_count)
+            if count > 0:
+                payload = encode_sweep(tg_chunk, delay_start, delay_stop, delay_step, repeats, start, count)
+                trial_count += self._stream_sweep(link, store, payload, base, offset)
+            offset += size
+            if trial_count >= self.campaign.max_trials:
+                break
+    
+    def _stream_sweep(
+        self,
+        link: SerialLink,
+        store: EventStore,
+        payload: bytes,
+        base: AttackSpec,
+        offset: int
+    ) -> int:
+        """Start one sweep, log its streamed records until SWEEP_DONE; returns trials logged."""
+        self._send_command(link, MessageType.SWEEP_START, payload)
+        
+        buffer = bytearray()
+        logged = 0
+        last = time.perf_counter()
+        while True:
+            # Records may already have arrived together with the ACK
+            frames = list(self._stash)
+            self._stash.clear()
+            data = link.read_available()
+            if data:
+                buffer.extend(data)
+                frames.extend(decode_stream(buffer))
+            if not frames:
+                if time.perf_counter() - last > self.SWEEP_IDLE_TIMEOUT_S:
+                    print(f"⚠️  Стенд молчит {self.SWEEP_IDLE_TIMEOUT_S:g} с, проход прерван")
+                    self._send_command(link, MessageType.SOFT_RESET, {})
+                    return logged
+                time.sleep(0.005)
+                continue
+            
+            now = time.perf_counter()
+            for frame_type, frame_payload in frames:
+                if frame_type == MessageType.SWEEP_RESULT:
+                    records = decode_sweep_records(frame_payload)
+                    # Wall time per trial, amortized over the frame
+                    duration_s = (now - last) / max(1, len(records))
+                    for record in records:
+                        trial = self._sweep_trial(record, base, offset, duration_s)
                         self.trials.append(trial)
-                        
-                        # Log to JSONL
-                        self._log_trial(store, trial)
-                        
-                        # Print outcome
+                        self.strategy.costs.observe(trial)
+                        self._log_trial(store, trial, flush=False)
                         self._print_trial_result(trial)
-                        
-                        # Safety pause
-                        if self.campaign.safety_pause_ms > 0:
-                            time.sleep(self.campaign.safety_pause_ms / 1000.0)
+                        logged += 1
+                    last = now
+                elif frame_type == MessageType.SWEEP_DONE:
+                    store.flush()
+                    done, = SWEEP_DONE_PAYLOAD.unpack(frame_payload)
+                    print(f"🛰️  Проход завершён на стенде: {done} испытаний")
+                    return logged
+            store.flush()
+            last = now
+    
+    def _sweep_trial(self, record: tuple, base: AttackSpec, offset: int, duration_s: float) -> TrialRecord:
+        """Trial from one SWEEP_RESULT record, classified like a host-driven one."""
+        index, tg_ns, delay_ns, flags, led = record
+        status = {
+            'trigger_seen': bool(flags & FLAG_TRIGGER_SEEN),
+            'trigger_cleared': bool(flags & FLAG_TRIGGER_CLEARED),
+            'led_state': LED_STATES[led] if led < len(LED_STATES) else None,
+            'hang': bool(flags & FLAG_HANG),
+        }
+        # Fixed-layout binary record decoded by struct: build the unvalidated twins
+        observation = ObservationRecord(status, status['trigger_seen'], status['trigger_cleared'], status['led_state'])
+        return TrialRecord(
+            offset + index + 1,
+            AttackRecord(tg_ns, delay_ns, base.mode, base.clock_impl),
+            self.campaign.trigger,
+            observation,
+            self.evaluator.classify(observation),
+            duration_s
+        )
+    
+    def _count_logged_trials(self) -> int:
+        """Number of completed trials already in the event log."""
+        return count_events(event_log_path(self.storage_config), 'trial_complete')
+    
+    def _negotiate_caps(self, link: SerialLink, artifacts_dir: Path) -> StandCapabilities:
+        """
+        Query stand capabilities via GET_CAPS, using the on-disk cache.
         
-        print(f"✅ Кампания завершена. Всего испытаний: {len(self.trials)}")
-        print(f"📦 Логи: {self.storage_config['jsonl_path']}")
+        Only the identity section is queried when the stand id + firmware
+        version is already cached. Stands without GET_CAPS get baseline
+        capabilities (no fast paths, no timing snapping).
+        """
+        ident = self._request(link, MessageType.GET_CAPS, {'section': 'id'})
+        if not ident:
+            print("ℹ️  Стенд не поддерживает GET_CAPS: базовый режим, точки не квантуются")
+            return StandCapabilities()
+        if 'stand_id' not in ident:
+            # Early firmware: timing section only
+            return StandCapabilities(timing=self._parse_timing(ident))
+        
+        caps = StandCapabilities(stand_id=str(ident['stand_id']), firmware_version=str(ident.get('fw', '')))
+        cache_path = self.storage_config.get('caps_cache', str(artifacts_dir / 'stand_caps.json'))
+        key = caps.cache_key
+        
+        cached = load_stand_caps(cache_path, key) if key else None
+        if cached is not None:
+            caps = StandCapabilities.model_validate(cached)
+            print(f"📇 Стенд {key}: возможности из кэша")
+        else:
+            proto = self._request(link, MessageType.GET_CAPS, {'section': 'proto'}) or {}
+            timing = self._request(link, MessageType.GET_CAPS, {'section': 'timing'})
+            caps = caps.model_copy(update={
+                'message_types': proto.get('types', []),
+                'codecs': proto.get('codecs', ['json']),
+                'max_payload': proto.get('max_payload', 255),
+                'push_notifications': proto.get('push', False),
+                'batching': proto.get('batch', False),
+                'sweep_max_tg': proto.get('sweep_tg', 0),
+                'ext_payload': proto.get('ext_payload', 0),
+                'trace_len': proto.get('trace_len', 0),
+                'target_beat_ms': proto.get('target_beat_ms', 0),
+                'timing': self._parse_timing(timing) if timing else None,
+            })
+            if key:
+                save_stand_caps(cache_path, key, caps.model_dump())
+            print(f"📇 Стенд {key}: возможности получены")
+        
+        fast = [name for name, on in (('пакетные команды', caps.batching),
+                                      ('push-статус', caps.push_notifications),
+                                      ('автономный проход', caps.sweep_max_tg > 0)) if on]
+        print(f"⚡ Быстрые пути: {', '.join(fast) if fast else 'нет'}")
+        if caps.target_beat_ms > 0:
+            print(f"💓 Сторож цели: пульс каждые {caps.target_beat_ms} мс")
+        return caps
+    
+    @staticmethod
+    def _parse_timing(payload: dict) -> TimingCaps:
+        return TimingCaps(**{k: v for k, v in payload.items() if k in TimingCaps.model_fields})
+    
+    def _apply_timing(self, store: EventStore) -> None:
+        """Snap the strategy to the stand timing and log how many points collapsed."""
+        print(f"⏱️  Разрешение стенда: delay {self.timing.delay_tick_ps / 1000:g} нс, "
+              f"tg {self.timing.tg_tick_ps / 1000:g} нс")
+        event = {'event_type': 'timing_caps', **self.timing.model_dump()}
+        
+        collapsed = self.strategy.apply_timing(self.timing)
+        if collapsed is not None:
+            points, distinct = collapsed
+            event.update(points_total=points, points_distinct=distinct)
+            if distinct < points:
+                print(f"🧮 Квантование: {points} точек → {distinct} различных "
+                      f"(схлопнулось {points - distinct})")
+        store.append(event)
+    
+    def _request(
+        self,
+        link: SerialLink,
+        msg_type: MessageType,
+        payload_dict: Optional[dict] = None,
+        timeout_s: float = 0.5
+    ) -> Optional[dict]:
+        """Send a query and return the JSON payload of the same-type reply (None on NACK/timeout)."""
+        payload = encode_json_payload(payload_dict) if payload_dict else b''
+        link.write(encode_frame(msg_type, payload))
+        
+        start = time.time()
+        buffer = bytearray()
+        
+        while time.time() - start < timeout_s:
+            data = link.read_available()
+            if data:
+                buffer.extend(data)
+                for frame_type, frame_payload in decode_stream(buffer):
+                    if frame_type == msg_type and frame_payload:
+                        return decode_json_payload(frame_payload)
+                    if frame_type == MessageType.NACK:
+                        return None
+            time.sleep(0.01)
+        return None
     
     def _run_trial(
         self, 
@@ -158,7 +567,7 @@ class Orchestrator:
         trial_id: int, 
         attack: AttackSpec,
         trigger: TriggerSpec
-    ) -> Trial:
+    ) -> TrialRecord:
         """
         Execute a single trial.
         
@@ -169,63 +578,112 @@ class Orchestrator:
             trigger: Trigger configuration
         
         Returns:
-            Completed Trial object
+            Trial with its observation (outcome set here only on errors;
+            otherwise classified by the post-processing pipeline)
         """
-        # Create trial
-        trial = Trial(
-            trial_id=trial_id,
-            attack=attack,
-            trigger=trigger
-        )
+        self._stash.clear()
+        
+        # Create trial (internal data: no validation; the stand reply below is validated)
+        trial = TrialRecord(trial_id, attack, trigger)
+        trigger_seen = False
         
         try:
             # Step 1: Optional reset
             self._reset_victim(link)
             
-            # Step 2: Configure attack
-            self._send_command(link, MessageType.SET_ATTACK, {
-                'mode': attack.mode.value,
-                'clock_impl': attack.clock_impl.value,
-                'tg_ns': attack.tg_ns,
-                'delay_ns': attack.delay_ns
-            })
-            
-            # Step 3: Arm triggers
-            self._send_command(link, MessageType.ARM_TRIGGERS, {
+            # Step 2-3: Configure attack and arm triggers
+            arm = {
                 'kind': trigger.kind.value,
                 'edge': trigger.edge,
                 'timeout_ms': trigger.timeout_ms
-            })
+            }
+            if self.caps.push_notifications:
+                arm['push'] = True
+            commands = [
+                (MessageType.SET_ATTACK, self._attack_payload(attack)),
+                (MessageType.ARM_TRIGGERS, arm),
+            ]
+            # Command round-trip times are classifier features (timing anomalies)
+            rtt_start = time.perf_counter()
+            if self.caps.batching:
+                # Fast path: both frames go out back to back, ACKs collected together
+                self._send_commands(link, commands)
+            else:
+                for msg_type, payload in commands:
+                    self._send_command(link, msg_type, payload)
+            rtt_arm = time.perf_counter() - rtt_start
             
-            # Step 4: Wait for trigger (poll status)
-            trigger_seen = self._wait_for_trigger(link, trigger.timeout_ms)
+            # Step 4: Wait for trigger (pushed status or polling)
+            if self.caps.push_notifications:
+                trigger_seen = self._wait_for_push(link, trigger.timeout_ms)
+            else:
+                trigger_seen = self._wait_for_trigger(link, trigger.timeout_ms)
             
             # Step 5: Fire glitch
+            rtt_start = time.perf_counter()
             self._send_command(link, MessageType.FIRE, {})
+            rtt_fire = time.perf_counter() - rtt_start
             
             # Step 6: Read observation
             time.sleep(0.05)  # Short observation window
+            rtt_start = time.perf_counter()
             status = self._read_status(link)
+            rtt_status = time.perf_counter() - rtt_start
+            self._check_target(status.get('target_idle_ms'))
+            status = {**status, 'rtt_ms': {
+                'arm': round(rtt_arm * 1000, 3),
+                'fire': round(rtt_fire * 1000, 3),
+                'status': round(rtt_status * 1000, 3),
+            }}
+            
+            # Step 7: Optional trace, pulled in chunks into the trace store
+            # (a hung target skips it and goes straight to recovery)
+            if status.get('hang'):
+                self._recover(link)
+            elif self._traces is not None:
+                status = {**status, 'trace': self._trace_summary(self._fetch_trace(link, trial_id))}
             
-            # Build observation
-            observation = Observation(
+            # Build observation (the status is already decoded: record, no validation)
+            observation = ObservationRecord(
                 raw_status=status,
-                trigger_seen=status.get('trigger_seen', False),
-                trigger_cleared=status.get('trigger_cleared', False),
+                trigger_seen=bool(status.get('trigger_seen', False)),
+                trigger_cleared=bool(status.get('trigger_cleared', False)),
                 led_state=status.get('led_state')
             )
             
-            # Classify outcome
-            outcome = self.evaluator.classify(observation)
-            
+            # Outcome is classified later, in the post-processing pipeline
             trial.observation = observation
-            trial.outcome = outcome
+            
+        except TrialHang as e:
+            # Target heartbeat stopped: HANG now, skip the remaining steps and bring the target back
+            print(f"🧊 Испытание #{trial_id}: {e}, цель зависла")
+            trial.outcome = Outcome.HANG
+            trial.observation = ObservationRecord(
+                raw_status={'hang': True, 'watchdog': True, 'target_idle_ms': round(e.idle_s * 1000)},
+                trigger_seen=trigger_seen,
+                trigger_cleared=False,
+                notes=str(e)
+            )
+            self._recover(link)
+            
+        except TrialStall as e:
+            # Command frame lost and not recoverable by a resend (stand alive): ERROR now, skip the remaining steps
+            print(f"⚠️  Ошибка в испытании #{trial_id}: {e}, кадр потерян")
+            trial.outcome = Outcome.ERROR
+            trial.observation = ObservationRecord(
+                raw_status={'error': str(e), 'stalled': e.what, 'waited_ms': round(e.waited_s * 1000, 1)},
+                trigger_seen=False,
+                trigger_cleared=False,
+                notes=str(e)
+            )
+            link.flush_input()
+            self._stash.clear()
             
         except Exception as e:
             # Log error but continue
             print(f"⚠️  Ошибка в испытании #{trial_id}: {e}")
             trial.outcome = Outcome.ERROR
-            trial.observation = Observation(
+            trial.observation = ObservationRecord(
                 raw_status={'error': str(e)},
                 trigger_seen=False,
                 trigger_cleared=False,
@@ -234,40 +692,77 @@ class Orchestrator:
         
         return trial
     
+    @staticmethod
+    def _attack_payload(attack: AttackSpec) -> dict:
+        """SET_ATTACK payload; power glitch fields only when enabled."""
+        payload = {
+            'mode': attack.mode.value,
+            'clock_impl': attack.clock_impl.value,
+            'tg_ns': attack.tg_ns,
+            'delay_ns': attack.delay_ns
+        }
+        if attack.power_enabled:
+            payload.update({
+                'power_type': attack.power_type,
+                'power_dv_mV': attack.power_dv_mV,
+                'power_width_ns': attack.power_width_ns,
+                'power_delay_ns': attack.power_delay_ns
+            })
+        return payload
+    
     def _reset_victim(self, link: SerialLink) -> None:
-        """Reset victim according to policy."""
+        """Reset victim according to policy (skipped once right after _recover)."""
+        if self._recovered:
+            self._recovered = False
+            return
         if self.campaign.reset_policy == "soft":
             self._send_command(link, MessageType.SOFT_RESET, {})
         elif self.campaign.reset_policy == "hard":
             self._send_command(link, MessageType.HARD_RESET, {})
         # else: none - skip reset
     
-    def _send_command(self, link: SerialLink, msg_type: MessageType, payload_dict: dict) -> None:
+    def _send_command(self, link: SerialLink, msg_type: MessageType, payload_dict) -> None:
         """Send a command and wait for ACK."""
-        payload = encode_json_payload(payload_dict) if payload_dict else b''
-        frame = encode_frame(msg_type, payload)
-        link.write(frame)
+        self._send_commands(link, [(msg_type, payload_dict)])
+    
+    def _send_commands(self, link: SerialLink, commands: List[tuple]) -> None:
+        """Send (msg_type, payload) commands back to back and wait for one ACK each, in order."""
+        frames = []
+        for msg_type, payload_dict in commands:
+            if isinstance(payload_dict, bytes):
+                payload = payload_dict  # binary payload (e.g. SWEEP_START)
+            else:
+                payload = encode_json_payload(payload_dict) if payload_dict else b''
+            frames.append(encode_frame(msg_type, payload))
+        link.write(b''.join(frames))
         
-        # Wait for ACK (simple, with timeout)
-        start = time.time()
-        buffer = bytearray()
+        # Wait for ACKs (2 s protocol timeout, cut short by the stall detector)
+        acked = 0
         
-        while time.time() - start < 2.0:  # Increased timeout to 2 seconds
-            data = link.read_available()
-            if data:
-                buffer.extend(data)
-                frames = decode_stream(buffer)
-                for frame_type, frame_payload in frames:
-                    if frame_type == MessageType.ACK:
-                        return
-                    elif frame_type == MessageType.NACK:
-                        raise RuntimeError(f"Получен NACK от стенда на {msg_type.name}")
-            time.sleep(0.01)
+        def resend():
+            # Only idempotent commands: if just the ACK was lost, the first copy already acted
+            if any(msg_type not in self.RESENDABLE for msg_type, _ in commands[acked:]):
+                return None
+            return b''.join(frames[acked:])
+        
+        def accept(frame_type, frame_payload):
+            nonlocal acked
+            if frame_type == MessageType.ACK:
+                acked += 1
+                if acked == len(commands):
+                    return True
+            elif frame_type == MessageType.NACK:
+                raise RuntimeError(f"Получен NACK от стенда на {commands[acked][0].name}")
+            return None
+        
+        kind = '+'.join(msg_type.name for msg_type, _ in commands)
+        if self._await_frames(link, kind, 2.0, accept, resend):
+            return
         
         # Timeout - log warning but proceed (research mode)
         # Don't raise exception to allow campaign to continue
         import sys
-        print(f"⚠️  Тайм-аут ACK для {msg_type.name}", file=sys.stderr)
+        print(f"⚠️  Тайм-аут ACK для {commands[acked][0].name}", file=sys.stderr)
     
     def _wait_for_trigger(self, link: SerialLink, timeout_ms: int) -> bool:
         """Wait for trigger to be seen."""
@@ -276,51 +771,201 @@ class Orchestrator:
         
         while time.time() - start < timeout_s:
             status = self._read_status(link)
+            self._check_target(status.get('target_idle_ms'))
             if status.get('trigger_seen'):
                 return True
             time.sleep(0.02)
         
         return False
     
+    def _wait_for_push(self, link: SerialLink, timeout_ms: int) -> bool:
+        """
+        Wait for the status the stand pushes when the trigger fires (no polling).
+        
+        Meanwhile the target heartbeat is checked with a PING every
+        PING_INTERVAL_S (the PONG carries target_idle_ms), if the stand reports it.
+        """
+        start = time.time()
+        timeout_s = timeout_ms / 1000.0
+        buffer = bytearray()
+        watch = self.caps.target_beat_ms > 0
+        ping_at = start + self.PING_INTERVAL_S
+        pinged = False
+        
+        while time.time() - start < timeout_s:
+            if watch and not pinged and time.time() >= ping_at:
+                link.write(encode_frame(MessageType.PING, b''))
+                pinged = True
+            frames = list(self._stash)
+            self._stash.clear()
+            data = link.read_available()
+            if data:
+                buffer.extend(data)
+                frames.extend(decode_stream(buffer))
+            for frame_type, frame_payload in frames:
+                if frame_type == MessageType.READ_STATUS and frame_payload:
+                    if decode_json_payload(frame_payload).get('trigger_seen'):
+                        return True
+                elif frame_type == MessageType.PONG and len(frame_payload) == PONG_PAYLOAD.size:
+                    self._check_target(PONG_PAYLOAD.unpack(frame_payload)[0])
+                    pinged = False
+                    ping_at = time.time() + self.PING_INTERVAL_S
+            time.sleep(0.005)
+        
+        # Push lost or late: one explicit poll before giving up
+        status = self._read_status(link)
+        self._check_target(status.get('target_idle_ms'))
+        return bool(status.get('trigger_seen'))
+    
+    def _check_target(self, idle_ms: Optional[int]) -> None:
+        """
+        Target watchdog: raise TrialHang when the reported heartbeat gap is overdue.
+        
+        The limit comes from the gaps seen so far (StallDetector, kind
+        'target'); before warmup it is TARGET_MISSED_BEATS beat periods.
+        """
+        if idle_ms is None or self.caps.target_beat_ms <= 0:
+            return
+        idle_s = idle_ms / 1000.0
+        fallback_s = max(self.TARGET_MISSED_BEATS * self.caps.target_beat_ms / 1000.0, self.stall_detector.min_s)
+        if idle_s > self.stall_detector.limit_s('target', fallback_s):
+            raise TrialHang(idle_s)
+        self.stall_detector.observe('target', idle_s)
+    
     def _read_status(self, link: SerialLink) -> dict:
         """Read status from stand."""
         frame = encode_frame(MessageType.READ_STATUS, b'')
         link.write(frame)
         
         # Wait for response
+        def accept(frame_type, frame_payload):
+            if frame_payload:
+                try:
+                    return decode_json_payload(frame_payload)
+                except:
+                    pass
+            return None
+        
+        status = self._await_frames(link, MessageType.READ_STATUS.name, 0.5, accept, lambda: frame)
+        
+        # Return empty status on timeout
+        return status if status is not None else {}
+    
+    def _await_frames(
+        self,
+        link: SerialLink,
+        kind: str,
+        timeout_s: float,
+        accept,
+        resend: Optional[Callable[[], Optional[bytes]]] = None
+    ):
+        """
+        Read frames until accept(frame_type, payload) returns a result.
+        
+        Once the response is overdue by this command's latency distribution
+        (StallDetector), a PING heartbeat goes out. The firmware answers
+        in order, so a PONG while the command is still unanswered means
+        the command frame was lost (bad CRC frames are dropped silently):
+        the frames from resend() go out once more, and a second loss
+        raises TrialStall. Without a PONG the protocol timeout applies.
+        Frames after the accepted one are stashed.
+        
+        Args:
+            resend: Frames to retransmit after a loss (None or returning
+                None = not safe to repeat)
+        
+        Returns:
+            accept's result, or None on protocol timeout
+        """
         start = time.time()
+        deadline = self.stall_detector.limit_s(kind, timeout_s)
+        heartbeat = False
+        retried = False
         buffer = bytearray()
         
-        while time.time() - start < 0.5:
+        while True:
+            elapsed = time.time() - start
+            if elapsed >= deadline:
+                if deadline >= timeout_s:
+                    return None
+                if not heartbeat:
+                    link.write(encode_frame(MessageType.PING, b''))
+                    heartbeat = True
+                    deadline = min(2 * deadline, timeout_s)
+                else:
+                    deadline = timeout_s  # stand silent too: wait out the protocol timeout
+                continue
+            
             data = link.read_available()
             if data:
                 buffer.extend(data)
                 frames = decode_stream(buffer)
-                for frame_type, frame_payload in frames:
-                    if frame_payload:
-                        try:
-                            return decode_json_payload(frame_payload)
-                        except:
-                            pass
+                for i, (frame_type, frame_payload) in enumerate(frames):
+                    if heartbeat and frame_type == MessageType.PONG:
+                        frames_again = resend() if resend is not None and not retried else None
+                        if frames_again is None:
+                            raise TrialStall(kind, time.time() - start)
+                        link.write(frames_again)
+                        heartbeat = False
+                        retried = True
+                        deadline = min(time.time() - start + self.stall_detector.limit_s(kind, timeout_s), timeout_s)
+                        continue
+                    result = accept(frame_type, frame_payload)
+                    if result is not None:
+                        if not retried:
+                            self.stall_detector.observe(kind, time.time() - start)
+                        self._stash.extend(frames[i + 1:])
+                        return result
             time.sleep(0.01)
-        
-        # Return empty status on timeout
-        return {}
     
-    def _log_trial(self, store: EventStoreJSONL, trial: Trial) -> None:
+    def _recover(self, link: SerialLink) -> None:
+        """Bring a hung target back: drop pending frames, then reset it per reset_policy."""
+        link.flush_input()
+        self._stash.clear()
+        try:
+            self._reset_victim(link)
+        except (TrialStall, RuntimeError) as e:
+            print(f"⚠️  Восстановление после зависания не удалось: {e}")
+            return
+        # The next trial starts from this reset instead of issuing its own
+        self._recovered = self.campaign.reset_policy != "none"
+    
+    def _log_trial(self, store: EventStore, trial: Trial, flush: bool = True) -> None:
         """Log trial to event store."""
         event = {
             'event_type': 'trial_complete',
             'trial_id': trial.trial_id,
             'tg_ns': trial.attack.tg_ns,
             'delay_ns': trial.attack.delay_ns,
+            'mode': trial.attack.mode.value,
+            'clock_impl': trial.attack.clock_impl.value,
             'outcome': trial.outcome.value if trial.outcome else None,
             'trigger_seen': trial.observation.trigger_seen if trial.observation else False,
             'trigger_cleared': trial.observation.trigger_cleared if trial.observation else False,
-            'led_state': trial.observation.led_state if trial.observation else None
+            'led_state': trial.observation.led_state if trial.observation else None,
+            'duration_ms': round(trial.duration_s * 1000, 3) if trial.duration_s is not None else None
         }
+        if trial.observation:
+            # Classifier features: hang flag, command RTTs, trace summary
+            event.update(observation_fields(trial.observation))
+            # Full stand status, so outcomes can be recomputed offline (ub reclassify)
+            event['raw_status'] = trial.observation.raw_status
+        if trial.attack.power_enabled:
+            event.update({
+                'power_enabled': True,
+                'power_type': trial.attack.power_type,
+                'power_dv_mV': trial.attack.power_dv_mV,
+                'power_width_ns': trial.attack.power_width_ns,
+                'power_delay_ns': trial.attack.power_delay_ns
+            })
         store.append(event)
-        store.flush()
+        if flush:
+            store.flush()
+    
+    def _print_costs(self) -> None:
+        """Print measured wall-time cost per outcome class."""
+        for outcome, (count, mean_s) in self.strategy.costs.summary().items():
+            print(f"⏱️  {outcome.value}: {count} исп., в среднем {mean_s * 1000:.0f} мс")
     
     def _print_trial_result(self, trial: Trial) -> None:
         """Print trial result with Russian labels."""
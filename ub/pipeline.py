@@ -0,0 +1,123 @@
+"""
+Trial post-processing off the serial I/O path.
+Classification and logging run in a worker thread fed by a bounded
+queue; the campaign loop collects finished trials to print them and feed
+the strategy, so console output stays on one thread.
+"""
+
+import queue
+import threading
+from collections import deque
+from typing import Callable, List, Optional
+
+from .model import TrialRecord
+
+_STOP = object()
+
+
+class TrialPipeline:
+    """
+    Bounded classify -> log stage for completed trials.
+
+    ``depth`` is both the queue size and the lag bound: the strategy may be
+    missing the outcomes of at most ``depth`` of the most recent trials.
+    ``depth=0`` processes each trial inline in ``submit`` (no thread).
+    """
+
+    def __init__(
+        self,
+        classify: Callable,
+        sink: Callable[[TrialRecord], None],
+        flush: Callable[[], None],
+        depth: int = 0
+    ):
+        """
+        Args:
+            classify: Observation -> Outcome (Evaluator or MLClassifier)
+            sink: Called once per classified trial, in trial order (e.g. log)
+            flush: Called when the stage goes idle (e.g. event store flush)
+            depth: Trials allowed in flight (0 = synchronous)
+        """
+        self.classify = classify
+        self.sink = sink
+        self.flush = flush
+        self.depth = depth
+
+        self._inbox: queue.Queue = queue.Queue(maxsize=max(depth, 1))
+        self._done: deque = deque()
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._processed = 0
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        if self.depth > 0:
+            self._thread = threading.Thread(target=self._work, name='trial-postprocess', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._thread is not None:
+            self._inbox.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        if exc_type is None:
+            self._raise()
+
+    def _process(self, trial: TrialRecord) -> None:
+        if trial.outcome is None:
+            trial.outcome = self.classify(trial.observation)
+        self.sink(trial)
+
+    def _work(self) -> None:
+        """Worker loop: process in order, flush whenever the queue runs dry."""
+        while True:
+            trial = self._inbox.get()
+            if trial is _STOP:
+                break
+            try:
+                if self._error is None:
+                    self._process(trial)
+                    if self._inbox.empty():
+                        self.flush()
+            except BaseException as e:  # surfaced in the campaign thread
+                self._error = e
+            with self._cond:
+                self._processed += 1
+                if self._error is None:
+                    self._done.append(trial)
+                self._cond.notify_all()
+
+    def _raise(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Ошибка постобработки испытаний: {self._error}") from self._error
+
+    def submit(self, trial: TrialRecord) -> None:
+        """Hand over a completed trial (blocks while the queue is full)."""
+        self._raise()
+        self._submitted += 1
+        if self._thread is None:
+            self._process(trial)
+            self.flush()
+            self._processed += 1
+            self._done.append(trial)
+            return
+        self._inbox.put(trial)
+
+    def collect(self, max_pending: Optional[int] = None) -> List[TrialRecord]:
+        """
+        Finished trials since the last call, in trial order.
+
+        Args:
+            max_pending: Wait until at most this many trials are still being
+                processed (default: depth; 0 = wait for everything)
+        """
+        limit = self.depth if max_pending is None else max_pending
+        with self._cond:
+            while self._submitted - self._processed > limit and self._error is None:
+                self._cond.wait()
+            finished = list(self._done)
+            self._done.clear()
+        self._raise()
+        return finished
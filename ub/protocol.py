@@ -5,8 +5,10 @@ Frame format: [SOF=0x7E][TYPE:1][LEN:1][PAYLOAD:LEN][CRC32:4]
 
 from enum import IntEnum
 import binascii
+import re
 import struct
 import json
+from typing import List, Tuple
 
 
 class MessageType(IntEnum):
@@ -26,94 +28,116 @@ class MessageType(IntEnum):
     GET_CAPS     = 0x30
     TRACE_DUMP   = 0x31
 
+    SWEEP_START  = 0x40
+    SWEEP_RESULT = 0x41
+    SWEEP_DONE   = 0x42
+
 
 SOF = 0x7E
+# Extended-length variant (negotiated via GET_CAPS "ext_payload"):
+# [SOF_EXT=0x7F][TYPE:1][LEN:2 LE][PAYLOAD:LEN][CRC32:4], CRC over TYPE+LEN+PAYLOAD
+SOF_EXT = 0x7F
+MAX_PAYLOAD = 255
+EXT_MAX_PAYLOAD = 4096  # larger LEN values are treated as line noise
+
+_START = re.compile(b'\x7e')
+_START_ANY = re.compile(b'[\x7e\x7f]')
 
 
-def encode_frame(msg_type: MessageType, payload: bytes) -> bytes:
+def encode_frame(msg_type: MessageType, payload: bytes, extended: bool = False) -> bytes:
     """
     Encode a message into a frame.
     
     Args:
         msg_type: Type of message
         payload: Payload bytes (empty bytes() if no payload)
+        extended: Use the 2-byte LEN variant (only if the stand reports ext_payload)
     
     Returns:
         Complete frame with SOF, type, length, payload, and CRC32
     """
     length = len(payload)
-    if length > 255:
-        raise ValueError(f"Payload too long: {length} bytes (max 255)")
-    
-    # Build message without CRC: TYPE + LEN + PAYLOAD
-    msg_without_crc = struct.pack('B', msg_type) + struct.pack('B', length) + payload
-    
-    # Calculate CRC32 over TYPE+LEN+PAYLOAD
-    crc = binascii.crc32(msg_without_crc) & 0xFFFFFFFF
-    
-    # Build complete frame: SOF + TYPE + LEN + PAYLOAD + CRC32 (little-endian)
-    frame = struct.pack('B', SOF) + msg_without_crc + struct.pack('<I', crc)
+    if extended:
+        if length > EXT_MAX_PAYLOAD:
+            raise ValueError(f"Payload too long: {length} bytes (max {EXT_MAX_PAYLOAD})")
+        header = struct.pack('<BBH', SOF_EXT, msg_type, length)
+    else:
+        if length > MAX_PAYLOAD:
+            raise ValueError(f"Payload too long: {length} bytes (max {MAX_PAYLOAD})")
+        header = struct.pack('BBB', SOF, msg_type, length)
     
-    return frame
+    # CRC32 over TYPE+LEN+PAYLOAD, appended little-endian
+    crc = binascii.crc32(payload, binascii.crc32(header[1:])) & 0xFFFFFFFF
+    return header + payload + struct.pack('<I', crc)
 
 
-def decode_stream(buffer: bytearray) -> list[tuple[MessageType, bytes]]:
+def decode_stream(buffer: bytearray, max_payload: int = MAX_PAYLOAD) -> List[Tuple[MessageType, bytes]]:
     """
     Decode frames from a buffer, extracting complete messages.
     
+    Handles classic and, when max_payload allows them, extended-length
+    frames. Each payload is copied out of the buffer exactly once, and
+    consumed bytes are removed in one step at the end. On a CRC mismatch
+    only the start byte is skipped, so a real frame hidden behind line
+    noise is still found.
+    
     Args:
         buffer: Input buffer (will be modified to remove processed frames)
+        max_payload: Largest payload expected in this session; above
+            MAX_PAYLOAD (the negotiated ext_payload) 0x7F starts an
+            extended frame, otherwise it is line noise
     
     Returns:
         List of (MessageType, payload) tuples for complete valid frames
     """
     frames = []
+    pos = 0
+    size = len(buffer)
+    start = _START_ANY if max_payload > MAX_PAYLOAD else _START
+    max_payload = min(max_payload, EXT_MAX_PAYLOAD)
     
     while True:
-        # Find SOF
-        try:
-            sof_idx = buffer.index(SOF)
-        except ValueError:
-            # No SOF found, clear buffer up to end
-            buffer.clear()
+        # Find SOF (classic, or extended if negotiated)
+        match = start.search(buffer, pos)
+        if match is None:
+            # No SOF found, drop everything
+            pos = size
             break
+        pos = match.start()
         
-        # Remove everything before SOF
-        if sof_idx > 0:
-            del buffer[:sof_idx]
-        
-        # Check if we have enough bytes for header (SOF + TYPE + LEN)
-        if len(buffer) < 3:
+        extended = buffer[pos] == SOF_EXT
+        header = 4 if extended else 3
+        if size - pos < header:
             break
         
-        msg_type = buffer[1]
-        length = buffer[2]
+        length = (buffer[pos + 2] | buffer[pos + 3] << 8) if extended else buffer[pos + 2]
+        if length > max_payload:
+            pos += 1
+            continue
         
-        # Check if we have the full frame (SOF + TYPE + LEN + PAYLOAD + CRC32)
-        frame_size = 1 + 1 + 1 + length + 4
-        if len(buffer) < frame_size:
+        # Wait for the full frame (header + payload + CRC32)
+        end = pos + header + length
+        if size - end < 4:
             break
         
-        # Extract the frame
-        frame = bytes(buffer[:frame_size])
+        with memoryview(buffer) as view:
+            expected_crc = binascii.crc32(view[pos + 1:end]) & 0xFFFFFFFF
+            actual_crc = int.from_bytes(view[end:end + 4], 'little')
+            payload = bytes(view[pos + header:end]) if expected_crc == actual_crc else None
         
-        # Verify CRC32
-        msg_without_crc = frame[1:3+length]  # TYPE + LEN + PAYLOAD
-        expected_crc = binascii.crc32(msg_without_crc) & 0xFFFFFFFF
-        actual_crc = struct.unpack('<I', frame[3+length:3+length+4])[0]
+        if payload is None:
+            pos += 1
+            continue
         
-        if expected_crc == actual_crc:
-            # Valid frame
-            payload = frame[3:3+length]
-            try:
-                frames.append((MessageType(msg_type), payload))
-            except ValueError:
-                # Unknown message type, skip
-                pass
-        
-        # Remove processed frame from buffer
-        del buffer[:frame_size]
+        try:
+            frames.append((MessageType(buffer[pos + 1]), payload))
+        except ValueError:
+            # Unknown message type, skip
+            pass
+        pos = end + 4
     
+    # Remove processed bytes from buffer
+    del buffer[:pos]
     return frames
 
 
@@ -125,3 +149,79 @@ def encode_json_payload(obj: dict) -> bytes:
 def decode_json_payload(payload: bytes) -> dict:
     """Decode JSON bytes to dictionary."""
     return json.loads(payload.decode('utf-8'))
+
+
+# PONG: target_idle_ms, ms since the last target heartbeat (stands reporting
+# GET_CAPS "target_beat_ms"; older firmware answers with an empty PONG)
+PONG_PAYLOAD = struct.Struct('<I')
+
+
+# ============================================================================
+# AUTONOMOUS SWEEP (binary payloads)
+# ============================================================================
+
+# SWEEP_START: start, count, delay_start, delay_stop, delay_step, repeats, n_tg, then n_tg x tg_ns
+SWEEP_HEADER = struct.Struct('<IIHHHHB')
+SWEEP_TG = struct.Struct('<H')
+SWEEP_MAX_TG = (255 - SWEEP_HEADER.size) // SWEEP_TG.size
+
+# SWEEP_RESULT: whole number of records: index, tg_ns, delay_ns, flags, led_state
+SWEEP_RECORD = struct.Struct('<IHHBB')
+SWEEP_DONE_PAYLOAD = struct.Struct('<I')  # trials executed
+
+# SWEEP_RECORD flags
+FLAG_TRIGGER_SEEN = 0x01
+FLAG_TRIGGER_CLEARED = 0x02
+FLAG_HANG = 0x04
+
+# SWEEP_RECORD led_state codes
+LED_STATES = ('OFF', 'ON', 'BLINK')
+
+
+def encode_sweep(
+    tg_ns: list,
+    delay_start: int,
+    delay_stop: int,
+    delay_step: int,
+    repeats: int = 1,
+    start: int = 0,
+    count: int = 0xFFFFFFFF
+) -> bytes:
+    """
+    Encode a SWEEP_START payload.
+    
+    The stand runs tg-major (tg_ns, delay_ns, repeat) positions
+    [start, start + count) of the grid; delay_stop is exclusive.
+    """
+    if not 0 < len(tg_ns) <= SWEEP_MAX_TG:
+        raise ValueError(f"Sweep needs 1..{SWEEP_MAX_TG} tg_ns values, got {len(tg_ns)}")
+    header = SWEEP_HEADER.pack(start, count, delay_start, delay_stop, delay_step, repeats, len(tg_ns))
+    return header + b''.join(SWEEP_TG.pack(tg) for tg in tg_ns)
+
+
+def decode_sweep(payload: bytes) -> dict:
+    """Decode a SWEEP_START payload (inverse of encode_sweep)."""
+    start, count, delay_start, delay_stop, delay_step, repeats, n_tg = SWEEP_HEADER.unpack_from(payload)
+    tg_ns = [v for (v,) in SWEEP_TG.iter_unpack(payload[SWEEP_HEADER.size:SWEEP_HEADER.size + n_tg * SWEEP_TG.size])]
+    return {
+        'start': start, 'count': count, 'tg_ns': tg_ns, 'repeats': repeats,
+        'delay_start': delay_start, 'delay_stop': delay_stop, 'delay_step': delay_step,
+    }
+
+
+def decode_sweep_records(payload: bytes) -> List[Tuple[int, int, int, int, int]]:
+    """Decode a SWEEP_RESULT payload into (index, tg_ns, delay_ns, flags, led) records."""
+    return list(SWEEP_RECORD.iter_unpack(payload))
+
+
+# ============================================================================
+# TRACE_DUMP (chunked bulk transfer, binary payloads)
+# ============================================================================
+
+# Host -> stand: offset, length (TRACE_TO_END = up to the end), chunk size (0 = stand max), flags
+TRACE_REQUEST = struct.Struct('<IIHB')
+TRACE_TO_END = 0xFFFFFFFF
+TRACE_FLAG_EXTENDED = 0x01  # answer with extended-length frames
+
+# Stand -> host, before each chunk's data: total trace length, chunk offset, CRC32 of the data
+TRACE_CHUNK = struct.Struct('<III')
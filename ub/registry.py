@@ -0,0 +1,85 @@
+"""
+Lazy strategy registry.
+Maps strategy names to "module:Class" targets and imports a module only
+when a config actually selects one of its strategies.
+"""
+
+import importlib
+from importlib.metadata import entry_points
+from typing import Dict, List, Optional, Type, Union
+
+# Entry-point group third-party packages use to publish strategies:
+#
+#   [project.entry-points."ub.strategies"]
+#   my_bayes = "my_pkg.bayes:MyBayesStrategy"
+ENTRY_POINT_GROUP = 'ub.strategies'
+
+# Built-in strategies
+_REGISTRY: Dict[str, Union[str, type]] = {
+    'grid': 'ub.strategy:GridSearchStrategy',
+    'random': 'ub.strategy:RandomSearchStrategy',
+    'refine': 'ub.strategy:AdaptiveGridStrategy',
+    'space_filling': 'ub.strategy:SpaceFillingStrategy',
+    'halving': 'ub.strategy:SuccessiveHalvingStrategy',
+    'bayes': 'ub.strategy:BayesOptStrategy',
+    'bandit': 'ub.strategy:BanditStrategy',
+    'window_hunter': 'ub.strategy:WindowHunterStrategy',
+}
+
+# Built-in placeholders that raise NotImplementedError
+STUB_STRATEGIES = frozenset({'bayes', 'bandit', 'window_hunter'})
+
+_entry_points_loaded = False
+
+
+def register_strategy(name: str, target: Union[str, type]) -> None:
+    """
+    Register a strategy under a config name.
+
+    Args:
+        name: Value of campaign.strategy.name
+        target: Strategy class, or "module:Class" to import on first use
+    """
+    _REGISTRY[name] = target
+
+
+def _load_entry_points() -> None:
+    """Add strategies published by installed packages (once, without importing them)."""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        group = eps.select(group=ENTRY_POINT_GROUP)  # Python 3.10+
+    else:
+        group = eps.get(ENTRY_POINT_GROUP, [])  # Python 3.8/3.9: dict of groups
+    for ep in group:
+        _REGISTRY.setdefault(ep.name, ep.value)
+
+
+def strategy_names(include_stubs: bool = True) -> List[str]:
+    """All registered strategy names (built-in and entry points), optionally without the stubs."""
+    _load_entry_points()
+    return [name for name in _REGISTRY if include_stubs or name not in STUB_STRATEGIES]
+
+
+def get_strategy_class(name: str) -> Optional[Type]:
+    """
+    Resolve a strategy name to its class, importing its module on first use.
+
+    Returns:
+        Strategy class, or None if the name is not registered
+    """
+    target = _REGISTRY.get(name)
+    if target is None:
+        _load_entry_points()
+        target = _REGISTRY.get(name)
+        if target is None:
+            return None
+
+    if isinstance(target, str):
+        module_name, _, attr = target.partition(':')
+        target = getattr(importlib.import_module(module_name), attr)
+        _REGISTRY[name] = target
+    return target
@@ -0,0 +1,416 @@
+"""
+Search spaces for attack strategies.
+Index-addressed grids decoded on demand, declarative multi-dimensional
+spaces over AttackSpec fields and space-filling designs to sample them.
+"""
+
+import math
+import random
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Any
+import numpy as np
+from .model import AttackRecord, AttackSpec, TimingCaps
+
+
+class FeistelPermutation:
+    """
+    Pseudo-random bijection on [0, n) with O(1) memory.
+
+    A balanced Feistel network over the next even power of two, with
+    cycle-walking to stay inside [0, n). Used to shuffle an index space
+    without replacement and without storing a permutation table.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, n: int, seed: Optional[int] = None):
+        """
+        Args:
+            n: Size of the permuted domain
+            seed: Seed for the round keys (None = random)
+        """
+        self.n = n
+        bits = max(2, (n - 1).bit_length())
+        bits += bits & 1
+        self._half = bits // 2
+        self._mask = (1 << self._half) - 1
+        rng = random.Random(seed)
+        self._keys = [rng.getrandbits(32) for _ in range(self.ROUNDS)]
+
+    def _round(self, x: int, key: int) -> int:
+        """Round function: 32-bit integer hash of (x, key)."""
+        x = (x * 0x9E3779B1 + key) & 0xFFFFFFFF
+        x ^= x >> 15
+        x = (x * 0x85EBCA6B) & 0xFFFFFFFF
+        x ^= x >> 13
+        return x & self._mask
+
+    def __call__(self, index: int) -> int:
+        """Map index in [0, n) to its permuted position in [0, n)."""
+        x = index
+        while True:
+            left, right = x >> self._half, x & self._mask
+            for key in self._keys:
+                left, right = right, left ^ self._round(right, key)
+            x = (left << self._half) | right
+            if x < self.n:
+                return x
+
+
+class GridSpace:
+    """
+    Mixed-radix index space over a product of parameter axes.
+
+    Each axis is a sequence (a ``range`` keeps it O(1) in memory). Position
+    i in the traversal is decoded digit by digit into one value per axis,
+    so random access and seeking are O(1) and the full grid never exists
+    in memory. Repeats are the innermost digit.
+    """
+
+    def __init__(
+        self,
+        axes: Dict[str, Sequence[Any]],
+        repeats: int = 1,
+        order: Optional[Sequence[str]] = None,
+        shuffle: bool = False,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            axes: Axis name -> sequence of values (e.g. {'tg_ns': [...], 'delay_ns': range(...)})
+            repeats: Number of repeats per point
+            order: Axis names from outermost to innermost (default: axes order)
+            shuffle: Visit positions in pseudo-random order without replacement
+            seed: Seed for the shuffle
+        """
+        names = list(order) if order is not None else list(axes)
+        if sorted(names) != sorted(axes):
+            raise ValueError(f"Порядок обхода {names} не совпадает с осями {list(axes)}")
+
+        self.axes = axes
+        self.repeats = max(1, repeats)
+        self._names = names
+        self._radices = [len(axes[name]) for name in names]
+
+        self.size = self.repeats
+        for radix in self._radices:
+            self.size *= radix
+
+        self._perm = FeistelPermutation(self.size, seed) if shuffle and self.size > 0 else None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        """Point at traversal position (0 <= position < len(self)), keys in axes order."""
+        if not 0 <= position < self.size:
+            raise IndexError(position)
+
+        index = self._perm(position) if self._perm else position
+        index //= self.repeats
+
+        digits = {}
+        for name, radix in zip(reversed(self._names), reversed(self._radices)):
+            index, digits[name] = divmod(index, radix)
+        return {name: values[digits[name]] for name, values in self.axes.items()}
+
+
+class Dimension:
+    """One searchable AttackSpec field, mapped from the unit interval."""
+
+    def __init__(self, name: str, values: Optional[Sequence[Any]]):
+        """
+        Args:
+            name: AttackSpec field name
+            values: Discrete values (None for a continuous dimension)
+        """
+        self.name = name
+        self.values = values
+
+    def from_unit(self, u: np.ndarray) -> list:
+        """Map unit-interval coordinates to field values."""
+        idx = np.minimum((u * len(self.values)).astype(np.int64), len(self.values) - 1)
+        if isinstance(self.values, range):
+            return (self.values.start + idx * self.values.step).tolist()
+        return [self.values[i] for i in idx]
+    
+    def snapped(self, fn: Callable[[Any], Any]) -> 'Dimension':
+        """Same dimension with every value mapped through fn; duplicates dropped, order kept."""
+        if self.values is None:
+            return _MappedDimension(self, fn)
+        return ChoiceDimension(self.name, list(dict.fromkeys(fn(v) for v in self.values)))
+
+
+class _MappedDimension(Dimension):
+    """Continuous dimension whose sampled values are post-processed by fn."""
+    
+    def __init__(self, base: Dimension, fn: Callable[[Any], Any]):
+        super().__init__(base.name, None)
+        self._base = base
+        self._fn = fn
+    
+    def from_unit(self, u: np.ndarray) -> list:
+        return [self._fn(v) for v in self._base.from_unit(u)]
+
+
+class RangeDimension(Dimension):
+    """
+    Integer range ``[start, stop)``.
+
+    Linear with ``step`` (default 1), or log-scaled with ``log: true``:
+    continuous in log space, or ``num`` geometrically spaced values.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        start: int,
+        stop: int,
+        step: Optional[int] = None,
+        log: bool = False,
+        num: Optional[int] = None
+    ):
+        if stop <= start:
+            raise ValueError(f"Пустой диапазон для {name}: [{start}, {stop})")
+        if log and start <= 0:
+            raise ValueError(f"Логарифмическая шкала требует start > 0: {name}")
+        if log and step is not None:
+            raise ValueError(f"Нельзя совмещать log и step: {name}")
+
+        self.start = start
+        self.stop = stop
+        self.log = log
+
+        if not log:
+            values = range(start, stop, step or 1)
+        elif num is not None:
+            geo = np.geomspace(start, stop - 1, num)
+            values = sorted(set(int(round(v)) for v in geo))
+        else:
+            values = None
+        super().__init__(name, values)
+
+    def from_unit(self, u: np.ndarray) -> list:
+        if self.values is not None:
+            return super().from_unit(u)
+        lo, hi = math.log(self.start), math.log(self.stop - 1)
+        vals = np.rint(np.exp(lo + u * (hi - lo))).astype(np.int64)
+        return np.clip(vals, self.start, self.stop - 1).tolist()
+
+
+class ChoiceDimension(Dimension):
+    """Categorical choice (enums, bools, explicit value lists)."""
+
+    def __init__(self, name: str, choices: Sequence[Any]):
+        if not choices:
+            raise ValueError(f"Пустой список значений для {name}")
+        super().__init__(name, list(choices))
+
+
+class SearchSpace:
+    """
+    Declarative search space over any subset of AttackSpec fields.
+
+    Built from ``strategy.params.space``::
+
+        space:
+          tg_ns: {start: 15, stop: 121, log: true}
+          delay_ns: {start: 0, stop: 5000, step: 50}
+          clock_impl: [COMPRESS, EXTRA_EDGE]
+          power_enabled: true          # fixed value
+          power_dv_mV: {start: 100, stop: 500, step: 10}
+
+    Without ``space`` the legacy ``tg_ns`` list and ``delay_ns`` range are used.
+    """
+
+    def __init__(self, dims: List[Dimension]):
+        for dim in dims:
+            if dim.name not in AttackSpec.model_fields:
+                raise ValueError(f"Неизвестное поле AttackSpec: {dim.name}")
+        missing = [name for name in ('tg_ns', 'delay_ns') if name not in {d.name for d in dims}]
+        if missing:
+            raise ValueError(f"В пространстве поиска нет обязательных полей: {', '.join(missing)}")
+        # Validate choices once (e.g. "COMPRESS" -> ClockImpl.COMPRESS), so points need no validation
+        for dim in dims:
+            if isinstance(dim, ChoiceDimension):
+                dim.values = [self._coerce(dim.name, value) for value in dim.values]
+        self.dims = dims
+
+    @staticmethod
+    def _coerce(name: str, value: Any) -> Any:
+        """Value of field name as AttackSpec validates it."""
+        return getattr(AttackSpec(**{'tg_ns': 0, 'delay_ns': 0, name: value}), name)
+
+    @classmethod
+    def from_params(cls, params: Dict[str, Any]) -> 'SearchSpace':
+        """Parse ``params['space']`` or fall back to legacy tg_ns/delay_ns params."""
+        space = params.get('space')
+        if space is None:
+            delay_ns_config = params.get('delay_ns', {'start': 0, 'stop': 1000, 'step': 100})
+            return cls([
+                ChoiceDimension('tg_ns', params.get('tg_ns', [100])),
+                RangeDimension('delay_ns', delay_ns_config['start'],
+                               delay_ns_config['stop'], delay_ns_config['step']),
+            ])
+
+        dims = []
+        for name, spec in space.items():
+            if isinstance(spec, dict) and 'choices' in spec:
+                dims.append(ChoiceDimension(name, spec['choices']))
+            elif isinstance(spec, dict):
+                dims.append(RangeDimension(
+                    name, spec['start'], spec['stop'],
+                    step=spec.get('step'), log=spec.get('log', False), num=spec.get('num')
+                ))
+            elif isinstance(spec, list):
+                dims.append(ChoiceDimension(name, spec))
+            else:
+                dims.append(ChoiceDimension(name, [spec]))
+        return cls(dims)
+
+    @property
+    def names(self) -> List[str]:
+        return [dim.name for dim in self.dims]
+
+    @property
+    def size(self) -> Optional[int]:
+        """Number of distinct points (None if any dimension is continuous)."""
+        size = 1
+        for dim in self.dims:
+            if dim.values is None:
+                return None
+            size *= len(dim.values)
+        return size
+    
+    def snap(self, timing: TimingCaps) -> 'SearchSpace':
+        """Space of hardware-realizable points: tg_ns/delay_ns snapped to the stand ticks."""
+        snappers = {'tg_ns': timing.snap_tg_ns, 'delay_ns': timing.snap_delay_ns}
+        return SearchSpace([
+            dim.snapped(snappers[dim.name]) if dim.name in snappers else dim
+            for dim in self.dims
+        ])
+    
+    def grid(
+        self,
+        repeats: int = 1,
+        order: Optional[Sequence[str]] = None,
+        shuffle: bool = False,
+        seed: Optional[int] = None
+    ) -> GridSpace:
+        """Index-addressed grid over the space (every dimension must be discrete)."""
+        continuous = [dim.name for dim in self.dims if dim.values is None]
+        if continuous:
+            raise ValueError(f"Для сетки нужны дискретные оси (задайте step или num): {', '.join(continuous)}")
+        axes = {dim.name: dim.values for dim in self.dims}
+        return GridSpace(axes, repeats=repeats, order=order, shuffle=shuffle, seed=seed)
+
+    def contains(self, point: Dict[str, Any]) -> bool:
+        """True if point sets exactly this space's fields to reachable values."""
+        if set(point) != set(self.names):
+            return False
+        return all(dim.values is None or point[dim.name] in dim.values for dim in self.dims)
+
+    def sample(self, u: np.ndarray) -> List[Dict[str, Any]]:
+        """Map an (n, d) matrix of unit-cube points to field dictionaries."""
+        columns = [dim.from_unit(u[:, j]) for j, dim in enumerate(self.dims)]
+        return [dict(zip(self.names, row)) for row in zip(*columns)]
+
+    @staticmethod
+    def to_attack(point: Dict[str, Any]) -> AttackRecord:
+        """Attack for a point of this space (values validated at construction); other fields keep their defaults."""
+        return AttackRecord(**point)
+
+
+# ============================================================================
+# SPACE-FILLING DESIGNS
+# ============================================================================
+
+# Sobol direction numbers (s, a, m_1..m_s) for dimensions 2.., Joe & Kuo (2008)
+_SOBOL_PARAMS = [
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+]
+_SOBOL_BITS = 32
+
+_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
+
+
+@lru_cache(maxsize=None)
+def _sobol_directions(d: int) -> np.ndarray:
+    """Direction numbers, shape (d, 32), scaled to 32-bit integers."""
+    if d > len(_SOBOL_PARAMS) + 1:
+        raise ValueError(f"Sobol поддерживает не более {len(_SOBOL_PARAMS) + 1} измерений")
+
+    directions = np.zeros((d, _SOBOL_BITS), dtype=np.uint64)
+    for i in range(_SOBOL_BITS):
+        directions[0, i] = 1 << (_SOBOL_BITS - 1 - i)
+
+    for j in range(1, d):
+        s, a, m = _SOBOL_PARAMS[j - 1]
+        v = [0] * _SOBOL_BITS
+        for i in range(s):
+            v[i] = m[i] << (_SOBOL_BITS - 1 - i)
+        for i in range(s, _SOBOL_BITS):
+            v[i] = v[i - s] ^ (v[i - s] >> s)
+            for k in range(1, s):
+                if (a >> (s - 1 - k)) & 1:
+                    v[i] ^= v[i - k]
+        directions[j] = v
+    return directions
+
+
+def sobol(indices: np.ndarray, d: int, shift: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Sobol points at the given sequence indices, shape (len(indices), d).
+
+    Stateless (Gray-code closed form), so batches and resumes just pass the
+    next index range. ``shift`` is an optional per-dimension random digital
+    shift (uint64 values below 2**32).
+    """
+    directions = _sobol_directions(d)
+    gray = indices.astype(np.uint64) ^ (indices.astype(np.uint64) >> np.uint64(1))
+    x = np.zeros((len(indices), d), dtype=np.uint64)
+    for bit in range(_SOBOL_BITS):
+        mask = ((gray >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        x[mask] ^= directions[:, bit]
+    if shift is not None:
+        x ^= shift
+    return x.astype(np.float64) / float(1 << _SOBOL_BITS)
+
+
+def halton(indices: np.ndarray, d: int, shift: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Halton points at the given sequence indices, shape (len(indices), d).
+
+    ``shift`` is an optional per-dimension Cranley-Patterson rotation in [0, 1).
+    """
+    if d > len(_PRIMES):
+        raise ValueError(f"Halton поддерживает не более {len(_PRIMES)} измерений")
+
+    out = np.zeros((len(indices), d))
+    for j, base in enumerate(_PRIMES[:d]):
+        i = indices.astype(np.int64) + 1  # skip the all-zero point
+        f = 1.0
+        while np.any(i > 0):
+            f /= base
+            i, digit = np.divmod(i, base)
+            out[:, j] += f * digit
+    if shift is not None:
+        out = (out + shift) % 1.0
+    return out
+
+
+def latin_hypercube(n: int, d: int, rng: np.random.Generator) -> np.ndarray:
+    """Latin hypercube design: exactly one point per 1/n stratum in every dimension."""
+    strata = rng.permuted(np.tile(np.arange(n), (d, 1)), axis=1).T
+    return (strata + rng.random((n, d))) / n
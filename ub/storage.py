@@ -1,33 +1,40 @@
 """
-Research-style persistence: JSONL event store with optional SQLite export.
+Research-style persistence: JSONL event store with optional SQLite export,
+or a SQLite event store written during the campaign (storage.backend).
 """
 
 import json
 import os
+import threading
+import time
+import zlib
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Iterable, Iterator, Optional, Union
 import sqlite3
+from .codec import get_codec
 
 
 class EventStoreJSONL:
     """Simple JSONL event logger."""
     
-    def __init__(self, path: str):
+    def __init__(self, path: str, codec: str = 'auto'):
         """
         Initialize JSONL event store.
         
         Args:
             path: Path to JSONL file
+            codec: JSON backend ('auto', 'orjson', 'msgspec', 'json')
         """
         self.path = Path(path)
         # Create parent directories if needed
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self._file = None
+        self._dumps = get_codec(codec).dumps
     
     def __enter__(self):
-        """Open file for appending."""
-        self._file = open(self.path, 'a', encoding='utf-8')
+        """Open file for appending (bytes: the codec already emits UTF-8)."""
+        self._file = open(self.path, 'ab')
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -45,14 +52,15 @@ class EventStoreJSONL:
         if not self._file:
             raise RuntimeError("Event store not opened (use context manager)")
         
-        # Add timestamp
+        # Add timestamps: wall clock (ISO) and monotonic ns (ordering/intervals within a session)
         event = {
             'timestamp': datetime.now().isoformat(),
+            'mono_ns': time.monotonic_ns(),
             **obj
         }
         
         # Write JSON line
-        self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self._file.write(self._dumps(event) + b'\n')
     
     def flush(self) -> None:
         """Flush file buffer."""
@@ -60,111 +68,870 @@ class EventStoreJSONL:
             self._file.flush()
 
 
-def export_to_sqlite(jsonl_path: str, sqlite_path: str) -> None:
+def load_stand_caps(cache_path: str, key: str) -> Optional[Dict[str, Any]]:
+    """Cached stand capabilities for key (stand id + firmware version), if any."""
+    path = Path(cache_path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(key)
+    except (OSError, ValueError):
+        return None
+
+
+def save_stand_caps(cache_path: str, key: str, caps: Dict[str, Any]) -> None:
+    """Store stand capabilities under key, keeping other stands' entries."""
+    path = Path(cache_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cache = {}
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+    cache[key] = caps
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def iter_events(jsonl_path: str, event_type: Optional[str] = None, codec: str = 'auto') -> Iterator[Dict[str, Any]]:
     """
-    Export JSONL events to SQLite database.
-    
-    Creates a simple 'trials' table with flattened fields.
+    Stream events from a JSONL log.
     
     Args:
         jsonl_path: Path to JSONL file
-        sqlite_path: Path to SQLite database file
+        event_type: Only events of this type (lines are pre-filtered as bytes)
+        codec: JSON backend ('auto', 'orjson', 'msgspec', 'json')
+    
+    A .sqlite/.db path is read as an EventStoreSQLite database.
     """
-    # Read JSONL
-    events = []
-    with open(jsonl_path, 'r', encoding='utf-8') as f:
+    if _is_event_db(jsonl_path):
+        yield from _iter_db_events(jsonl_path, event_type, codec)
+        return
+    loads = get_codec(codec).loads
+    marker = f'"{event_type}"'.encode('utf-8') if event_type else None
+    with open(jsonl_path, 'rb') as f:
         for line in f:
-            if line.strip():
-                events.append(json.loads(line))
+            if marker is not None and marker not in line:
+                continue
+            if not line.strip():
+                continue
+            event = loads(line)
+            if event_type is None or event.get('event_type') == event_type:
+                yield event
+
+
+def read_events(jsonl_path: str, event_type: str) -> List[Dict[str, Any]]:
+    """All events of one type from a JSONL log."""
+    return list(iter_events(jsonl_path, event_type))
+
+
+def count_events(path: str, event_type: str) -> int:
+    """Number of events of one type in a JSONL log or event database (0 if missing)."""
+    if not Path(path).exists():
+        return 0
+    if _is_event_db(path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM events WHERE event_type = ?', (event_type,)).fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
+        finally:
+            conn.close()
+    marker = f'"{event_type}"'.encode('utf-8')
+    with open(path, 'rb') as f:
+        return sum(1 for line in f if marker in line)
+
+
+class _LogTail:
+    """
+    Events of a JSONL log from a byte offset on.
     
-    if not events:
-        print("⚠️  Нет событий для экспорта")
-        return
+    Only complete lines are consumed: a line a running campaign is still
+    writing is left for the next pass. After iterating, ``offset`` points
+    just past the last consumed line.
+    """
     
-    # Create SQLite database
+    def __init__(self, jsonl_path: str, offset: int = 0, event_type: Optional[str] = None, codec: str = 'auto'):
+        self.path = jsonl_path
+        self.offset = offset
+        self.event_type = event_type
+        self.codec = codec
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        loads = get_codec(self.codec).loads
+        marker = f'"{self.event_type}"'.encode('utf-8') if self.event_type else None
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self.offset += len(line)
+                if marker is not None and marker not in line:
+                    continue
+                if not line.strip():
+                    continue
+                event = loads(line)
+                if self.event_type is None or event.get('event_type') == self.event_type:
+                    yield event
+
+
+# Per-target progress of incremental exports, kept in the SQLite database.
+# target is 'trials' for the table itself or the path of a derived file (CSV).
+_STATE_DDL = '''
+    CREATE TABLE IF NOT EXISTS export_state (
+        target TEXT PRIMARY KEY,
+        source TEXT,
+        inode INTEGER,
+        offset INTEGER,
+        head_crc INTEGER,
+        last_trial_id INTEGER,
+        updated TEXT
+    )
+'''
+
+# Bytes at the start of the log whose CRC identifies it across appends
+_HEAD_BYTES = 4096
+
+
+def _log_identity(jsonl_path: str, length: int) -> Tuple[int, int]:
+    """(inode, CRC32 of the first min(length, _HEAD_BYTES) bytes) of a log."""
+    with open(jsonl_path, 'rb') as f:
+        head = f.read(min(length, _HEAD_BYTES))
+        inode = os.fstat(f.fileno()).st_ino
+    return inode, zlib.crc32(head)
+
+
+def _export_start(conn: sqlite3.Connection, target: str, jsonl_path: str, full: bool = False) -> Tuple[int, Optional[int], bool]:
+    """
+    Where an export of jsonl_path into target resumes.
+    
+    Returns:
+        (offset, last_trial_id, rebuild): rebuild is True when earlier output
+        must be discarded (forced, or the log was truncated, rotated or
+        replaced since the recorded export)
+    """
+    conn.execute(_STATE_DDL)
+    row = conn.execute(
+        'SELECT source, inode, offset, head_crc, last_trial_id FROM export_state WHERE target = ?', (target,)
+    ).fetchone()
+    if row is None:
+        return 0, None, full
+    if full:
+        return 0, None, True
+    
+    source, inode, offset, head_crc, last_trial_id = row
+    size = os.path.getsize(jsonl_path)
+    current_inode, current_crc = _log_identity(jsonl_path, offset)
+    if source != str(Path(jsonl_path).resolve()):
+        reason = "другой файл событий"
+    elif current_inode != inode:
+        reason = "файл событий заменён (ротация)"
+    elif size < offset:
+        reason = "файл событий усечён"
+    elif current_crc != head_crc:
+        reason = "начало файла событий изменилось"
+    else:
+        return offset, last_trial_id, False
+    print(f"🔄 {reason}: полный повторный экспорт")
+    return 0, None, True
+
+
+def _save_export_state(conn: sqlite3.Connection, target: str, jsonl_path: str, offset: int, last_trial_id: Optional[int]) -> None:
+    """Record how far target has consumed jsonl_path."""
+    inode, head_crc = _log_identity(jsonl_path, offset)
+    with conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO export_state VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (target, str(Path(jsonl_path).resolve()), inode, offset, head_crc,
+             last_trial_id, datetime.now().isoformat())
+        )
+
+
+# trials columns added after the original export format: (name, SQL type).
+# Older databases get them via ALTER TABLE; absent values stay NULL.
+EXTRA_COLUMNS = [
+    ('mono_ns', 'INTEGER'),
+    ('hang', 'INTEGER'),
+    ('rtt_arm_ms', 'REAL'),
+    ('rtt_fire_ms', 'REAL'),
+    ('rtt_status_ms', 'REAL'),
+    ('trace_min', 'INTEGER'),
+    ('trace_argmin', 'INTEGER'),
+    ('trace_mean', 'REAL'),
+]
+
+
+# Base trials schema of the SQLite export
+_TRIALS_DDL = '''
+    CREATE TABLE IF NOT EXISTS trials (
+        trial_id INTEGER PRIMARY KEY,
+        timestamp TEXT,
+        tg_ns INTEGER,
+        delay_ns INTEGER,
+        outcome TEXT,
+        trigger_seen INTEGER,
+        trigger_cleared INTEGER,
+        led_state TEXT
+    )
+'''
+
+# Indexes built once the rows are in (cheaper than maintaining them per insert)
+_TRIALS_INDEXES = {
+    'idx_trials_cell': '(tg_ns, delay_ns)',
+    'idx_trials_outcome': '(outcome)',
+}
+
+
+def _open_export(sqlite_path: str, synchronous: str = 'OFF', **connect_kwargs) -> sqlite3.Connection:
+    """Connection for bulk loading: WAL journal, no fsync by default, schema migrated."""
     Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(sqlite_path, **connect_kwargs)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA synchronous={synchronous}')
+    conn.execute(_TRIALS_DDL)
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(trials)')}
+    for name, sql_type in EXTRA_COLUMNS:
+        if name not in columns:
+            conn.execute(f'ALTER TABLE trials ADD COLUMN {name} {sql_type}')
+    conn.execute('CREATE TABLE IF NOT EXISTS labels (trial_id INTEGER PRIMARY KEY, outcome TEXT)')
+    conn.commit()
+    return conn
+
+
+_EXTRA_NAMES = [name for name, _ in EXTRA_COLUMNS]
+
+_INSERT_TRIAL = f'''
+    INSERT OR REPLACE INTO trials
+    (trial_id, timestamp, tg_ns, delay_ns, outcome,
+     trigger_seen, trigger_cleared, led_state, {', '.join(_EXTRA_NAMES)})
+    VALUES ({', '.join('?' * (8 + len(_EXTRA_NAMES)))})
+'''
+
+
+def _trial_row(event: Dict[str, Any]) -> tuple:
+    """trials row (in _INSERT_TRIAL order) from a trial_complete event."""
+    get = event.get
+    return (
+        get('trial_id'),
+        get('timestamp'),
+        get('tg_ns'),
+        get('delay_ns'),
+        get('outcome'),
+        1 if get('trigger_seen') else 0,
+        1 if get('trigger_cleared') else 0,
+        get('led_state'),
+        *map(get, _EXTRA_NAMES)
+    )
+
+
+def _load_trials(conn: sqlite3.Connection, events: Iterable[Dict[str, Any]], batch_size: int) -> int:
+    """executemany the events into trials, one transaction per batch_size rows."""
+    loaded = 0
+    batch = []
+    for event in events:
+        batch.append(_trial_row(event))
+        if len(batch) >= batch_size:
+            with conn:
+                conn.executemany(_INSERT_TRIAL, batch)
+            loaded += len(batch)
+            batch.clear()
+    if batch:
+        with conn:
+            conn.executemany(_INSERT_TRIAL, batch)
+        loaded += len(batch)
+    return loaded
+
+
+# Every event of an EventStoreSQLite, as codec JSON (trial_complete also goes to trials)
+_EVENTS_DDL = '''
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY,
+        event_type TEXT,
+        timestamp TEXT,
+        mono_ns INTEGER,
+        trial_id INTEGER,
+        data BLOB
+    )
+'''
+
+
+def _is_event_db(path) -> bool:
+    """SQLite paths are recognised by suffix, as in ResponseSurface.load."""
+    return Path(path).suffix in ('.sqlite', '.db')
+
+
+def _iter_db_events(sqlite_path: str, event_type: Optional[str], codec: str) -> Iterator[Dict[str, Any]]:
+    """Events of an EventStoreSQLite database in append order."""
+    loads = get_codec(codec).loads
     conn = sqlite3.connect(sqlite_path)
-    cursor = conn.cursor()
-    
-    # Create table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS trials (
-            trial_id INTEGER PRIMARY KEY,
-            timestamp TEXT,
-            tg_ns INTEGER,
-            delay_ns INTEGER,
-            outcome TEXT,
-            trigger_seen INTEGER,
-            trigger_cleared INTEGER,
-            led_state TEXT
-        )
-    ''')
+    try:
+        try:
+            if event_type is None:
+                rows = conn.execute('SELECT data FROM events ORDER BY id')
+            else:
+                rows = conn.execute('SELECT data FROM events WHERE event_type = ? ORDER BY id', (event_type,))
+        except sqlite3.OperationalError:
+            raise ValueError(f"В {sqlite_path} нет таблицы events (это экспорт, а не журнал storage.backend: sqlite)")
+        for (data,) in rows:
+            yield loads(data)
+    finally:
+        conn.close()
+
+
+class EventStoreSQLite:
+    """
+    SQLite event logger with the EventStoreJSONL interface.
     
-    # Insert events
-    for event in events:
-        if event.get('event_type') == 'trial_complete':
-            cursor.execute('''
-                INSERT OR REPLACE INTO trials 
-                (trial_id, timestamp, tg_ns, delay_ns, outcome, 
-                 trigger_seen, trigger_cleared, led_state)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                event.get('trial_id'),
-                event.get('timestamp'),
-                event.get('tg_ns'),
-                event.get('delay_ns'),
-                event.get('outcome'),
-                1 if event.get('trigger_seen') else 0,
-                1 if event.get('trigger_cleared') else 0,
-                event.get('led_state')
-            ))
+    Events are buffered and written in one transaction per batch_size
+    events, or by flush() once commit_s has passed since the last commit;
+    trial_complete events also land in 'trials' (export schema), so a
+    running campaign can be queried from other processes (WAL readers).
+    """
     
-    conn.commit()
-    conn.close()
-    print(f"✅ Экспортировано {len(events)} событий в {sqlite_path}")
+    def __init__(self, path: str, codec: str = 'auto', batch_size: int = 256, commit_s: float = 0.5):
+        """
+        Initialize SQLite event store.
+        
+        Args:
+            path: Path to SQLite database file
+            codec: JSON backend for the event payloads
+            batch_size: Events per transaction
+            commit_s: Longest time flush() keeps events uncommitted
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.commit_s = commit_s
+        self._conn = None
+        self._dumps = get_codec(codec).dumps
+        self._events: List[tuple] = []
+        self._trials: List[tuple] = []
+        self._committed = time.monotonic()
+        # The post-processing thread logs trials while the campaign thread logs the rest
+        self._lock = threading.Lock()
+    
+    def __enter__(self):
+        """Open the database (WAL: readers are not blocked by the campaign)."""
+        self._conn = _open_export(str(self.path), synchronous='NORMAL', check_same_thread=False)
+        self._conn.execute(_EVENTS_DDL)
+        for name, columns in _TRIALS_INDEXES.items():
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON trials {columns}')
+        self._conn.commit()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Commit pending events and close."""
+        if self._conn:
+            self._commit()
+            self._conn.close()
+            self._conn = None
+    
+    def append(self, obj: dict) -> None:
+        """
+        Append an event to the log.
+        
+        Args:
+            obj: Dictionary to log (payload is JSON-serialized)
+        """
+        if not self._conn:
+            raise RuntimeError("Event store not opened (use context manager)")
+        
+        event = {
+            'timestamp': datetime.now().isoformat(),
+            'mono_ns': time.monotonic_ns(),
+            **obj
+        }
+        with self._lock:
+            self._events.append((event.get('event_type'), event['timestamp'], event['mono_ns'],
+                                 event.get('trial_id'), self._dumps(event)))
+            if event.get('event_type') == 'trial_complete':
+                self._trials.append(_trial_row(event))
+            full = len(self._events) >= self.batch_size
+        if full:
+            self._commit()
+    
+    def flush(self) -> None:
+        """Commit buffered events if the last commit is older than commit_s."""
+        if self._conn and time.monotonic() - self._committed >= self.commit_s:
+            self._commit()
+    
+    def _commit(self) -> None:
+        with self._lock:
+            if self._events:
+                with self._conn:
+                    self._conn.executemany(
+                        'INSERT INTO events (event_type, timestamp, mono_ns, trial_id, data) VALUES (?, ?, ?, ?, ?)',
+                        self._events
+                    )
+                    if self._trials:
+                        self._conn.executemany(_INSERT_TRIAL, self._trials)
+                self._events.clear()
+                self._trials.clear()
+            self._committed = time.monotonic()
+
+
+EventStore = Union[EventStoreJSONL, EventStoreSQLite]
 
 
-def export_to_csv(jsonl_path: str, csv_path: str) -> None:
+def event_log_path(storage_config: Dict[str, Any]) -> str:
+    """Where a campaign's events are: storage.sqlite_path for the sqlite backend, else jsonl_path."""
+    if storage_config.get('backend', 'jsonl') == 'sqlite':
+        return storage_config['sqlite_path']
+    return storage_config['jsonl_path']
+
+
+def open_event_store(storage_config: Dict[str, Any]) -> EventStore:
+    """
+    Event store selected by storage.backend.
+    
+    Raises:
+        ValueError: Unknown backend
+    """
+    backend = storage_config.get('backend', 'jsonl')
+    codec = storage_config.get('json_codec', 'auto')
+    if backend == 'jsonl':
+        return EventStoreJSONL(storage_config['jsonl_path'], codec)
+    if backend == 'sqlite':
+        return EventStoreSQLite(storage_config['sqlite_path'], codec,
+                                storage_config.get('sqlite_batch', 256),
+                                storage_config.get('sqlite_commit_s', 0.5))
+    raise ValueError(f"Неизвестный storage.backend: {backend} (доступны: jsonl, sqlite)")
+
+
+def export_to_sqlite(jsonl_path: str, sqlite_path: str, batch_size: int = 10_000, full: bool = False) -> int:
+    """
+    Export JSONL events to SQLite database.
+    
+    Creates a simple 'trials' table with flattened fields, plus an empty
+    'labels' table (trial_id, outcome) for hand labels used by MLClassifier.
+    The log is streamed line by line and inserted in batch_size-row
+    transactions, so memory use does not grow with the log.
+    
+    Exports are incremental: the byte offset and inode of the log and the
+    last trial_id in the table are kept in 'export_state', and the next
+    export only reads the lines appended since. A truncated, rotated or
+    replaced log, or a trials table that no longer matches the recorded
+    state, is rebuilt from scratch (hand labels are kept).
+    
+    Args:
+        jsonl_path: Path to JSONL file
+        sqlite_path: Path to SQLite database file
+        batch_size: Rows per transaction
+        full: Ignore the recorded state and rebuild
+    
+    Returns:
+        Number of trials exported
+    """
+    start = time.perf_counter()
+    conn = _open_export(sqlite_path)
+    try:
+        offset, last_trial_id, rebuild = _export_start(conn, 'trials', jsonl_path, full)
+        if offset:
+            (max_id,) = conn.execute('SELECT MAX(trial_id) FROM trials').fetchone()
+            if max_id != last_trial_id:
+                print("🔄 Таблица trials изменена вне экспорта: полный повторный экспорт")
+                offset, last_trial_id, rebuild = 0, None, True
+        if rebuild:
+            with conn:
+                for name in _TRIALS_INDEXES:
+                    conn.execute(f'DROP INDEX IF EXISTS {name}')
+                conn.execute('DELETE FROM trials')
+        
+        tail = _LogTail(jsonl_path, offset, 'trial_complete')
+        loaded = _load_trials(conn, tail, batch_size)
+        for name, columns in _TRIALS_INDEXES.items():
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON trials {columns}')
+        conn.commit()
+        (max_id,) = conn.execute('SELECT MAX(trial_id) FROM trials').fetchone()
+        _save_export_state(conn, 'trials', jsonl_path, tail.offset, max_id)
+    finally:
+        conn.close()
+    
+    if not loaded:
+        if offset:
+            print(f"✅ {sqlite_path} актуален: новых испытаний нет")
+        else:
+            print("⚠️  Нет испытаний для экспорта")
+        return 0
+    elapsed = time.perf_counter() - start
+    what = f"{loaded} новых испытаний (с байта {offset:,})" if offset else f"{loaded} испытаний"
+    print(f"✅ Экспортировано {what} в {sqlite_path} "
+          f"({elapsed:.2f} с, {loaded / max(elapsed, 1e-9):,.0f} строк/с)")
+    return loaded
+
+
+_CSV_FIELDS = ['trial_id', 'timestamp', 'tg_ns', 'delay_ns', 'outcome',
+               'trigger_seen', 'trigger_cleared', 'led_state'] + _EXTRA_NAMES
+
+
+def export_to_csv(jsonl_path: str, csv_path: str, state_db: Optional[str] = None, full: bool = False) -> int:
     """
     Export JSONL events to CSV.
     
+    With state_db (the SQLite export) the progress is recorded there under
+    the CSV path, and later exports append only the newly logged trials;
+    otherwise (or from an event database) the CSV is rewritten from the
+    whole log.
+    
     Args:
         jsonl_path: Path to JSONL file
         csv_path: Path to CSV file
+        state_db: SQLite database holding export_state
+        full: Ignore the recorded state and rewrite
+    
+    Returns:
+        Number of trials written
     """
     import csv
     
-    # Read JSONL
-    events = []
-    with open(jsonl_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                event = json.loads(line)
-                if event.get('event_type') == 'trial_complete':
-                    events.append(event)
+    if _is_event_db(jsonl_path):
+        state_db = None  # event database: always rewritten
+    conn = sqlite3.connect(state_db) if state_db else None
+    try:
+        target = str(Path(csv_path).resolve())
+        offset, last_trial_id = 0, None
+        if conn is not None:
+            offset, last_trial_id, _ = _export_start(conn, target, jsonl_path, full)
+        if not Path(csv_path).exists():
+            offset, last_trial_id = 0, None
+        
+        tail = _LogTail(jsonl_path, offset, 'trial_complete')
+        events = iter_events(jsonl_path, 'trial_complete') if _is_event_db(jsonl_path) else tail
+        written = 0
+        Path(csv_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(csv_path, 'a' if offset else 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if not offset:
+                writer.writerow(_CSV_FIELDS)
+            for event in events:
+                writer.writerow(event.get(name) for name in _CSV_FIELDS)
+                last_trial_id = event.get('trial_id')
+                written += 1
+        
+        if conn is not None:
+            _save_export_state(conn, target, jsonl_path, tail.offset, last_trial_id)
+    finally:
+        if conn is not None:
+            conn.close()
     
-    if not events:
+    if offset and written:
+        print(f"✅ Дописано {written} новых испытаний в {csv_path}")
+    elif offset:
+        print(f"✅ {csv_path} актуален: новых испытаний нет")
+    elif written:
+        print(f"✅ Экспортировано {written} испытаний в {csv_path}")
+    else:
         print("⚠️  Нет данных для экспорта")
-        return
+    return written
+
+
+# Typed columns of the columnar export: (name, dtype, value for missing fields).
+# outcome/mode/clock_impl are int8 codes into the <name>_labels lists stored
+# alongside (-1 = missing); led_on is led_state == 'ON'.
+COLUMNAR_SCHEMA = [
+    ('trial_id', 'int64', -1),
+    ('tg_ns', 'int64', -1),
+    ('delay_ns', 'int64', -1),
+    ('outcome', 'int8', -1),
+    ('mode', 'int8', -1),
+    ('clock_impl', 'int8', -1),
+    ('trigger_seen', 'bool', False),
+    ('trigger_cleared', 'bool', False),
+    ('led_on', 'bool', False),
+    ('hang', 'bool', False),
+    ('power_enabled', 'bool', False),
+    ('timestamp', 'datetime64[us]', 'NaT'),
+    ('mono_ns', 'int64', -1),
+    ('duration_ms', 'float64', float('nan')),
+    ('rtt_arm_ms', 'float64', float('nan')),
+    ('rtt_fire_ms', 'float64', float('nan')),
+    ('rtt_status_ms', 'float64', float('nan')),
+    ('trace_min', 'float64', float('nan')),
+    ('trace_argmin', 'int64', -1),
+    ('trace_mean', 'float64', float('nan')),
+]
+
+
+def _columnar_labels() -> Dict[str, List[str]]:
+    """Code -> label lists of the coded columns."""
+    from .model import Outcome, AttackMode, ClockImpl
+    return {
+        'outcome': [o.value for o in Outcome],
+        'mode': [m.value for m in AttackMode],
+        'clock_impl': [c.value for c in ClockImpl],
+    }
+
+
+def _columnar_chunk(events: List[Dict[str, Any]], codes: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+    """One block of trial_complete events as typed NumPy columns."""
+    import numpy as np
+    
+    columns = {}
+    for name, dtype, fill in COLUMNAR_SCHEMA:
+        if name in codes:
+            lookup = codes[name]
+            values = [lookup.get(e.get(name), -1) for e in events]
+        elif name == 'led_on':
+            values = [e.get('led_state') == 'ON' for e in events]
+        elif dtype == 'bool':
+            values = [bool(e.get(name)) for e in events]
+        else:
+            values = [fill if (v := e.get(name)) is None else v for e in events]
+        columns[name] = np.array(values, dtype=dtype)
+    return columns
+
+
+class _NpzColumnWriter:
+    """
+    Streams columns into an uncompressed .npz (the np.savez layout).
     
-    # Write CSV
-    Path(csv_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        fieldnames = ['trial_id', 'timestamp', 'tg_ns', 'delay_ns', 'outcome', 
-                      'trigger_seen', 'trigger_cleared', 'led_state']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+    Blocks are appended to one raw file per column; close() writes each as
+    a .npy member with the final length, copying in bounded chunks.
+    """
+    
+    def __init__(self, path: Path, labels: Dict[str, List[str]]):
+        import tempfile
+        self.path = path
+        self.labels = labels
+        self._tmp = tempfile.TemporaryDirectory(dir=path.parent, prefix='.columnar-')
+        self._files: Dict[str, Any] = {}
+        self._dtypes: Dict[str, Any] = {}
+        self.rows = 0
+    
+    def write(self, columns: Dict[str, Any]) -> None:
+        for name, array in columns.items():
+            if name not in self._files:
+                self._files[name] = open(Path(self._tmp.name) / f'{name}.bin', 'wb')
+                self._dtypes[name] = array.dtype
+            array.tofile(self._files[name])
+        self.rows += len(next(iter(columns.values())))
+    
+    def close(self) -> None:
+        import shutil
+        import zipfile
+        import numpy as np
         
-        for event in events:
-            writer.writerow({
-                'trial_id': event.get('trial_id'),
-                'timestamp': event.get('timestamp'),
-                'tg_ns': event.get('tg_ns'),
-                'delay_ns': event.get('delay_ns'),
-                'outcome': event.get('outcome'),
-                'trigger_seen': event.get('trigger_seen'),
-                'trigger_cleared': event.get('trigger_cleared'),
-                'led_state': event.get('led_state')
-            })
-    
-    print(f"✅ Экспортировано {len(events)} испытаний в {csv_path}")
+        try:
+            with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+                for name, f in self._files.items():
+                    f.close()
+                    with zf.open(f'{name}.npy', 'w', force_zip64=True) as dst, open(f.name, 'rb') as src:
+                        np.lib.format.write_array_header_1_0(dst, {
+                            'descr': np.lib.format.dtype_to_descr(self._dtypes[name]),
+                            'fortran_order': False,
+                            'shape': (self.rows,)
+                        })
+                        shutil.copyfileobj(src, dst, 1 << 20)
+                for name, labels in self.labels.items():
+                    with zf.open(f'{name}_labels.npy', 'w') as dst:
+                        np.lib.format.write_array(dst, np.array(labels))
+        finally:
+            for f in self._files.values():
+                f.close()
+            self._tmp.cleanup()
+
+
+class _ParquetColumnWriter:
+    """Writes each block as a Parquet row group; labels go to the schema metadata."""
+    
+    def __init__(self, path: Path, labels: Dict[str, List[str]]):
+        import pyarrow.parquet  # noqa: F401 (ImportError selects the .npz writer)
+        self.path = path
+        self.labels = labels
+        self._writer = None
+        self.rows = 0
+    
+    def write(self, columns: Dict[str, Any]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        table = pa.table(columns)
+        if self._writer is None:
+            metadata = {f'{name}_labels': json.dumps(labels, ensure_ascii=False) for name, labels in self.labels.items()}
+            self._writer = pq.ParquetWriter(self.path, table.schema.with_metadata(metadata))
+        self._writer.write_table(table.replace_schema_metadata(self._writer.schema.metadata))
+        self.rows += table.num_rows
+    
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def export_to_columnar(events_path: str, output_base: str, fmt: str = 'auto', chunk_rows: int = 65_536) -> Optional[str]:
+    """
+    Export trials to a columnar file with the typed columns of COLUMNAR_SCHEMA.
+    
+    One streaming pass over the log; at most chunk_rows events are held in
+    memory. Parquet gets one row group per chunk, .npz is assembled from
+    per-column spill files.
+    
+    Args:
+        events_path: JSONL log or event database
+        output_base: Output path without suffix (.parquet / .npz is added)
+        fmt: 'parquet', 'npz' or 'auto' (Parquet if pyarrow is installed)
+        chunk_rows: Events per block
+    
+    Returns:
+        Path written, or None if there were no trials
+    
+    Raises:
+        ValueError: Unknown format
+        ImportError: 'parquet' requested without pyarrow
+    """
+    if fmt not in ('auto', 'parquet', 'npz'):
+        raise ValueError(f"Неизвестный колоночный формат: {fmt} (доступны: auto, parquet, npz)")
+    labels = _columnar_labels()
+    codes = {name: {label: code for code, label in enumerate(values)} for name, values in labels.items()}
+    
+    base = Path(output_base)
+    base.parent.mkdir(parents=True, exist_ok=True)
+    writer = None
+    if fmt in ('auto', 'parquet'):
+        try:
+            writer = _ParquetColumnWriter(base.with_suffix('.parquet'), labels)
+        except ImportError:
+            if fmt == 'parquet':
+                raise
+    if writer is None:
+        writer = _NpzColumnWriter(base.with_suffix('.npz'), labels)
+    
+    start = time.perf_counter()
+    chunk = []
+    try:
+        for event in iter_events(events_path, 'trial_complete'):
+            chunk.append(event)
+            if len(chunk) >= chunk_rows:
+                writer.write(_columnar_chunk(chunk, codes))
+                chunk.clear()
+        if chunk:
+            writer.write(_columnar_chunk(chunk, codes))
+    finally:
+        writer.close()
+    
+    if not writer.rows:
+        writer.path.unlink(missing_ok=True)
+        print("⚠️  Нет данных для экспорта")
+        return None
+    elapsed = time.perf_counter() - start
+    size_mb = writer.path.stat().st_size / 2**20
+    print(f"✅ Экспортировано {writer.rows} испытаний в {writer.path} "
+          f"({size_mb:.1f} МБ, {elapsed:.2f} с)")
+    return str(writer.path)
+
+
+def read_columnar(path: str) -> Dict[str, Any]:
+    """
+    Columns of a columnar export as NumPy arrays.
+    
+    Coded columns come with their '<name>_labels' arrays, so that
+    ``labels['outcome'][codes]`` style decoding works for both formats.
+    """
+    import numpy as np
+    
+    if Path(path).suffix == '.parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        columns = {name: table.column(name).to_numpy() for name in table.column_names}
+        for key, value in (table.schema.metadata or {}).items():
+            columns[key.decode('utf-8')] = np.array(json.loads(value))
+        return columns
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def rewrite_outcomes(jsonl_path: str, output_path: str, outcomes: Dict[int, str], note: Dict[str, Any]) -> int:
+    """
+    Copy a log with new trial outcomes (the old one kept as outcome_logged).
+    
+    Lines other than trial_complete are copied byte for byte; a closing
+    'reclassified' event records note.
+    
+    Returns:
+        Number of trials whose outcome changed
+    """
+    codec = get_codec()
+    marker = b'"trial_complete"'
+    changed = 0
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(jsonl_path, 'rb') as src, open(output_path, 'wb') as dst:
+        for line in src:
+            if marker in line:
+                event = codec.loads(line)
+                if event.get('event_type') == 'trial_complete' and event['trial_id'] in outcomes:
+                    new = outcomes[event['trial_id']]
+                    changed += new != event.get('outcome')
+                    event['outcome_logged'] = event.get('outcome')
+                    event['outcome'] = new
+                    line = codec.dumps(event) + b'\n'
+            dst.write(line)
+    with EventStoreJSONL(output_path) as store:
+        store.append({'event_type': 'reclassified', 'source': str(jsonl_path), 'changed': changed, **note})
+    return changed
+
+
+def write_outcome_column(sqlite_path: str, column: str, outcomes: Dict[int, str]) -> int:
+    """Store outcomes in a (new) trials column of a SQLite export; returns rows updated."""
+    if not column.isidentifier():
+        raise ValueError(f"Недопустимое имя столбца: {column}")
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(trials)')}
+        if not columns:
+            raise ValueError(f"В {sqlite_path} нет таблицы trials (сначала ub report)")
+        if column not in columns:
+            conn.execute(f'ALTER TABLE trials ADD COLUMN {column} TEXT')
+        cursor = conn.executemany(
+            f'UPDATE trials SET {column} = ? WHERE trial_id = ?',
+            ((outcome, trial_id) for trial_id, outcome in outcomes.items())
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+def load_cell_priors(sqlite_paths: Iterable[str]) -> Dict[Tuple[int, int], Tuple[int, int, int]]:
+    """
+    Aggregate per-cell outcomes from previous SQLite exports.
+    
+    Uses a GROUP BY over an index on (tg_ns, delay_ns), created on first use.
+    
+    Args:
+        sqlite_paths: results.sqlite files of earlier campaigns on the same target
+    
+    Returns:
+        {(tg_ns, delay_ns): (total, successes, hangs)} summed over all files
+    """
+    from .model import Outcome
+    
+    priors: Dict[Tuple[int, int], Tuple[int, int, int]] = {}
+    for path in sqlite_paths:
+        if not Path(path).exists():
+            print(f"⚠️  Файл априорных данных не найден: {path}")
+            continue
+        
+        conn = sqlite3.connect(path)
+        try:
+            try:
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_trials_cell ON trials (tg_ns, delay_ns)')
+            except sqlite3.OperationalError:
+                pass  # read-only database: fall back to a table scan
+            
+            rows = conn.execute('''
+                SELECT tg_ns, delay_ns, COUNT(*),
+                       SUM(outcome = ?), SUM(outcome = ?)
+                FROM trials
+                GROUP BY tg_ns, delay_ns
+            ''', (Outcome.SUCCESS.value, Outcome.HANG.value))
+            
+            for tg_ns, delay_ns, total, success, hang in rows:
+                prev = priors.get((tg_ns, delay_ns), (0, 0, 0))
+                priors[(tg_ns, delay_ns)] = (prev[0] + total, prev[1] + success, prev[2] + hang)
+        finally:
+            conn.close()
+    
+    return priors
@@ -3,9 +3,58 @@ Attack strategies: Grid Search, Random Search, and stubs for advanced methods.
 """
 
 from abc import ABC, abstractmethod
-from typing import List
-import random
-from .model import AttackSpec, TriggerSpec, Trial, StrategyConfig, AttackMode, ClockImpl
+from collections import deque
+from typing import List, Dict, Tuple, Optional
+import heapq
+import itertools
+import math
+import numpy as np
+from .registry import get_strategy_class
+from .storage import load_cell_priors
+from .space import GridSpace, SearchSpace, sobol, halton, latin_hypercube
+from .model import AttackSpec, AttackRecord, TriggerSpec, Trial, StrategyConfig, Outcome, TimingCaps
+
+
+class CostModel:
+    """
+    Running mean wall time per outcome class.
+    
+    Lets strategies rank candidates by successes per second instead of
+    per trial: a HANG (timeouts, hard reset, re-arm) costs far more than a
+    NO_EFFECT. Until an outcome class has been measured it is assumed to
+    cost the same as the overall mean (or 1 s with no data at all).
+    """
+    
+    def __init__(self):
+        self._total: Dict[Outcome, float] = {}
+        self._count: Dict[Outcome, int] = {}
+    
+    def observe(self, trial: Trial) -> None:
+        """Record a finished trial's measured duration."""
+        if trial.duration_s is None or trial.outcome is None:
+            return
+        self._total[trial.outcome] = self._total.get(trial.outcome, 0.0) + trial.duration_s
+        self._count[trial.outcome] = self._count.get(trial.outcome, 0) + 1
+    
+    def mean(self, outcome: Optional[Outcome] = None) -> Optional[float]:
+        """Mean seconds for one outcome class (None = all trials); None if unmeasured."""
+        if outcome is None:
+            count = sum(self._count.values())
+            return sum(self._total.values()) / count if count else None
+        count = self._count.get(outcome, 0)
+        return self._total[outcome] / count if count else None
+    
+    def expected_cost(self, p_success, p_hang):
+        """Expected seconds per trial for given outcome probabilities (scalars or arrays)."""
+        base = self.mean() or 1.0
+        c_other = self.mean(Outcome.NO_EFFECT) or base
+        c_success = self.mean(Outcome.SUCCESS) or base
+        c_hang = self.mean(Outcome.HANG) or base
+        return p_success * c_success + p_hang * c_hang + (1 - p_success - p_hang) * c_other
+    
+    def summary(self) -> Dict[Outcome, Tuple[int, float]]:
+        """{outcome: (trials, mean seconds)} for measured classes."""
+        return {o: (n, self._total[o] / n) for o, n in self._count.items()}
 
 
 class Strategy(ABC):
@@ -14,12 +63,22 @@ class Strategy(ABC):
     def __init__(self, cfg: StrategyConfig, trigger: TriggerSpec):
         self.cfg = cfg
         self.trigger = trigger
+        # Fed by the orchestrator before observe(); used by cost-aware strategies
+        self.costs = CostModel()
+        self.cost_aware = cfg.params.get('cost_aware', False)
+        # Stand timing resolution, set by apply_timing()
+        self.timing: Optional[TimingCaps] = None
     
     @abstractmethod
     def propose(self, history: List[Trial], n: int) -> List[AttackSpec]:
         """
         Propose next n attack configurations.
         
+        Fewer than n (or none) are returned when the strategy has to see
+        outcomes first: an empty list means "observe the outstanding
+        trials, then ask again" while ``pending`` is True, and that the
+        strategy is exhausted otherwise.
+        
         Args:
             history: List of completed trials
             n: Number of attacks to propose
@@ -29,10 +88,79 @@ class Strategy(ABC):
         """
         pass
     
+    @property
+    def pending(self) -> bool:
+        """True while proposals the next propose() depends on await observe()."""
+        return False
+    
+    @property
+    def resumable(self) -> bool:
+        """True if seek() can continue a campaign (strategies without it restart cold)."""
+        return type(self).seek is not Strategy.seek
+    
+    def seek(self, position: int) -> None:
+        """
+        Skip ahead to a traversal position (optional, used on resume).
+        
+        Args:
+            position: Number of proposals already consumed
+        """
+        pass
+    
+    def apply_timing(self, timing: TimingCaps) -> Optional[Tuple[int, int]]:
+        """
+        Snap candidate points to the stand timing resolution (optional).
+        
+        Called by the orchestrator once per session with the GET_CAPS
+        timing, after ``seek`` and before the first ``propose``. Points that
+        collapse onto the same hardware setting are scheduled only once.
+        
+        Returns:
+            (configured points, distinct realizable points), or None if unknown
+        """
+        self.timing = timing
+        return None
+    
+    def _prior_cells(self) -> List[Tuple[int, int]]:
+        """
+        Promising (tg_ns, delay_ns) cells from ``params.prior_from``, best first.
+        
+        ``prior_from`` lists results.sqlite files of earlier campaigns on the
+        same chip and firmware. Cells with at least one recorded success are
+        ranked by posterior mean success rate (s + 1) / (n + 2).
+        """
+        paths = self.cfg.params.get('prior_from')
+        if not paths:
+            return []
+        if isinstance(paths, str):
+            paths = [paths]
+        
+        priors = load_cell_priors(paths)
+        ranked = sorted(
+            ((success + 1) / (total + 2), cell)
+            for cell, (total, success, _) in priors.items()
+            if success > 0
+        )
+        cells = [cell for _, cell in reversed(ranked)]
+        print(f"📚 Априорные данные: {len(priors)} ячеек, перспективных: {len(cells)}")
+        return cells
+    
+    def _prior_points(self, space: SearchSpace) -> List[dict]:
+        """Prior cells that are points of space (tg_ns/delay_ns-only spaces)."""
+        cells = self._prior_cells()
+        if cells and set(space.names) != {'tg_ns', 'delay_ns'}:
+            print("⚠️  prior_from учитывается только для пространства tg_ns × delay_ns")
+            return []
+        points = [{'tg_ns': tg_ns, 'delay_ns': delay_ns} for tg_ns, delay_ns in cells]
+        return [point for point in points if space.contains(point)]
+    
     def observe(self, trials: List[Trial]) -> None:
         """
         Update strategy based on observed trials (optional).
         
+        The orchestrator calls this once per finished trial, so adaptive
+        strategies can keep incremental state instead of rescanning history.
+        
         Args:
             trials: List of new trials to learn from
         """
@@ -42,53 +170,246 @@ class Strategy(ABC):
 class GridSearchStrategy(Strategy):
     """Exhaustive grid search over parameter space."""
     
+    # Traversal order -> outermost axis (None = space order)
+    ORDERS = {
+        'tg_major': 'tg_ns',
+        'delay_major': 'delay_ns',
+        'shuffled': None,
+    }
+    
     def __init__(self, cfg: StrategyConfig, trigger: TriggerSpec):
         super().__init__(cfg, trigger)
+        self._space = SearchSpace.from_params(self.cfg.params)
         self._grid = self._build_grid()
+        self.repeats = self._grid.repeats
+        
+        # Warm start: high-probability cells from earlier campaigns go first
+        self._prefix = self._prior_points(self._space)
+        self._prefix_keys = {self._key(point) for point in self._prefix}
+        
+        self._prefix_idx = 0
         self._current_idx = 0
+        self.seek(self.cfg.params.get('start_index', 0))
     
-    def _build_grid(self) -> List[AttackSpec]:
-        """Build complete grid of attack configurations."""
+    def _build_grid(self) -> GridSpace:
+        """Build the lazy, index-addressed grid of attack configurations."""
         params = self.cfg.params
-        tg_ns_values = params.get('tg_ns', [100])
-        delay_ns_config = params.get('delay_ns', {'start': 0, 'stop': 1000, 'step': 100})
         repeats = params.get('repeats_per_point', 1)
+        order = params.get('order', 'tg_major')
         
-        # Build delay_ns range
-        delay_ns_values = list(range(
-            delay_ns_config['start'],
-            delay_ns_config['stop'],
-            delay_ns_config['step']
-        ))
+        if order not in self.ORDERS:
+            raise ValueError(f"Неизвестный порядок обхода: {order} (доступно: {', '.join(self.ORDERS)})")
         
-        # Build grid
-        grid = []
-        for tg_ns in tg_ns_values:
-            for delay_ns in delay_ns_values:
-                for _ in range(repeats):
-                    grid.append(AttackSpec(
-                        mode=AttackMode.CLOCK_GLITCH,
-                        clock_impl=ClockImpl.COMPRESS,
-                        tg_ns=tg_ns,
-                        delay_ns=delay_ns
-                    ))
+        axes = self._space.names
+        lead = self.ORDERS[order]
+        if lead is not None:
+            axes = [lead] + [name for name in axes if name != lead]
         
-        return grid
+        return self._space.grid(
+            repeats=repeats,
+            order=axes,
+            shuffle=(order == 'shuffled'),
+            seed=params.get('seed')
+        )
+    
+    def _key(self, point: dict) -> tuple:
+        return tuple(point[name] for name in self._space.names)
+    
+    @property
+    def resumable(self) -> bool:
+        # A shuffled order without a seed is a new permutation on every run
+        return self.cfg.params.get('order') != 'shuffled' or self.cfg.params.get('seed') is not None
+    
+    def seek(self, position: int) -> None:
+        """Continue traversal from position (e.g. number of trials already done)."""
+        position = max(0, position)
+        self._position = position
+        self._prefix_idx = min(position, len(self._prefix) * self.repeats)
+        position -= self._prefix_idx
+        
+        if not self._prefix_keys:
+            self._current_idx = min(position, len(self._grid))
+            return
+        
+        # Grid positions of prior cells were skipped, so walk to find the index
+        self._current_idx = 0
+        while position > 0 and self._current_idx < len(self._grid):
+            if self._key(self._grid[self._current_idx]) not in self._prefix_keys:
+                position -= 1
+            self._current_idx += 1
     
     def propose(self, history: List[Trial], n: int) -> List[AttackSpec]:
-        """Propose next n points from grid."""
+        """Propose next n points: prior cells first, then the grid."""
         proposals = []
-        for _ in range(n):
-            if self._current_idx < len(self._grid):
-                proposals.append(self._grid[self._current_idx])
+        while len(proposals) < n:
+            if self._prefix_idx < len(self._prefix) * self.repeats:
+                point = self._prefix[self._prefix_idx // self.repeats]
+                self._prefix_idx += 1
+            elif self._current_idx < len(self._grid):
+                point = self._grid[self._current_idx]
                 self._current_idx += 1
+                if self._prefix_keys and self._key(point) in self._prefix_keys:
+                    continue  # Already visited from the prior
             else:
                 break  # Grid exhausted
+            proposals.append(self._space.to_attack(point))
+            self._position += 1
         return proposals
+    
+    def apply_timing(self, timing: TimingCaps) -> Optional[Tuple[int, int]]:
+        """Rebuild the grid over distinct realizable points, keeping the position."""
+        super().apply_timing(timing)
+        before = self._space.size
+        self._space = self._space.snap(timing)
+        self._grid = self._build_grid()
+        snapped = {}
+        for point in map(timing.snap_point, self._prefix):
+            snapped.setdefault(self._key(point), point)
+        self._prefix = list(snapped.values())
+        self._prefix_keys = set(snapped)
+        self.seek(self._position)
+        return before, self._space.size
 
 
 class RandomSearchStrategy(Strategy):
-    """Random sampling over parameter space."""
+    """
+    Random sampling without replacement over the stepped parameter space.
+    
+    Samplers: ``permutation`` (shuffled grid, default), or low-discrepancy
+    ``halton`` / ``sobol`` sequences snapped to the configured steps. Uses a
+    private NumPy generator (``seed``) and a visited set, so no point is
+    proposed twice; each point is repeated ``repeats_per_point`` times.
+    """
+    
+    SAMPLERS = ('permutation', 'halton', 'sobol')
+    SAMPLER_PARAM = 'sampler'
+    MAX_MISSES = 1000  # consecutive duplicates before the space counts as exhausted
+    CHUNK = 256
+    
+    def __init__(self, cfg: StrategyConfig, trigger: TriggerSpec):
+        super().__init__(cfg, trigger)
+        params = self.cfg.params
+        self._space = SearchSpace.from_params(params)
+        self.sampler = params.get(self.SAMPLER_PARAM, self.SAMPLERS[0])
+        self.repeats = params.get('repeats_per_point', 1)
+        self._rng = np.random.default_rng(params.get('seed'))
+        
+        if self.sampler not in self.SAMPLERS:
+            raise ValueError(f"Неизвестный сэмплер: {self.sampler} (доступно: {', '.join(self.SAMPLERS)})")
+        
+        self._limit: Optional[int] = None  # sequence length (None = unbounded)
+        self._init_sampler()
+        
+        self._index = 0  # next sequence index
+        self._visited = set()
+        self._buffer: deque = deque()  # sampled, not yet checked against _visited
+        self._backlog: deque = deque()
+        self._skip = 0  # proposals to replay and drop on the next propose (set by seek)
+        
+        # Warm start: high-probability cells from earlier campaigns go first
+        self._buffer.extend(self._prior_points(self._space))
+    
+    def _init_sampler(self) -> None:
+        """Set up the selected sequence."""
+        d = len(self._space.dims)
+        if self.sampler == 'permutation':
+            self._grid = self._space.grid(shuffle=True, seed=int(self._rng.integers(1 << 32)))
+            self._limit = len(self._grid)
+        elif self.sampler == 'sobol':
+            self._shift = self._rng.integers(0, 1 << 32, d, dtype=np.uint64)
+        else:
+            self._shift = self._rng.random(d)
+    
+    @property
+    def resumable(self) -> bool:
+        # Without a seed the sequence cannot be replayed
+        return self.cfg.params.get('seed') is not None
+    
+    def seek(self, position: int) -> None:
+        """
+        Continue the seeded sequence after position proposals.
+        
+        The skipped proposals are replayed on the next propose, i.e. after
+        apply_timing, so they match the snapped space of the first run.
+        """
+        self._skip = max(0, position)
+    
+    def propose(self, history: List[Trial], n: int) -> List[AttackSpec]:
+        """Propose n new attack configurations, drawn as one batch."""
+        while self._skip:
+            skipped = self._propose(min(self._skip, self.CHUNK))
+            self._skip = self._skip - len(skipped) if skipped else 0
+        return self._propose(n)
+    
+    def _propose(self, n: int) -> List[AttackSpec]:
+        proposals = []
+        while len(proposals) < n:
+            if not self._backlog:
+                wanted = -(-(n - len(proposals)) // self.repeats)
+                points = self._draw(wanted)
+                if not points:
+                    break  # Space exhausted
+                for point in points:
+                    self._backlog.extend([self._space.to_attack(point)] * self.repeats)
+            proposals.append(self._backlog.popleft())
+        return proposals
+    
+    def apply_timing(self, timing: TimingCaps) -> Optional[Tuple[int, int]]:
+        """Restart the sequence over distinct realizable points."""
+        super().apply_timing(timing)
+        before = self._space.size
+        self._space = self._space.snap(timing)
+        self._init_sampler()
+        self._index = 0
+        self._buffer = deque(timing.snap_point(point) for point in self._buffer)
+        return before, self._space.size
+    
+    def _draw(self, count: int) -> List[dict]:
+        """Up to count unvisited points."""
+        points = []
+        misses = 0
+        while len(points) < count and misses < self.MAX_MISSES:
+            if not self._buffer:
+                # Sample ahead in chunks to amortize the vectorized sequence cost
+                k = max(count - len(points), self.CHUNK)
+                if self._limit is not None:
+                    k = min(k, self._limit - self._index)
+                    if k <= 0:
+                        break
+                self._buffer.extend(self._sample(self._index, k))
+                self._index += k
+            
+            point = self._buffer.popleft()
+            key = tuple(point[name] for name in self._space.names)
+            if key in self._visited:
+                misses += 1
+                continue
+            self._visited.add(key)
+            points.append(point)
+            misses = 0
+        return points
+    
+    def _sample(self, start: int, count: int) -> List[dict]:
+        """Sequence points [start, start + count)."""
+        if self.sampler == 'permutation':
+            return [self._grid[i] for i in range(start, start + count)]
+        indices = np.arange(start, start + count)
+        d = len(self._space.dims)
+        if self.sampler == 'sobol':
+            return self._space.sample(sobol(indices, d, self._shift))
+        return self._space.sample(halton(indices, d, self._shift))
+
+
+class AdaptiveGridStrategy(Strategy):
+    """
+    Coarse-to-fine grid search over delay_ns.
+    
+    Sweeps the coarse grid (``delay_ns.step``) for every tg_ns first, then
+    bisects the spacing around points whose success or hang rate reaches
+    ``refine_threshold``, down to ``resolution_ns`` (or the stand delay tick, kept in ps). Refinement candidates
+    live in a max-heap keyed by the parent point's rate, so the most
+    promising region is always sampled next.
+    """
     
     def __init__(self, cfg: StrategyConfig, trigger: TriggerSpec):
         super().__init__(cfg, trigger)
@@ -97,25 +418,326 @@ class RandomSearchStrategy(Strategy):
         delay_ns_config = params.get('delay_ns', {'start': 0, 'stop': 1000, 'step': 100})
         self.delay_ns_min = delay_ns_config['start']
         self.delay_ns_max = delay_ns_config['stop']
+        self.coarse_step = delay_ns_config['step']
+        self.repeats = params.get('repeats_per_point', 1)
+        self.threshold = params.get('refine_threshold', 0.2)
+        # Finest spacing in ps, so sub-ns stand ticks (62.5 ns) are not rounded up
+        self.resolution_ps = max(1, params.get('resolution_ns', 1)) * 1000
         
-        # Set random seed if provided
-        seed = params.get('seed', None)
-        if seed is not None:
-            random.seed(seed)
+        # Warm start: promising cells from earlier campaigns in range go first
+        prior = [
+            (tg_ns, delay_ns) for tg_ns, delay_ns in self._prior_cells()
+            if tg_ns in self.tg_ns_values and self.delay_ns_min <= delay_ns < self.delay_ns_max
+        ]
+        
+        # Coarse sweep, consumed lazily before any refinement
+        self._coarse = itertools.chain(prior, (
+            (tg_ns, delay_ns)
+            for tg_ns in self.tg_ns_values
+            for delay_ns in range(self.delay_ns_min, self.delay_ns_max, self.coarse_step)
+        ))
+        # Refinement candidates: (-priority, -width, seq, tg_ns, delay_ns)
+        self._heap: List[Tuple[float, int, int, int, int]] = []
+        self._seq = 0
+        
+        # Per-point state, keyed by (tg_ns, delay_ns)
+        self._width: Dict[Tuple[int, int], int] = {}  # spacing around the point, ps
+        self._stats: Dict[Tuple[int, int], List[int]] = {}  # [total, success, hang]
+        self._pending: Dict[Tuple[int, int], int] = {}
+        self._outstanding = 0  # proposed trials not yet observed
+        
+        self._backlog: deque = deque()  # repeats of the current point
     
     def propose(self, history: List[Trial], n: int) -> List[AttackSpec]:
-        """Propose n random attack configurations."""
+        """Propose next n points, refining around interesting ones."""
         proposals = []
-        for _ in range(n):
-            tg_ns = random.choice(self.tg_ns_values)
-            delay_ns = random.randint(self.delay_ns_min, self.delay_ns_max)
-            proposals.append(AttackSpec(
-                mode=AttackMode.CLOCK_GLITCH,
-                clock_impl=ClockImpl.COMPRESS,
-                tg_ns=tg_ns,
-                delay_ns=delay_ns
-            ))
+        while len(proposals) < n:
+            if not self._backlog:
+                point = self._next_point()
+                if point is None:
+                    break  # Coarse grid done and nothing left to refine
+                self._pending[point] = self._pending.get(point, 0) + self.repeats
+                self._backlog.extend([point] * self.repeats)
+            
+            tg_ns, delay_ns = self._backlog.popleft()
+            proposals.append(AttackRecord(int(tg_ns), int(delay_ns)))
+        self._outstanding += len(proposals)
         return proposals
+    
+    @property
+    def pending(self) -> bool:
+        # Refinement candidates appear only once outstanding points are observed
+        return self._outstanding > 0
+    
+    def apply_timing(self, timing: TimingCaps) -> Optional[Tuple[int, int]]:
+        """Snap the coarse sweep and refinement to the stand delay tick."""
+        super().apply_timing(timing)
+        self.resolution_ps = max(self.resolution_ps, timing.delay_tick_ps)
+        coarse = range(self.delay_ns_min, self.delay_ns_max, self.coarse_step)
+        distinct = {
+            (timing.snap_tg_ns(tg_ns), timing.snap_delay_ns(delay_ns))
+            for tg_ns in self.tg_ns_values for delay_ns in coarse
+        }
+        self._coarse = (
+            (timing.snap_tg_ns(tg_ns), timing.snap_delay_ns(delay_ns))
+            for tg_ns, delay_ns in self._coarse
+        )
+        return len(self.tg_ns_values) * len(coarse), len(distinct)
+    
+    def observe(self, trials: List[Trial]) -> None:
+        """Accumulate outcomes and schedule refinement of finished points."""
+        for trial in trials:
+            key = (trial.attack.tg_ns, trial.attack.delay_ns)
+            if key not in self._width:
+                continue  # Not proposed by this strategy
+            
+            stats = self._stats.setdefault(key, [0, 0, 0])
+            stats[0] += 1
+            if trial.outcome == Outcome.SUCCESS:
+                stats[1] += 1
+            elif trial.outcome == Outcome.HANG:
+                stats[2] += 1
+            
+            self._outstanding -= 1
+            self._pending[key] -= 1
+            if self._pending[key] == 0:
+                self._refine(key)
+    
+    def _next_point(self) -> Optional[Tuple[int, int]]:
+        """Next point to sample: coarse grid first, then best refinement candidate."""
+        for point in self._coarse:
+            if point not in self._width:
+                self._width[point] = self.coarse_step * 1000
+                return point
+        
+        if self._heap:
+            _, _, _, tg_ns, delay_ns = heapq.heappop(self._heap)
+            return (tg_ns, delay_ns)
+        return None
+    
+    def _refine(self, key: Tuple[int, int]) -> None:
+        """Queue the midpoints around key if it crossed the threshold."""
+        total, success, hang = self._stats[key]
+        success_rate = success / total
+        hang_rate = hang / total
+        if max(success_rate, hang_rate) < self.threshold:
+            return
+        
+        # Halve the spacing, in whole multiples of the resolution (ps)
+        width = (self._width[key] // 2) // self.resolution_ps * self.resolution_ps
+        if width < self.resolution_ps:
+            return
+        
+        tg_ns, delay_ns = key
+        if self.cost_aware:
+            # Successes per second: hang-heavy regions wait until cheap ones are done
+            priority = success_rate / self.costs.expected_cost(success_rate, hang_rate)
+        else:
+            priority = success_rate + hang_rate
+        for child_ps in (delay_ns * 1000 - width, delay_ns * 1000 + width):
+            if self.timing is not None:
+                child = self.timing.snap_delay_ns(child_ps / 1000)
+            else:
+                child = child_ps // 1000
+            point = (tg_ns, child)
+            if child < self.delay_ns_min or child >= self.delay_ns_max or point in self._width:
+                continue
+            self._width[point] = width
+            heapq.heappush(self._heap, (-priority, -width, self._seq, tg_ns, child))
+            self._seq += 1
+
+
+class SpaceFillingStrategy(RandomSearchStrategy):
+    """
+    Fixed-budget space-filling design over a declarative search space.
+    
+    Samples ``n_points`` points of ``strategy.params.space`` with a Sobol,
+    Halton or Latin hypercube design, so 5-6 dimensional spaces (tg, delay,
+    clock_impl, power_*) are covered evenly in thousands of trials instead
+    of the millions a full grid would need.
+    """
+    
+    SAMPLERS = ('sobol', 'halton', 'lhs')
+    SAMPLER_PARAM = 'design'
+    
+    def __init__(self, cfg: StrategyConfig, trigger: TriggerSpec):
+        self.n_points = cfg.params.get('n_points', 1024)
+        super().__init__(cfg, trigger)
+    
+    def _init_sampler(self) -> None:
+        if self.sampler == 'lhs':
+            self._lhs = latin_hypercube(self.n_points, len(self._space.dims), self._rng)
+        else:
+            super()._init_sampler()
+        self._limit = self.n_points
+    
+    def _sample(self, start: int, count: int) -> List[dict]:
+        if self.sampler == 'lhs':
+            return self._space.sample(self._lhs[start:start + count])
+        return super()._sample(start, count)
+
+
+class SuccessiveHalvingStrategy(Strategy):
+    """
+    Successive halving over tg_ns x delay-band arms.
+    
+    Every arm (one tg_ns value, one ``band_ns`` wide slice of the delay
+    range) first gets ``min_budget`` trials. When a rung is complete the
+    best 1/``eta`` of the arms by success rate survive and their budget is
+    multiplied by ``eta``, so high-Tg levels that never produce an effect
+    stop consuming trials early. Bookkeeping is kept in NumPy arrays.
+    """
+    
+    def __init__(self, cfg: StrategyConfig, trigger: TriggerSpec):
+        super().__init__(cfg, trigger)
+        params = self.cfg.params
+        tg_ns_values = params.get('tg_ns', [100])
+        delay_ns_config = params.get('delay_ns', {'start': 0, 'stop': 1000, 'step': 100})
+        self.delay_ns_min = delay_ns_config['start']
+        self.delay_step = delay_ns_config['step']
+        self.band_ns = params.get('band_ns', 500)
+        self.eta = params.get('eta', 2)
+        self.budget = params.get('min_budget', 4)
+        self.hang_weight = params.get('hang_weight', 0.0)
+        self._rng = np.random.default_rng(params.get('seed'))
+        
+        if self.band_ns < self.delay_step or self.eta < 2:
+            raise ValueError("Нужно band_ns >= delay_ns.step и eta >= 2")
+        
+        # Arms: one per (tg_ns, delay band)
+        band_lo = np.arange(self.delay_ns_min, delay_ns_config['stop'], self.band_ns)
+        band_hi = np.minimum(band_lo + self.band_ns, delay_ns_config['stop'])
+        self.arm_tg = np.repeat(np.asarray(tg_ns_values, dtype=np.int64), len(band_lo))
+        self.arm_lo = np.tile(band_lo, len(tg_ns_values))
+        # Delay points inside each band (at least one)
+        self.arm_points = np.maximum(1, -(-(np.tile(band_hi, len(tg_ns_values)) - self.arm_lo) // self.delay_step))
+        # Stride coprime with the band size spreads consecutive trials across the band
+        self.arm_stride = np.array([self._coprime_stride(int(k)) for k in self.arm_points], dtype=np.int64)
+        
+        n_arms = len(self.arm_tg)
+        self.issued = np.zeros(n_arms, dtype=np.int64)
+        self.trials = np.zeros(n_arms, dtype=np.int64)
+        self.successes = np.zeros(n_arms, dtype=np.int64)
+        self.hangs = np.zeros(n_arms, dtype=np.int64)
+        self.alive = np.ones(n_arms, dtype=bool)
+        self.rung = 0
+        
+        self._arm_index = {
+            (int(tg), int(lo)): i for i, (tg, lo) in enumerate(zip(self.arm_tg, self.arm_lo))
+        }
+        self._next_arm = 0  # round-robin cursor
+        # Distinct realizable delays per arm, set by apply_timing()
+        self._arm_delays: Optional[List[np.ndarray]] = None
+        self._delay_arm: Dict[Tuple[int, int], int] = {}
+    
+    @staticmethod
+    def _coprime_stride(k: int) -> int:
+        """Stride near k / golden ratio that visits all k points of a band."""
+        stride = max(1, int(k * 0.618))
+        while math.gcd(stride, k) != 1:
+            stride += 1
+        return stride
+    
+    def propose(self, history: List[Trial], n: int) -> List[AttackSpec]:
+        """Round-robin over surviving arms that still have budget in this rung."""
+        proposals = []
+        open_arms = np.flatnonzero(self.alive & (self.issued < self.budget))
+        while len(proposals) < n and len(open_arms):
+            # Continue the rotation where the previous call stopped
+            start = np.searchsorted(open_arms, self._next_arm) % len(open_arms)
+            for arm in np.roll(open_arms, -start)[:n - len(proposals)]:
+                offset = (self.issued[arm] * self.arm_stride[arm]) % self.arm_points[arm]
+                if self._arm_delays is not None:
+                    delay_ns = self._arm_delays[arm][offset]
+                else:
+                    delay_ns = self.arm_lo[arm] + offset * self.delay_step
+                proposals.append(AttackRecord(int(self.arm_tg[arm]), int(delay_ns)))
+                self.issued[arm] += 1
+                self._next_arm = arm + 1
+            open_arms = np.flatnonzero(self.alive & (self.issued < self.budget))
+        return proposals
+    
+    @property
+    def pending(self) -> bool:
+        # The next rung opens only after every issued trial of this one is observed
+        return bool(np.any(self.issued[self.alive] > self.trials[self.alive]))
+    
+    def apply_timing(self, timing: TimingCaps) -> Optional[Tuple[int, int]]:
+        """
+        Replace each arm's delay points by its distinct realizable delays.
+        
+        A realizable point belongs to the first arm that reaches it; arms
+        left without points (band narrower than a tick) are retired.
+        """
+        super().apply_timing(timing)
+        before = int(self.arm_points.sum())
+        self._arm_delays = []
+        for arm in range(len(self.arm_tg)):
+            tg_ns = timing.snap_tg_ns(int(self.arm_tg[arm]))
+            delays = self.arm_lo[arm] + np.arange(self.arm_points[arm]) * self.delay_step
+            own = []
+            for delay_ns in dict.fromkeys(timing.snap_delay_ns(int(d)) for d in delays):
+                if (tg_ns, delay_ns) not in self._delay_arm:
+                    self._delay_arm[(tg_ns, delay_ns)] = arm
+                    own.append(delay_ns)
+            if not own:
+                self.alive[arm] = False
+                own = [timing.snap_delay_ns(int(self.arm_lo[arm]))]
+            self.arm_tg[arm] = tg_ns
+            self._arm_delays.append(np.array(own, dtype=np.int64))
+        self.arm_points = np.array([len(d) for d in self._arm_delays], dtype=np.int64)
+        self.arm_stride = np.array([self._coprime_stride(int(k)) for k in self.arm_points], dtype=np.int64)
+        return before, len(self._delay_arm)
+    
+    def observe(self, trials: List[Trial]) -> None:
+        """Update arm statistics; promote survivors when the rung is complete."""
+        for trial in trials:
+            if self._arm_delays is not None:
+                arm = self._delay_arm.get((trial.attack.tg_ns, trial.attack.delay_ns))
+            else:
+                band = (trial.attack.delay_ns - self.delay_ns_min) // self.band_ns
+                arm = self._arm_index.get((trial.attack.tg_ns, self.delay_ns_min + band * self.band_ns))
+            if arm is None:
+                continue
+            self.trials[arm] += 1
+            if trial.outcome == Outcome.SUCCESS:
+                self.successes[arm] += 1
+            elif trial.outcome == Outcome.HANG:
+                self.hangs[arm] += 1
+        
+        if self.alive.any() and np.all(self.trials[self.alive] >= self.budget):
+            self._promote()
+    
+    def _promote(self) -> None:
+        """Keep the best 1/eta of the surviving arms and multiply the budget (a lone arm ends after one pass over its delays)."""
+        survivors = np.flatnonzero(self.alive)
+        if len(survivors) > 1:
+            n = self.trials[survivors]
+            score = (self.successes[survivors] + self.hang_weight * self.hangs[survivors]) / n
+            if self.cost_aware:
+                # Per second instead of per trial: penalize arms that mostly hang
+                score = score / self.costs.expected_cost(
+                    self.successes[survivors] / n, self.hangs[survivors] / n
+                )
+            # Random tie-break so equal scores do not favour the tg_ns order
+            ranked = survivors[np.lexsort((self._rng.random(len(survivors)), -score))]
+            keep = ranked[:max(1, -(-len(survivors) // self.eta))]
+            self.alive[:] = False
+            self.alive[keep] = True
+        
+        self.rung += 1
+        survivors = np.flatnonzero(self.alive)
+        if len(survivors) == 1:
+            # A lone arm past one pass over its delays would only repeat them
+            points = int(self.arm_points[survivors[0]])
+            if self.trials[survivors[0]] >= points:
+                self.alive[:] = False
+                print(f"🪜 Ступень {self.rung}: последнее плечо пройдено по всем {points} точкам, стратегия исчерпана")
+                return
+            self.budget = min(self.budget * self.eta, points)
+        else:
+            self.budget *= self.eta
+        print(f"🪜 Ступень {self.rung}: осталось плеч {int(self.alive.sum())}, бюджет {self.budget}")
 
 
 class BayesOptStrategy(Strategy):
@@ -155,6 +777,9 @@ def create_strategy(cfg: StrategyConfig, trigger: TriggerSpec) -> Strategy:
     """
     Factory function to create strategy from config.
     
+    Strategies are resolved through ub.registry, so the module defining a
+    plugin strategy is imported only when the config selects it.
+    
     Args:
         cfg: Strategy configuration
         trigger: Trigger specification
@@ -165,15 +790,7 @@ def create_strategy(cfg: StrategyConfig, trigger: TriggerSpec) -> Strategy:
     Raises:
         ValueError: If strategy name is unknown
     """
-    strategies = {
-        'grid': GridSearchStrategy,
-        'random': RandomSearchStrategy,
-        'bayes': BayesOptStrategy,
-        'bandit': BanditStrategy,
-        'window_hunter': WindowHunterStrategy,
-    }
-    
-    strategy_class = strategies.get(cfg.name)
+    strategy_class = get_strategy_class(cfg.name)
     if strategy_class is None:
         raise ValueError(f"Неизвестная стратегия: {cfg.name}")
     
@@ -0,0 +1,212 @@
+"""
+Trace store: fixed-width trace records in a growing numpy.memmap.
+One row per trial under artifacts_dir/traces plus an append-only index
+(trial_id, row, length), so traces never enter the JSONL log or the
+Python heap and can be sliced zero-copy for 10^5+ trials.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+
+INDEX_DTYPE = np.dtype([('trial_id', '<i8'), ('row', '<i8'), ('length', '<u4')])
+
+
+class TraceStore:
+    """
+    Memory-mapped trace rows keyed by trial_id.
+    
+    Writers call ``reserve(trial_id)`` to get the next row as a writable
+    view, fill it in place (e.g. ``fetch_trace(link, row)``), then
+    ``commit(trial_id, length)``. The data file doubles its capacity when
+    full; views handed out earlier are only valid until the next reserve.
+    """
+    
+    DATA = 'traces.bin'
+    INDEX = 'index.bin'
+    META = 'meta.json'
+    INITIAL_ROWS = 1024
+    
+    def __init__(self, path: str, width: Optional[int] = None, dtype: str = 'uint8', readonly: bool = False):
+        """
+        Args:
+            path: Store directory (created on first write)
+            width: Samples per row (required for a new store)
+            dtype: Sample dtype of a new store
+            readonly: Open an existing store for analysis only
+        """
+        self.path = Path(path)
+        self.readonly = readonly
+        meta_path = self.path / self.META
+        
+        if meta_path.exists():
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if width is not None and width != meta['width']:
+                raise ValueError(f"Ширина трасс {width} не совпадает с хранилищем ({meta['width']})")
+            self.width = meta['width']
+            self.dtype = np.dtype(meta['dtype'])
+        elif readonly or width is None:
+            raise FileNotFoundError(f"Хранилище трасс не найдено: {self.path}")
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.width = width
+            self.dtype = np.dtype(dtype)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'width': width, 'dtype': self.dtype.str}, f)
+        
+        # Index: in-memory copy (amortized growth) + append-only file
+        index_path = self.path / self.INDEX
+        loaded = np.fromfile(index_path, dtype=INDEX_DTYPE) if index_path.exists() else np.empty(0, INDEX_DTYPE)
+        self._index = np.empty(max(len(loaded), 1024), dtype=INDEX_DTYPE)
+        self._index[:len(loaded)] = loaded
+        self._n = len(loaded)
+        self._lookup: Dict[int, int] = {int(t): i for i, t in enumerate(loaded['trial_id'])}  # latest wins
+        self._rows = int(loaded['row'].max()) + 1 if len(loaded) else 0
+        
+        self._data: Optional[np.memmap] = None
+        self._capacity = 0
+        self._map(self._rows if readonly else max(self._rows, self.INITIAL_ROWS))
+        self._index_file = None if readonly else open(index_path, 'ab')
+    
+    def _map(self, capacity: int) -> None:
+        """(Re)map the data file with room for capacity rows."""
+        if self._data is not None:
+            self._data.flush()
+            self._data = None
+        data_path = self.path / self.DATA
+        if capacity == 0:
+            self._data = np.empty((0, self.width), dtype=self.dtype)
+        else:
+            mode = 'r' if self.readonly else ('r+' if data_path.exists() else 'w+')
+            self._data = np.memmap(data_path, dtype=self.dtype, mode=mode, shape=(capacity, self.width))
+        self._capacity = capacity
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def __len__(self) -> int:
+        return self._n
+    
+    def __contains__(self, trial_id: int) -> bool:
+        return trial_id in self._lookup
+    
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    
+    def reserve(self, trial_id: int) -> np.ndarray:
+        """Writable view of the next free row (commit it to make it visible)."""
+        if self.readonly:
+            raise RuntimeError("Хранилище трасс открыто только для чтения")
+        if self._rows >= self._capacity:
+            self._map(self._capacity * 2)
+        return self._data[self._rows]
+    
+    def commit(self, trial_id: int, length: Optional[int] = None) -> None:
+        """Index the reserved row under trial_id (length = samples actually written)."""
+        if self._n == len(self._index):
+            self._index = np.resize(self._index, 2 * len(self._index))
+        entry = self._index[self._n:self._n + 1]
+        entry['trial_id'] = trial_id
+        entry['row'] = self._rows
+        entry['length'] = self.width if length is None else length
+        entry.tofile(self._index_file)
+        
+        self._lookup[trial_id] = self._n
+        self._n += 1
+        self._rows += 1
+    
+    def append(self, trial_id: int, trace: np.ndarray) -> None:
+        """Copy a finished trace in (prefer reserve/commit to receive in place)."""
+        row = self.reserve(trial_id)
+        n = min(len(trace), self.width)
+        row[:n] = trace[:n]
+        self.commit(trial_id, n)
+    
+    def flush(self) -> None:
+        if self._data is not None and isinstance(self._data, np.memmap) and not self.readonly:
+            self._data.flush()
+        if self._index_file:
+            self._index_file.flush()
+    
+    def close(self) -> None:
+        self.flush()
+        if self._index_file:
+            self._index_file.close()
+            self._index_file = None
+        self._data = None
+    
+    # ------------------------------------------------------------------
+    # Reading (zero-copy views)
+    # ------------------------------------------------------------------
+    
+    @property
+    def index(self) -> np.ndarray:
+        """Index entries (trial_id, row, length) in commit order."""
+        return self._index[:self._n]
+    
+    def get(self, trial_id: int) -> np.ndarray:
+        """Trace of one trial (view into the memmap)."""
+        entry = self._index[self._lookup[trial_id]]
+        return self._data[entry['row'], :entry['length']]
+    
+    def matrix(self) -> np.ndarray:
+        """All written rows, shape (rows, width), as one memmap view."""
+        return self._data[:self._rows]
+    
+    def iter_chunks(self, rows: int = 4096) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield (index entries, row block) pairs over committed traces, block by block."""
+        index = self.index
+        for start in range(0, self._n, rows):
+            entries = index[start:start + rows]
+            lo, hi = int(entries['row'][0]), int(entries['row'][-1]) + 1
+            if hi - lo == len(entries):
+                yield entries, self._data[lo:hi]  # contiguous rows: plain view
+            else:
+                yield entries, self._data[entries['row']]
+    
+    def mean_by_label(self, labels: Dict[int, str], rows: int = 4096) -> Dict[str, Tuple[int, np.ndarray]]:
+        """
+        Mean trace per label (e.g. outcome), streamed block by block.
+        
+        Only the first ``length`` samples of each row count; samples past a
+        short trace are stale slot contents. Each sample is averaged over the
+        traces that reach it, and the mean ends at the longest trace.
+        
+        Args:
+            labels: trial_id -> label; traces of unlabelled trials are skipped
+        
+        Returns:
+            label -> (count, mean trace)
+        """
+        names = sorted(set(labels.values()))
+        ids = np.fromiter(labels.keys(), dtype=np.int64, count=len(labels))
+        codes = np.fromiter((names.index(v) for v in labels.values()), dtype=np.int64, count=len(labels))
+        order = np.argsort(ids)
+        ids, codes = ids[order], codes[order]
+        
+        sums = np.zeros((len(names), self.width))
+        samples = np.zeros((len(names), self.width), dtype=np.int64)  # traces covering each sample
+        counts = np.zeros(len(names), dtype=np.int64)
+        offsets = np.arange(self.width)
+        for entries, block in self.iter_chunks(rows):
+            pos = np.clip(np.searchsorted(ids, entries['trial_id']), 0, max(len(ids) - 1, 0))
+            known = ids[pos] == entries['trial_id'] if len(ids) else np.zeros(len(entries), dtype=bool)
+            valid = offsets < entries['length'][:, None].astype(np.int64)
+            for k in range(len(names)):
+                mask = known & (codes[pos] == k)
+                if mask.any():
+                    sums[k] += np.where(valid[mask], block[mask], 0).sum(axis=0)
+                    samples[k] += valid[mask].sum(axis=0)
+                    counts[k] += int(mask.sum())
+        means = {}
+        for k, name in enumerate(names):
+            covered = int(np.count_nonzero(samples[k]))  # valid samples form a prefix of each row
+            if counts[k] and covered:
+                means[name] = (int(counts[k]), sums[k, :covered] / samples[k, :covered])
+        return means
@@ -0,0 +1,124 @@
+"""
+Chunked bulk transfer on top of the frame protocol.
+Pulls TRACE_DUMP data larger than one frame as offset-addressed chunks,
+each with its own CRC32, written in place into a preallocated buffer.
+Lost or corrupt chunks are re-requested by range.
+"""
+
+import binascii
+import time
+from typing import List, Optional, Tuple
+from .protocol import (
+    MessageType, encode_frame, decode_stream,
+    TRACE_REQUEST, TRACE_TO_END, TRACE_FLAG_EXTENDED, TRACE_CHUNK, MAX_PAYLOAD, EXT_MAX_PAYLOAD
+)
+
+
+def _subtract(missing: List[Tuple[int, int]], lo: int, hi: int) -> List[Tuple[int, int]]:
+    """Remove [lo, hi) from a list of disjoint [start, end) ranges."""
+    out = []
+    for start, end in missing:
+        if hi <= start or lo >= end:
+            out.append((start, end))
+            continue
+        if start < lo:
+            out.append((start, lo))
+        if hi < end:
+            out.append((hi, end))
+    return out
+
+
+def fetch_trace(
+    link,
+    out=None,
+    chunk_size: int = 0,
+    extended: bool = False,
+    max_payload: int = EXT_MAX_PAYLOAD,
+    idle_timeout_s: float = 0.2,
+    retries: int = 3
+) -> memoryview:
+    """
+    Pull the stand's current trace with TRACE_DUMP.
+    
+    Args:
+        link: SerialLink (or StandEmulator)
+        out: Preallocated writable buffer (bytearray, NumPy array, ...);
+             None allocates a bytearray once the total length is known
+        chunk_size: Data bytes per chunk (0 = largest the frame variant allows)
+        extended: Ask for extended-length frames (stand must report ext_payload)
+        max_payload: Negotiated ext_payload; longer extended frames are noise
+        idle_timeout_s: Silence after which missing ranges are re-requested
+        retries: Re-request rounds before giving up
+    
+    Returns:
+        Memoryview of the filled bytes of out (zero-copy, e.g. for np.frombuffer)
+    
+    Raises:
+        RuntimeError: NACK from the stand, or the trace is still incomplete
+            after the last retry
+        ValueError: out is smaller than the trace
+    """
+    if not chunk_size and not extended:
+        chunk_size = MAX_PAYLOAD - TRACE_CHUNK.size
+    flags = TRACE_FLAG_EXTENDED if extended else 0
+    
+    def request(offset: int, length: int) -> None:
+        link.write(encode_frame(MessageType.TRACE_DUMP, TRACE_REQUEST.pack(offset, length, chunk_size, flags)))
+    
+    request(0, TRACE_TO_END)
+    
+    view: Optional[memoryview] = None
+    total = None
+    missing: List[Tuple[int, int]] = []
+    rounds = 0
+    buffer = bytearray()
+    last = time.perf_counter()
+    
+    while True:
+        data = link.read_available()
+        if data:
+            buffer.extend(data)
+            for frame_type, payload in decode_stream(buffer, max_payload if extended else MAX_PAYLOAD):
+                if frame_type == MessageType.NACK:
+                    raise RuntimeError("Стенд отклонил TRACE_DUMP")
+                if frame_type != MessageType.TRACE_DUMP or len(payload) < TRACE_CHUNK.size:
+                    continue
+                
+                chunk_total, offset, crc = TRACE_CHUNK.unpack_from(payload)
+                chunk = memoryview(payload)[TRACE_CHUNK.size:]
+                if binascii.crc32(chunk) & 0xFFFFFFFF != crc:
+                    continue  # Corrupt chunk: stays missing, re-requested later
+                
+                if total is None:
+                    total = chunk_total
+                    if out is None:
+                        out = bytearray(total)
+                    view = memoryview(out).cast('B')
+                    if len(view) < total:
+                        raise ValueError(f"Буфер трассы мал: {len(view)} < {total} байт")
+                    missing = [(0, total)]
+                
+                end = min(offset + len(chunk), total)
+                view[offset:end] = chunk[:end - offset]
+                missing = _subtract(missing, offset, end)
+            
+            if total is not None and not missing:
+                return view[:total]
+            last = time.perf_counter()
+            continue
+        
+        if time.perf_counter() - last < idle_timeout_s:
+            time.sleep(0.001)
+            continue
+        
+        # Stream went quiet: ask again for whatever is still missing
+        rounds += 1
+        if rounds > retries:
+            lost = sum(end - start for start, end in missing) if total is not None else None
+            raise RuntimeError(f"Трасса не получена полностью (не хватает {lost if lost is not None else 'всех'} байт)")
+        if total is None:
+            request(0, TRACE_TO_END)
+        else:
+            for start, end in missing:
+                request(start, end - start)
+        last = time.perf_counter()
@@ -8,7 +8,7 @@ import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
 import numpy as np
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple
 from collections import defaultdict
 from .model import Trial, Outcome
 
@@ -189,3 +189,44 @@ def save_timeline(trials: List[Trial], outdir: str) -> None:
     plt.close()
     
     print(f"📊 Временная диаграмма сохранена: {output_path}")
+
+
+def save_trace_overview(means: Dict[str, Tuple[int, np.ndarray]], outdir: str) -> None:
+    """
+    Save mean traces per outcome (from TraceStore.mean_by_label).
+    
+    Args:
+        means: outcome -> (trace count, mean trace)
+        outdir: Output directory for PNG file
+    """
+    if not means:
+        print("⚠️  Нет трасс для визуализации")
+        return
+    
+    # Create output directory
+    Path(outdir).mkdir(parents=True, exist_ok=True)
+    
+    color_map = {
+        Outcome.SUCCESS.value: 'green',
+        Outcome.NO_EFFECT.value: 'gray',
+        Outcome.HANG.value: 'red',
+        Outcome.ERROR.value: 'orange'
+    }
+    
+    fig, ax = plt.subplots(figsize=(14, 5))
+    for outcome, (count, mean) in means.items():
+        ax.plot(mean, color=color_map.get(outcome, 'blue'), linewidth=1, label=f'{outcome} ({count})')
+    
+    ax.set_title('Средние трассы по исходам', fontsize=14, weight='bold')
+    ax.set_xlabel('Отсчёт', fontsize=12)
+    ax.set_ylabel('Уровень', fontsize=12)
+    ax.legend(loc='upper right')
+    
+    plt.tight_layout()
+    
+    # Save
+    output_path = Path(outdir) / 'traces.png'
+    plt.savefig(output_path, dpi=150)
+    plt.close()
+    
+    print(f"📊 Средние трассы сохранены: {output_path}")
@@ -0,0 +1,78 @@
+"""
+Timing-based stall detection for stand responses.
+A response that takes far longer than this command usually takes is
+overdue: the firmware answers every command synchronously and drops
+frames with a bad CRC silently, so the frame is most likely lost and
+can be retried long before the fixed protocol timeouts would expire.
+The same limit applies to the target heartbeat gap the stand reports
+(target_idle_ms): a gap far beyond the usual one means the target hung.
+"""
+
+from collections import deque
+from typing import Dict
+import numpy as np
+
+
+class TrialStall(Exception):
+    """Raised inside a trial when a command stays unanswered while the stand is alive."""
+
+    def __init__(self, what: str, waited_s: float):
+        super().__init__(f"{what}: нет ответа {waited_s * 1000:.0f} мс")
+        self.what = what
+        self.waited_s = waited_s
+
+
+class TrialHang(Exception):
+    """Raised inside a trial when the target heartbeat stops while the stand is alive."""
+
+    def __init__(self, idle_s: float):
+        super().__init__(f"нет пульса цели {idle_s * 1000:.0f} мс")
+        self.idle_s = idle_s
+
+
+class StallDetector:
+    """
+    Per-command response-time distribution with a stall limit.
+
+    The limit is median + k * MAD of the recent latencies of that command
+    (at least ``min_ms``), never longer than the caller's protocol timeout.
+    Until ``warmup`` samples are in, the protocol timeout is used as is.
+    """
+
+    def __init__(self, k: float = 8.0, min_ms: float = 20.0, window: int = 256, warmup: int = 16):
+        """
+        Args:
+            k: MAD multiples above the median that count as overdue (0 = off)
+            min_ms: Lower bound of the stall limit
+            window: Latencies kept per command
+            warmup: Samples needed before the limit applies
+        """
+        self.k = k
+        self.min_s = min_ms / 1000.0
+        self.window = window
+        self.warmup = warmup
+        self._latencies: Dict[str, deque] = {}
+        self._limits: Dict[str, float] = {}
+
+    def observe(self, kind: str, latency_s: float) -> None:
+        """Record one completed response."""
+        samples = self._latencies.get(kind)
+        if samples is None:
+            samples = self._latencies[kind] = deque(maxlen=self.window)
+        samples.append(latency_s)
+        self._limits.pop(kind, None)  # recomputed lazily
+
+    def limit_s(self, kind: str, timeout_s: float) -> float:
+        """How long to wait for a response of this kind before checking the stand."""
+        if self.k <= 0:
+            return timeout_s
+        limit = self._limits.get(kind)
+        if limit is None:
+            samples = self._latencies.get(kind)
+            if samples is None or len(samples) < self.warmup:
+                return timeout_s
+            values = np.fromiter(samples, dtype=float, count=len(samples))
+            median = float(np.median(values))
+            mad = float(np.median(np.abs(values - median)))
+            limit = self._limits[kind] = max(self.min_s, median + self.k * mad)
+        return min(limit, timeout_s)